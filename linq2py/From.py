@@ -1,33 +1,119 @@
 #!/usr/bin/env python
 
-# TODO: Add create a orderby class that contains a thenby method.
-# TODO: Add tolookup(keyselector)
 # TODO: Add comparer overloads
 # TODO: Add new LINQ methods
+# TODO: Add an AsyncFrom over async iterables once Python 3 is supported.
 
 import itertools
+import sys
 from array import array
 from collections import OrderedDict
 from functools import reduce
 
-__all__ = ["From"]
-
-
-def identity(x):
-    return x
+from . import batches
+from . import external
+from . import files
+from . import indexes
+from . import joins
+from . import kernel
+from . import memo
+from . import merge
+from . import ordering
+from . import partition
+from . import plan
+from . import prefetch
+from . import sets
+from . import threads
+from .expr import compiled, samekey
+from .lookup import Lookup
+from .plan import identity
+
+__all__ = ["From", "OrderedFrom"]
+
+
+def isndarray(seq):
+    """
+    Returns true if seq is a one dimensional NumPy array, without importing
+    NumPy when the caller has not already done so.  Arrays of rows are
+    enumerated row by row like any other sequence.
+    """
+    numpy = sys.modules.get("numpy")
+    return (numpy is not None and isinstance(seq, numpy.ndarray) and
+            seq.ndim == 1)
 
 
 class From(object):
 
+    def __new__(cls, *args, **kwargs):
+        if cls is From and args and isndarray(args[0]):
+            from .columnar import ColumnarFrom
+            return object.__new__(ColumnarFrom)
+        return object.__new__(cls)
+
     def __init__(self, seq):
         """
         Create a new From instance providing a sequence of items to perform
         operations on.
+
+        Operators such as where, select and take are not applied straight
+        away.  They are recorded as a plan against the source sequence and
+        only executed, after optimization, when a terminal method such as
+        tolist or sum enumerates the query.
         """
-        self.seq = seq
+        self.source = seq
+        self.ops = ()
+        self.sortedby = None
 
     def __iter__(self):
-        return (item for item in self.seq)
+        return iter(self.seq)
+
+    @property
+    def seq(self):
+        """
+        The sequence produced by executing the query plan.
+        """
+        return plan.execute(self.source, self.ops)
+
+    def _chain(self, kind, arg):
+        query = From(self.source)
+        query.ops = self.ops + ((kind, arg),)
+        if kind in plan.KEEPSORT:
+            query.sortedby = self.sortedby
+        return query
+
+    def _size(self):
+        view = self._view()
+        if view is not None:
+            return len(view)
+        return None if self.ops else joins.sizeof(self.source)
+
+    def _view(self):
+        return plan.view(self.source, self.ops)
+
+    def _mergeable(self, other, keyselector, otherkeyselector=None):
+        return (self.sortedby is not None and
+                samekey(self.sortedby, keyselector) and
+                isinstance(other, From) and
+                other.sortedby is not None and
+                samekey(other.sortedby, keyselector
+                        if otherkeyselector is None else otherkeyselector))
+
+    def _join(self, inner, outerkeyselector, innerkeyselector,
+              resultselector, kind, default, build):
+        mergeable = self._mergeable(inner, outerkeyselector,
+                                    innerkeyselector)
+        outerkeyselector = compiled(outerkeyselector)
+        innerkeyselector = compiled(innerkeyselector)
+        if mergeable:
+            return From(merge.mergejoin(
+                self.seq, inner.seq, outerkeyselector, innerkeyselector,
+                resultselector, kind, default))
+        innersize = (inner._size() if isinstance(inner, From) else
+                     joins.sizeof(inner))
+        side = joins.choosebuild(self._size(), innersize, build)
+        return From(joins.hashjoin(
+            self.seq, inner, outerkeyselector, innerkeyselector,
+            resultselector, kind, default, side))
 
     def aggregate(self, accumulatorfn, seed=0, resultfn=identity):
         """
@@ -49,6 +135,17 @@ class From(object):
         """
         return all(itertools.imap(pred, self.seq))
 
+    def antijoin(self, inner, outerkeyselector, innerkeyselector,
+                 build="auto"):
+        """
+        Returns a new From with the items in the sequence whose key does not
+        match the key of any item in inner.
+
+        build chooses the side loaded into memory, as described in join.
+        """
+        return self._join(inner, outerkeyselector, innerkeyselector,
+                          None, joins.ANTI, None, build)
+
     def any(self, pred):
         """
         Returns true if any item in the sequence returns true when
@@ -56,19 +153,106 @@ class From(object):
         """
         return any(itertools.imap(pred, self.seq))
 
+    def asparallel(self, workers=None, chunksize=1000, ordered=True):
+        """
+        Returns a ParallelFrom that runs following where, select, cast,
+        oftype and selectmany operators in a pool of worker processes.
+
+        The sequence is cut into chunks of chunksize items which are sent to
+        workers processes, defaulting to one per CPU.  With ordered, results
+        come back in the order of the sequence, otherwise in the order the
+        chunks complete.  The functions given to those operators must be
+        picklable, so lambdas cannot be used.  Any other operator, or
+        asequential, brings the query back to this process.
+        """
+        from .parallel import ParallelFrom
+        return ParallelFrom(self, workers, chunksize, ordered)
+
+    def assorted(self, keyselector=identity):
+        """
+        Returns a new From declaring that the sequence is already in
+        ascending order of the provided key selector.  Nothing is checked
+        or sorted.
+
+        When both sides of join, leftjoin, semijoin, antijoin or groupjoin
+        are declared sorted by the key selectors given to the join, the
+        join streams both sides with a merge instead of hashing one side.
+        intersect and except_ do the same when both sequences are declared
+        sorted by identity.  The same key selector object must be passed to
+        both methods.  orderby declares its result sorted automatically.
+        """
+        query = From(self.source)
+        query.ops = self.ops
+        query.sortedby = keyselector
+        return query
+
     def average(self):
         """
         Calculates the average value from a numeric sequence.
         """
-        items = self.tolist()
-        return sum(items) / len(items)
+        view = self._view()
+        if view is not None:
+            return sum(view) / len(view)
+        total = count = 0
+        for item in self.seq:
+            total += item
+            count += 1
+        return total / count
+
+    def batch(self, size):
+        """
+        Returns a new From whose items are lists of up to size consecutive
+        items of the sequence.  The last list may be shorter.
+        """
+        if size < 1:
+            raise ValueError("batch size must be at least 1")
+        return From(batches.batched(self.seq, size))
+
+    def cached(self, cache, version=None):
+        """
+        Returns a new From that reads the result of this query from cache,
+        a cache.QueryCache, and runs the query and caches its result only
+        when it is missing.  Equal queries, built from the same source with
+        the same operators and expressions, share one cached result.
+
+        version is a hashable token, or a function returning one, that is
+        part of the cache key.  Changing it when the source changes keeps
+        stale results from being returned.  cache.invalidate(source) drops
+        the results read from a source instead.
+        """
+        from .cache import CachedQuery
+        return From(CachedQuery(cache, self, version))
 
     def cast(self, fn):
         """
         Applies the given function to each item in the sequence to convert them
         to another type.
         """
-        return From(itertools.imap(fn, self.seq))
+        return self._chain(plan.SELECT, fn)
+
+    @staticmethod
+    def columns(columns):
+        """
+        Returns a ColumnarFrom over a dict of equal length NumPy arrays, or
+        sequences NumPy can convert to arrays, keyed by column name.  Items
+        are enumerated as dicts which also allow attribute access, and
+        predicates and selectors written over those rows are tried on the
+        whole columns first.  Requires NumPy.
+
+        A one dimensional NumPy array passed straight to From gets the same
+        treatment.
+        """
+        from .columnar import ColumnarFrom
+        return ColumnarFrom(columns)
+
+    def compile(self):
+        """
+        Returns a new From that runs the query through a kernel generated
+        for its exact chain of operators.  The kernel is a single loop with
+        every predicate and selector called inline, and is cached so that
+        later queries with the same shape skip code generation.
+        """
+        return From(kernel.CompiledQuery(self.source, self.ops))
 
     def concat(self, *iterables):
         """
@@ -79,40 +263,55 @@ class From(object):
 
     def contains(self, item):
         """
-        Returns true if the provided item exists in the sequence.
+        Returns true if the provided item exists in the sequence.  Stops
+        enumerating as soon as the item is found.
         """
-        return len([x for x in self.seq if x == item]) >= 1
+        if not self.ops and isinstance(self.source, (set, frozenset, dict)):
+            try:
+                return item in self.source
+            except TypeError:
+                return False
+        return any(x == item for x in self.seq)
 
-    def count(self, pred=identity):
+    def count(self, pred=None):
         """
         Counts the number of items in the sequence.  An optional predicate can
         be provided and only items that are given to the predicate that return
         True will be counted.
         """
-        return len(list(filter(pred, self.seq)))
+        if pred is None:
+            view = self._view()
+            if view is not None:
+                return len(view)
+            return sum(1 for item in self.seq)
+        return sum(1 for item in self.seq if pred(item))
 
     def defaultifempty(self, default):
         """
         Returns a new From with the provided value if the sequence is empty,
         otherwise returns a new From with the current sequence.
         """
-        s1, s2 = itertools.tee(self.seq)
-        try:
-            s1.next()
-            return From(s2)
-        except StopIteration:
-            return From(default)
+        items = memo.Memo(self.seq)
+        for item in items:
+            return From(items)
+        return From(default)
 
     def distict(self):
         """
-        Returns a new From containing a unique set of items from the sequence.
+        Returns a new From containing a unique set of items from the sequence
+        in the order they first appear.
         """
-        return From(set(self.seq))
+        return From(sets.distinct(self.seq))
 
     def elementat(self, index):
         """
         Returns the item in the sequence located at the provided index.
         """
+        view = self._view()
+        if view is not None:
+            if index < 0:
+                raise IndexError("elementat index must not be negative")
+            return view[index]
         return list(itertools.islice(self.seq, index, index + 1))[0]
 
     def elementatordefault(self, index, default):
@@ -129,38 +328,80 @@ class From(object):
         Returns a new From containing all items except those that appear in
         the provided sequence.
         """
-        otherseq = From(seq).tolist()
-        return From(item for item in self.seq
-                    if item not in otherseq)
+        if self._mergeable(seq, identity):
+            return From(merge.except_(self.seq, seq.seq))
+        return From(sets.except_(self.seq, seq))
 
-    def first(self, pred=identity):
+    def first(self, pred=None):
         """
         Returns the first item in the sequence.  If a predicate is provided,
         return the first item in the sequence that returns True when applied
         to the predicate.
         """
+        if pred is not None:
+            return self.where(pred).first()
         for item in self.seq:
-            if pred(item):
-                return item
+            return item
 
-    def firstordefault(self, default, pred=identity):
+    def firstordefault(self, default, pred=None):
         """
         Returns the first item in the sequence.  If no item is matches the
         predicate, the default value is returned.
         """
-        item = self.first(pred)
-        return item if item else default
+        if pred is not None:
+            return self.where(pred).firstordefault(default)
+        for item in self.seq:
+            return item
+        return default
 
     def groupby(
             self,
             keyfunc=identity,
             elementfunc=identity,
-            resultfunc=identity):
+            resultfunc=identity,
+            maxrows=None,
+            maxbytes=None,
+            tempdir=None,
+            preserveorder=True,
+            sorted=False,
+            accumulatorfn=None,
+            seed=0):
         """
         Groups items by keyfunc and applies elementfunc to each element.
         Finally, resultfunc is applied to each group result.
-        """
+
+        When the sequence is already ordered by keyfunc, passing sorted=True
+        groups it with groupadjacent so that each group is returned as soon
+        as its key changes.  accumulatorfn and seed fold each group's
+        elements into a single value as they arrive, the same way aggregate
+        does, instead of collecting them into a list.
+
+        Giving maxrows or maxbytes limits how many elements are held in
+        memory while grouping.  Once the limit is exceeded, elements are
+        hash partitioned by key into temporary files in tempdir and the
+        partitions are grouped one at a time.  Groups keep the order their
+        keys were first seen in unless preserveorder is False, which saves
+        sorting the groups after a spill.
+        """
+        if sorted:
+            return self.groupadjacent(
+                keyfunc, elementfunc, resultfunc, accumulatorfn, seed)
+        keyfunc = compiled(keyfunc)
+        elementfunc = compiled(elementfunc)
+        if maxrows is not None or maxbytes is not None:
+            budget = external.Budget(maxrows, maxbytes, tempdir)
+            groups = partition.spillgroupby(
+                self.seq, keyfunc, elementfunc, budget, preserveorder)
+            if accumulatorfn is not None:
+                groups = ((key, reduce(accumulatorfn, elements, seed))
+                          for key, elements in groups)
+            return From(resultfunc(item) for item in groups)
         od = OrderedDict()
+        if accumulatorfn is not None:
+            for item in self.seq:
+                key = keyfunc(item)
+                od[key] = accumulatorfn(od.get(key, seed), elementfunc(item))
+            return From(resultfunc(item) for item in od.items())
         for item in self.seq:
             key = keyfunc(item)
             if key not in od:
@@ -168,12 +409,44 @@ class From(object):
             od[key].append(elementfunc(item))
         return From(resultfunc(item) for item in od.items())
 
+    def groupadjacent(
+            self,
+            keyfunc=identity,
+            elementfunc=identity,
+            resultfunc=identity,
+            accumulatorfn=None,
+            seed=0):
+        """
+        Groups runs of adjacent items that share a key from keyfunc.  Each
+        group is a (key, elements) pair passed through resultfunc, like
+        groupby, but is returned as soon as the key changes rather than
+        after the whole sequence has been read.  A key that appears in
+        separate runs produces separate groups.
+
+        When accumulatorfn is given, elements are folded into a value
+        starting from seed as they arrive, so no group is ever held as a
+        list.
+        """
+        elementfunc = compiled(elementfunc)
+        groups = itertools.groupby(self.seq, compiled(keyfunc))
+        if accumulatorfn is None:
+            return From(resultfunc((key, [elementfunc(x) for x in items]))
+                        for key, items in groups)
+        return From(resultfunc((key, reduce(accumulatorfn,
+                                            itertools.imap(elementfunc, items),
+                                            seed)))
+                    for key, items in groups)
+
     def groupjoin(
             self,
             inner,
             outerkeyselector,
             innerkeyselector,
-            resultselector):
+            resultselector,
+            maxrows=None,
+            maxbytes=None,
+            tempdir=None,
+            preserveorder=True):
         """
         Joins two sequences by the provided key selectors and groups the
         results.  The results are then processed through the resultselector.
@@ -188,28 +461,67 @@ class From(object):
         innerkeyselector is a function that evaluates the value to be used as
         the key for the inner collection.  The inner collection is the one
         passed into this method as inner.
-        """
-        od = OrderedDict()
-        for item in self.seq:
-            key = outerkeyselector(item)
-            if key not in od:
-                od[key] = [item]
-        for item in inner:
-            key = innerkeyselector(item)
-            if key in od:
-                od[key].append(item)
-        return From(resultselector(items[0], items[1:])
-                    for key, items in od.items())
+
+        Every item in the current sequence produces one result, even when
+        several items share a key or no inner item matches.
+
+        maxrows and maxbytes limit how many inner items are held in memory.
+        When inner does not fit, both sequences are hash partitioned by key
+        into temporary files in tempdir and joined a partition at a time.
+        Results keep the order of the current sequence unless preserveorder
+        is False.
+        """
+        mergeable = self._mergeable(inner, outerkeyselector,
+                                    innerkeyselector)
+        outerkeyselector = compiled(outerkeyselector)
+        innerkeyselector = compiled(innerkeyselector)
+        if maxrows is not None or maxbytes is not None:
+            budget = external.Budget(maxrows, maxbytes, tempdir)
+            return From(partition.spillgroupjoin(
+                self.seq, inner, outerkeyselector, innerkeyselector,
+                resultselector, budget, preserveorder))
+        if mergeable:
+            return From(merge.mergegroupjoin(
+                self.seq, inner.seq, outerkeyselector, innerkeyselector,
+                resultselector))
+        return From(joins.groupjoin(self.seq, inner, outerkeyselector,
+                                    innerkeyselector, resultselector))
+
+    def indexed(self, keyselector, kind="hash"):
+        """
+        Returns a new From over the items of the sequence, held in a list
+        with a hash index on keyselector, or a sorted index when kind is
+        "sorted".  keyselector must be an expression such as F.user_id.
+        Calling indexed again on the result adds another index to the same
+        list.
+
+        where and first predicates comparing indexed keys with constants
+        are answered from the indexes instead of by a scan: == and isin by
+        either kind, and <, <=, > and >= by a sorted index.  The indexes
+        are built once and the result can be queried any number of times.
+        """
+        if isinstance(self.source, indexes.IndexedRows) and not self.ops:
+            source = self.source
+        else:
+            source = indexes.IndexedRows(self.tolist())
+        return From(source.withindex(keyselector, kind))
 
     def intersect(self, seq):
         """
-        Returns a set of values that only appear in both sequences.
+        Returns a set of values that only appear in both sequences, in the
+        order they first appear in the current sequence.
         """
-        s1 = set(self.seq)
-        s2 = set(seq)
-        return From(item for item in s1 if item in s2)
+        if self._mergeable(seq, identity):
+            return From(merge.intersect(self.seq, seq.seq))
+        return From(sets.intersect(self.seq, seq))
 
-    def join(self, inner, outerkeyselector, innerkeyselector, resultselector):
+    def join(
+            self,
+            inner,
+            outerkeyselector,
+            innerkeyselector,
+            resultselector,
+            build="auto"):
         """
         Joins two sequences by the provided key selectors.  The results are
         then processed through the resultselector.
@@ -224,33 +536,38 @@ class From(object):
         innerkeyselector is a function that evaluates the value to be used as
         the key for the inner collection.  The inner collection is the one
         passed into this method as inner.
-        """
-        d = {}
-        for item in self.seq:
-            d[outerkeyselector(item)] = item
 
-        def joingenerator():
-            for item in inner:
-                key = innerkeyselector(item)
-                if key in d:
-                    yield (d[key], item)
-
-        return From(resultselector(out, in_) for out, in_ in joingenerator())
-
-    def last(self, pred=identity):
-        """
-        Returns the last element in the sequence.
-        """
-        last = None
-        for item in self.seq:
-            if pred(item):
-                last = item
-        if not last:
-            raise IndexError(
-                "No items in the sequence matched the given predicate")
-        return last
-
-    def lastordefault(self, default, pred=identity):
+        Every pair of matching items is joined, including duplicate keys on
+        either side.  build chooses which side is held in memory while the
+        other is streamed: "outer", "inner", or "auto" to pick the smaller
+        side when the sizes are known.  Results follow the order of the
+        streamed side.
+        """
+        return self._join(inner, outerkeyselector, innerkeyselector,
+                          resultselector, joins.INNER, None, build)
+
+    def last(self, pred=None):
+        """
+        Returns the last element in the sequence.  If a predicate is
+        provided, return the last element that returns True when applied to
+        the predicate.
+        """
+        view = self._view()
+        if view is not None:
+            for item in reversed(view):
+                if pred is None or pred(item):
+                    return item
+        else:
+            found = False
+            for item in self.seq:
+                if pred is None or pred(item):
+                    last, found = item, True
+            if found:
+                return last
+        raise IndexError(
+            "No items in the sequence matched the given predicate")
+
+    def lastordefault(self, default, pred=None):
         """
         Returns the last item in the sequence, or the value provided if no item
         was found.
@@ -260,6 +577,35 @@ class From(object):
         except IndexError:
             return default
 
+    def leftjoin(
+            self,
+            inner,
+            outerkeyselector,
+            innerkeyselector,
+            resultselector,
+            default=None,
+            build="auto"):
+        """
+        Joins two sequences by the provided key selectors like join, but
+        also keeps items in the current sequence that have no match in
+        inner.  For those items, default is passed to the resultselector in
+        place of the inner item.
+        """
+        return self._join(inner, outerkeyselector, innerkeyselector,
+                          resultselector, joins.LEFT, default, build)
+
+    def materialize(self, key=None):
+        """
+        Returns a materialized.MaterializedQuery holding the result of this
+        query, whose operators must only be where, select and oftype.  Its
+        insert and delete methods apply changes to the rows to the result,
+        and to counts, sums, groups and joins built from it, in time
+        proportional to the change.  key identifies rows to delete when
+        they are not hashable themselves.
+        """
+        from .materialized import MaterializedQuery
+        return MaterializedQuery(self, key)
+
     def max(self, pred=identity):
         """
         Returns the item with the highest value and meets the provided
@@ -267,6 +613,38 @@ class From(object):
         """
         return max(itertools.ifilter(pred, self.seq))
 
+    def maxby(self, keyselector=identity):
+        """
+        Returns the item with the highest key from the provided key selector
+        without sorting the sequence.  The first such item wins ties.
+        """
+        return max(self.seq, key=keyselector)
+
+    def memoize(self):
+        """
+        Returns a new From that buffers items as they are first read, so
+        it can be enumerated any number of times, by several consumers at
+        once or by several terminal methods in turn, while this sequence
+        is enumerated only once.
+        """
+        return From(memo.Memo(self))
+
+    @staticmethod
+    def merge(*sources, **kwargs):
+        """
+        Returns a new From that lazily merges sequences which are each
+        already sorted by the key keyword argument into one sorted
+        sequence.  The result is declared sorted by that key.
+        """
+        keyselector = kwargs.pop("key", identity)
+        if kwargs:
+            raise TypeError(
+                "merge() got unexpected keyword arguments: %s" %
+                ", ".join(sorted(kwargs)))
+        query = From(merge.merge(sources, keyselector))
+        query.sortedby = keyselector
+        return query
+
     def min(self, pred=identity):
         """
         Returns the item with the smallest value and meets the provided
@@ -274,30 +652,94 @@ class From(object):
         """
         return min(itertools.ifilter(pred, self.seq))
 
+    def minby(self, keyselector=identity):
+        """
+        Returns the item with the lowest key from the provided key selector
+        without sorting the sequence.  The first such item wins ties.
+        """
+        return min(self.seq, key=keyselector)
+
     def oftype(self, type_):
         """
         Returns all items in the sequence that are of the given type.
         """
-        return From(x for x in self.seq if isinstance(x, type_))
+        return self._chain(plan.OFTYPE, type_)
 
     def orderby(self, keyselector=identity):
         """
-        Returns a new From with the sequence ordered by the provided key
-        selector.
+        Returns a new OrderedFrom with the sequence ordered by the provided
+        key selector.  Further keys can be added with thenby and
+        thenbydescending.  No sorting happens until the result is
+        enumerated.
         """
-        return From(sorted(self.seq, key=keyselector))
+        return OrderedFrom(self, keyselector)
 
     def orderbydecending(self, keyselector=identity):
         """
-        Returns a new From with the sequence ordered in reverse order by the
-        provided key selector.
+        Returns a new OrderedFrom with the sequence ordered in reverse order
+        by the provided key selector.  Further keys can be added with thenby
+        and thenbydescending.
+        """
+        return OrderedFrom(self, keyselector, descending=True)
+
+    def prefetch(self, size=64, mode="thread", stats=None):
         """
-        return From(sorted(self.seq, key=keyselector, reverse=True))
+        Returns a new From that reads up to size items ahead of its consumer
+        on a background worker, so a slow source such as a file parser or
+        database cursor overlaps with the rest of the query.
+
+        mode is "thread" for sources that wait on I/O, or "process" for
+        sources that are CPU bound, in which case the items must be
+        picklable.  Errors raised by the source are raised to the consumer,
+        and the worker is stopped if the consumer stops early, for example
+        after take or first.
+
+        stats, or a new prefetch.PrefetchStats if not given, is available
+        as the source attribute's stats and counts how often each side of
+        the queue had to wait, showing which one is the bottleneck.
+        """
+        return From(prefetch.Prefetch(self, size, mode, stats))
+
+    @staticmethod
+    def readcsv(path, delimiter=",", header=True, names=None, types=None):
+        """
+        Returns a new From streaming the rows of a CSV file.  The file is
+        memory mapped and read as the query needs it, and each row is a
+        record whose fields are split out and converted only when read.
+        names are the column names, taken from the first line when header
+        is set, and types maps column names to converters such as int.
+
+        The source attribute of the result can be split into shards over
+        byte ranges of the file with split(count).
+        """
+        return From(files.CsvFile(path, delimiter, header, names, types))
+
+    @staticmethod
+    def readfixed(path, fields, types=None):
+        """
+        Returns a new From streaming the rows of a fixed width text file.
+        fields is a list of (name, start, stop) character positions, and a
+        field is only cut out of its line, stripped and converted by types
+        when it is read.  See readcsv for sharding.
+        """
+        return From(files.FixedFile(path, fields, types))
+
+    @staticmethod
+    def readjsonl(path, types=None):
+        """
+        Returns a new From streaming a file of one JSON object per line.
+        Each line is only decoded when one of its fields is first read.
+        See readcsv for sharding.
+        """
+        return From(files.JsonLinesFile(path, types))
 
     def reverse(self):
         """
         Returns a new From with the sequence reversed.
         """
+        view = self._view()
+        if view is not None:
+            return From(view.reversed())
         return From(reversed(self.tolist()))
 
     def select(self, fn):
@@ -305,7 +747,31 @@ class From(object):
         Returns a new From with each item in the sequence processed through
         the provided function.
         """
-        return From(itertools.imap(fn, self.seq))
+        return self._chain(plan.SELECT, fn)
+
+    def selectbatch(self, fn, size=100):
+        """
+        Returns a new From with each item processed through fn, which is
+        called with lists of up to size items at a time and must return one
+        result for each of them, in the same order.  This suits functions
+        that are much cheaper per item in bulk, such as model inference or
+        database lookups.
+        """
+        return From(batches.selectbatches(self.batch(size), fn))
+
+    def selectconcurrent(self, fn, concurrency=8, ordered=True):
+        """
+        Returns a new From with each item processed through the provided
+        function, running up to concurrency calls at once on threads.  This
+        suits functions that spend their time waiting on I/O, such as
+        looking rows up over the network, so the waits overlap instead of
+        happening one row at a time.
+
+        With ordered, results keep the order of the sequence, otherwise they
+        are returned as each call completes.
+        """
+        return From(threads.concurrentmap(
+            fn, self.seq, concurrency, ordered))
 
     def selectmany(
         self,
@@ -334,6 +800,18 @@ class From(object):
                     yield resultselector(coll, item)
         return From(x for x in selectmanygenerator())
 
+    def semijoin(self, inner, outerkeyselector, innerkeyselector,
+                 build="auto"):
+        """
+        Returns a new From with the items in the sequence whose key matches
+        the key of at least one item in inner.  Each item is returned once
+        no matter how many items in inner it matches.
+
+        build chooses the side loaded into memory, as described in join.
+        """
+        return self._join(inner, outerkeyselector, innerkeyselector,
+                          None, joins.SEMI, None, build)
+
     def sequence_equal(self, seq):
         """
         Returns True if both sequences contain the same data.
@@ -349,6 +827,16 @@ class From(object):
                 return False
         return True
 
+    def share(self):
+        """
+        Returns a new From that several consumers can read side by side
+        while this sequence is enumerated only once.  Unlike memoize, only
+        the items that some consumer has not yet passed are kept, so every
+        consumer must start reading before the first item is discarded.
+        Starting one later raises a ValueError.
+        """
+        return From(memo.Memo(self, bounded=True))
+
     def single(self, pred=identity):
         """
         Returns a single item if it is the only item that is matched by the
@@ -365,19 +853,17 @@ class From(object):
         Returns the default value if the sequence is empty, otherwise calls
         single.
         """
-        s1, s2 = itertools.tee(self.seq)
-        try:
-            s1.next()
-            return From(s2).single(pred)
-        except StopIteration:
-            return default
+        items = memo.Memo(self.seq)
+        for item in items:
+            return From(items).single(pred)
+        return default
 
     def skip(self, num):
         """
         Skips the given number of items in the sequence, then returns the rest
         as a new From.
         """
-        return self.skipwhile(lambda item, i: i < num)
+        return self._chain(plan.SLICE, (max(num, 0), None))
 
     def skipwhile(self, selector):
         """
@@ -385,16 +871,21 @@ class From(object):
         The selector must accept two parameters.  The first being the item
         in the sequence, and the second being the index of the item.
         """
-        def skipgenerator():
-            pred = selector
-            enumerator = enumerate(self.seq)
-            for index, item in enumerator:
-                if pred(item, index):
-                    continue
-                else:
-                    pred = lambda it, ix: False
-                    yield item
-        return From(item for item in skipgenerator())
+        return self._chain(plan.SKIPWHILE, selector)
+
+    @staticmethod
+    def sqltable(connection, table, batchsize=1000):
+        """
+        Returns a SqlFrom reading the named table through a sqlite3
+        connection.  Leading where, select, orderby, take and skip operators
+        given expressions are run by SQLite as one statement, as are count,
+        sum, min, max, average, groupby and joins with other tables of the
+        same database when the whole query translates.  Anything else runs
+        in Python over the rows, which are fetched batchsize at a time as
+        dicts that also allow attribute access.
+        """
+        from .sql import SqlFrom, SqlTable
+        return SqlFrom(SqlTable(connection, table, batchsize))
 
     def sum(self, selector=identity):
         """
@@ -407,7 +898,7 @@ class From(object):
         Returns a new From with the specified number of items from the
         sequence.
         """
-        return self.takewhile(lambda item, i: i < num)
+        return self._chain(plan.SLICE, (0, max(num, 0)))
 
     def takewhile(self, selector):
         """
@@ -415,14 +906,7 @@ class From(object):
         The selector must accept two parameters.  The first being the item
         in the sequence, and the second being the index of the item.
         """
-        def takegenerator():
-            enumerator = enumerate(self.seq)
-            for index, item in enumerator:
-                if selector(item, index):
-                    yield item
-                else:
-                    break
-        return From(item for item in takegenerator())
+        return self._chain(plan.TAKEWHILE, selector)
 
     def toarray(self, typecode):
         """
@@ -438,16 +922,28 @@ class From(object):
         keyselector function as the key.  The row in the sequence is the value
         and is passed through the valueselector function.
         """
+        keyselector = compiled(keyselector)
+        valueselector = compiled(valueselector)
         d = {}
         for item in self.seq:
             d[keyselector(item)] = valueselector(item)
         return d
 
+    def tolookup(self, keyselector, elementselector=identity):
+        """
+        Returns a Lookup mapping each key from the keyselector function to a
+        tuple of the items with that key, passed through elementselector.
+        Unlike groupby, the groups are built straight away and any key can
+        be looked up in constant time.
+        """
+        return Lookup(self.seq, compiled(keyselector),
+                      compiled(elementselector))
+
     def tolist(self):
         """
         Returns the current sequence as a new list.
         """
-        return [x for x in self.seq]
+        return list(self.seq)
 
     def toseq(self):
         """
@@ -458,20 +954,25 @@ class From(object):
     def union(self, *iterables):
         """
         Returns a new From containing a set of values where the item in each
-        sequence only appears once.
+        sequence only appears once.  Items keep the order they first appear
+        in.
         """
-        newset = []
-        for item in self.concat(*iterables):
-            if item not in newset:
-                newset.append(item)
-        return From(newset)
+        return From(sets.distinct(itertools.chain(self.seq, *iterables)))
 
     def where(self, pred):
         """
         Filters items in the sequence to only those that match the provided
         predicate.
         """
-        return From(item for item in self.seq if pred(item))
+        return self._chain(plan.WHERE, pred)
+
+    def wherebatch(self, pred, size=100):
+        """
+        Filters items in the sequence with pred, which is called with lists
+        of up to size items at a time and must return one true or false
+        value for each of them, in the same order.
+        """
+        return From(batches.wherebatches(self.batch(size), pred))
 
     def wherei(self, pred):
         """
@@ -479,6 +980,88 @@ class From(object):
         predicate.  The predicate must accept two parameters.  The first being
         the item in the sequence, and the second being the index of the item.
         """
-        return From(item for i, item in enumerate(self.seq)
-                    if pred(item, i))
+        return self._chain(plan.WHEREI, pred)
+
 
+class OrderedFrom(From):
+
+    def __init__(self, seq, keyselector=identity, descending=False):
+        """
+        Create a new OrderedFrom that enumerates seq ordered by the provided
+        key selector.  This is what orderby and orderbydecending return.
+        """
+        From.__init__(self, ordering.Ordering(
+            seq, ((keyselector, descending),)))
+        if not descending:
+            self.sortedby = keyselector
+
+    def elementat(self, index):
+        """
+        Returns the item located at the provided index in the ordered
+        sequence.  Only the first index + 1 items are kept while selecting
+        it, rather than sorting the whole sequence.
+        """
+        if index < 0:
+            raise IndexError("elementat index must not be negative")
+        return self.source.head(index + 1)[index]
+
+    def externalsort(self, maxrows=None, maxbytes=None, tempdir=None):
+        """
+        Returns a new OrderedFrom that sorts without holding the whole
+        sequence in memory.  Rows are sorted in memory up to maxrows rows or
+        roughly maxbytes bytes, written to temporary files in tempdir as
+        sorted runs, and the runs are merged lazily when the result is
+        enumerated.  take, first, last and elementat keep their single pass
+        selection and never spill.
+        """
+        return self._reorder(
+            self.source.keys,
+            external.Budget(maxrows, maxbytes, tempdir))
+
+    def first(self, pred=None):
+        """
+        Returns the first item in the ordered sequence that matches the
+        predicate, found in a single pass without sorting.
+        """
+        return self.source.first(pred)
+
+    def firstordefault(self, default, pred=None):
+        """
+        Returns the first item in the ordered sequence that matches the
+        predicate, or default if there is none, without sorting.
+        """
+        found, item = self.source.extreme(pred, last=False)
+        return item if found else default
+
+    def last(self, pred=None):
+        """
+        Returns the last item in the ordered sequence that matches the
+        predicate, found in a single pass without sorting.
+        """
+        return self.source.last(pred)
+
+    def _reorder(self, keys, budget):
+        query = OrderedFrom(self.source.seq)
+        query.source = ordering.Ordering(self.source.seq, keys, budget)
+        query.sortedby = self.sortedby
+        return query
+
+    def _thenby(self, keyselector, descending):
+        return self._reorder(
+            self.source.keys + ((keyselector, descending),),
+            self.source.budget)
+
+    def thenby(self, keyselector=identity):
+        """
+        Returns a new OrderedFrom that orders items with equal keys so far
+        by the provided key selector.  All of the keys are applied in a
+        single sort when the result is enumerated.
+        """
+        return self._thenby(keyselector, False)
+
+    def thenbydescending(self, keyselector=identity):
+        """
+        Returns a new OrderedFrom that orders items with equal keys so far
+        in reverse order by the provided key selector.
+        """
+        return self._thenby(keyselector, True)
@@ -1,3 +1,4 @@
 #!/usr/bin/env python
 
-from .From import From
+from .From import From, OrderedFrom
+from .expr import F
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""
+Helpers for handing items to functions a batch at a time.
+
+Functions such as model inference or bulk database lookups cost far less
+per item when given many items in one call.  These helpers cut a sequence
+into batches, call the function once per batch, and flatten its results
+back into single items, so the rest of a query stays one item at a time.
+"""
+
+import itertools
+
+__all__ = ["batched", "selectbatches", "wherebatches"]
+
+
+def batched(seq, size):
+    """
+    Yields lists of up to size consecutive items of seq.  size must be at
+    least 1.
+    """
+    iterator = iter(seq)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def aslist(items):
+    """
+    Returns items as a list, converting arrays with their tolist method.
+    """
+    return items.tolist() if hasattr(items, "tolist") else list(items)
+
+
+def resultsof(fn, batch):
+    """
+    Returns fn(batch) as a list, checking that there is one result for each
+    item of the batch.
+    """
+    results = aslist(fn(batch))
+    if len(results) != len(batch):
+        raise ValueError(
+            "batch function returned %d results for %d items" % (
+                len(results), len(batch)))
+    return results
+
+
+def selectbatches(batches, fn):
+    """
+    Yields each result of fn called on each batch.
+    """
+    for batch in batches:
+        for result in resultsof(fn, batch):
+            yield result
+
+
+def wherebatches(batches, fn):
+    """
+    Yields the items of each batch for which fn, called on the whole
+    batch, returned a true value in the item's position.
+    """
+    for batch in batches:
+        keeps = resultsof(fn, batch)
+        for item, keep in itertools.izip(aslist(batch), keeps):
+            if keep:
+                yield item
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+"""
+An opt-in cache of query results.
+
+A query is identified by its source and its operator nodes.  Expressions
+are identified by their fingerprint, so F.price > 10 written twice is the
+same query, while plain functions, lists and other sources are identified
+by the object itself, so a lambda written again is a new query.  A version
+token supplied by the caller is added to the key, so bumping it when the
+source changes makes every earlier result unreachable.  Sources can also
+be invalidated explicitly.
+
+Only operators recorded in the query plan, such as where, select, take,
+skip and orderby, are recognised.  Methods that return a From over a new
+generator, such as join or groupby, start a query that never matches an
+earlier one.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from .From import From
+from .expr import Expr
+from .ordering import Ordering
+
+__all__ = ["CachedQuery", "QueryCache", "querykey"]
+
+
+def constants(expr, sources):
+    """
+    Adds the unhashable constants of expr, which its fingerprint refers to
+    by identity, to sources.
+    """
+    for arg in expr.args:
+        if isinstance(arg, Expr):
+            constants(arg, sources)
+            continue
+        try:
+            hash(arg)
+        except TypeError:
+            sources.append(arg)
+
+
+def argkey(arg, sources):
+    """
+    Returns a hashable key for an operator argument.
+    """
+    if isinstance(arg, Expr):
+        constants(arg, sources)
+        return ("expr", arg.fingerprint)
+    if isinstance(arg, tuple):
+        return tuple(argkey(item, sources) for item in arg)
+    try:
+        hash(arg)
+    except TypeError:
+        sources.append(arg)
+        return ("id", id(arg))
+    return arg
+
+
+def querykey(source, ops=(), sources=None):
+    """
+    Returns (key, sources), a hashable key identifying the result of ops
+    applied to source and the list of underlying sources it reads.  The
+    key refers to objects without a value by identity, and holding on to
+    sources keeps those objects alive while the key is in use.
+    """
+    if sources is None:
+        sources = []
+    if isinstance(source, From):
+        inner, sources = querykey(source.source, source.ops, sources)
+        key = ("query", inner)
+    elif isinstance(source, Ordering):
+        inner, sources = querykey(source.seq, (), sources)
+        key = ("ordering", inner, argkey(source.keys, sources))
+    else:
+        sources.append(source)
+        key = ("source", id(source))
+    return (key, argkey(tuple(ops), sources)), sources
+
+
+class Entry(object):
+
+    __slots__ = ("result", "expires", "sources")
+
+    def __init__(self, result, expires, sources):
+        self.result = result
+        self.expires = expires
+        self.sources = sources
+
+
+class QueryCache(object):
+    """
+    A cache of materialized query results shared by any number of queries.
+
+    At most maxsize results are kept, discarding the least recently used
+    first, and a result older than ttl seconds, when ttl is given, is
+    discarded instead of returned.  hits and misses count lookups, and
+    evictions and expirations count results discarded for space and age.
+    """
+
+    def __init__(self, maxsize=128, ttl=None, clock=time.time):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the cached result for key, or None if there is none.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and entry.expires is not None and \
+                    entry.expires <= self.clock():
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries[key] = entry
+            self.hits += 1
+            return entry.result
+
+    def put(self, key, result, sources=()):
+        """
+        Caches result under key.  sources are the objects the result was
+        read from, which invalidate matches against.
+        """
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = Entry(result, expires, tuple(sources))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, source=None):
+        """
+        Discards every result read from source, or every result when no
+        source is given.  Returns the number of results discarded.
+        """
+        with self.lock:
+            if source is None:
+                count = len(self.entries)
+                self.entries.clear()
+                return count
+            stale = [key for key, entry in self.entries.items()
+                     if any(item is source for item in entry.sources)]
+            for key in stale:
+                del self.entries[key]
+            return len(stale)
+
+    def __repr__(self):
+        return ("QueryCache(size=%d, hits=%d, misses=%d, evictions=%d, "
+                "expirations=%d)" % (len(self.entries), self.hits,
+                                     self.misses, self.evictions,
+                                     self.expirations))
+
+
+class CachedQuery(object):
+    """
+    A sequence that reads the result of query from cache, running the
+    query and caching its result when it is not there.  version is a
+    hashable token, or a function returning one, that is part of the key.
+    """
+
+    def __init__(self, cache, query, version=None):
+        self.cache = cache
+        self.query = query
+        self.version = version
+
+    def __iter__(self):
+        version = self.version() if callable(self.version) else self.version
+        key, sources = querykey(self.query)
+        key = (key, version)
+        result = self.cache.get(key)
+        if result is None:
+            result = tuple(self.query)
+            self.cache.put(key, result, sources)
+        return iter(result)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+
+"""
+A NumPy backed From for numeric arrays and columns of arrays.
+
+Predicates and selectors are first tried on whole arrays at once.  A
+predicate such as lambda x: x > 10 returns a boolean mask when given an
+array, and a selector such as lambda r: r["price"] * r["qty"] returns a new
+column, so both run as NumPy operations instead of once per row.  Anything
+that does not give back an array of the right shape, such as a lambda using
+and, or, if or calling str, falls back to the ordinary row by row path.
+
+Whole arrays are evaluated with integers widened to 64 bits and floats to
+double precision, as Python would compute them, so x + 10 does not wrap
+around in an array of bytes.  Unsigned 64 bit integers have no wider type
+and are always handled row by row, and so are selectors over booleans,
+since NumPy adds booleans with or.  Results beyond the range of a 64 bit
+integer still wrap around.
+
+NumPy is optional.  It is only needed to create a ColumnarFrom.
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import plan
+from .From import From
+from .expr import Expr, Row
+from .plan import identity
+from .source import Source
+
+__all__ = ["ColumnarFrom", "Columns", "Row"]
+
+
+class Columns(object):
+    """
+    A set of equal length one dimensional arrays, keyed by column name.
+    Columns can be read as columns["name"] or as columns.name.
+    """
+
+    def __init__(self, columns):
+        self.columns = dict((name, numpy.asarray(values))
+                            for name, values in columns.items())
+        lengths = set(len(values) for values in self.columns.values())
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self.length = lengths.pop() if lengths else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __len__(self):
+        return self.length
+
+    def select(self, index):
+        """
+        Returns new Columns with each column indexed by a mask or slice.
+        """
+        return Columns(dict((name, values[index])
+                            for name, values in self.columns.items()))
+
+    def tolist(self):
+        return list(self.rows())
+
+    def rows(self):
+        names = list(self.columns)
+        values = [self.columns[name].tolist() for name in names]
+        for row in zip(*values):
+            yield Row(zip(names, row))
+
+
+class Rows(Source):
+    """
+    The row by row view of an array or Columns, used whenever an operator
+    cannot be run on whole columns.  Leading where and select expressions,
+    slices and orderings by expressions are still applied to the whole
+    columns before any rows are produced.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def query(self):
+        return self.data
+
+    def push(self, data, kind, arg):
+        if kind == plan.SLICE:
+            return sliced(data, *arg)
+        if not isinstance(arg, Expr) and kind != plan.ORDERBY:
+            return None
+        if kind == plan.WHERE:
+            mask = trycolumns(arg, data)
+            if iscolumn(mask, len(data)) and mask.dtype == bool:
+                return masked(data, mask)
+        elif kind == plan.SELECT and not hasbool(data):
+            return columnsof(trycolumns(arg, data), len(data))
+        elif kind == plan.ORDERBY:
+            order = sortorder(data, arg)
+            if order is not None:
+                return masked(data, order)
+        return None
+
+    def rows(self, data):
+        if isinstance(data, Columns):
+            return data.rows()
+        return iter(data.tolist())
+
+
+def iscolumn(value, length):
+    return (isinstance(value, numpy.ndarray) and value.ndim == 1 and
+            len(value) == length)
+
+
+def masked(data, index):
+    if isinstance(data, Columns):
+        return data.select(index)
+    return data[index]
+
+
+def sliced(data, start, stop):
+    if isinstance(data, Columns):
+        return data.select(slice(start, stop))
+    return data[start:stop]
+
+
+def columnsof(result, length):
+    """
+    Returns result if it is one column or a dict of columns of the given
+    length, otherwise None.
+    """
+    if iscolumn(result, length):
+        return result
+    if isinstance(result, dict) and result and all(
+            iscolumn(values, length) for values in result.values()):
+        return Columns(result)
+    return None
+
+
+def sortorder(data, keys):
+    """
+    Returns the indexes that sort data stably by (expression, descending)
+    keys, or None if a key is not an expression over whole columns.
+    Descending keys must be numeric so they can be negated.
+    """
+    columns = []
+    for keyselector, descending in keys:
+        if not isinstance(keyselector, Expr):
+            return None
+        column = trycolumns(keyselector, data)
+        if not iscolumn(column, len(data)):
+            return None
+        if descending:
+            if column.dtype.kind in "bu":
+                column = column.astype(numpy.int64)
+            elif column.dtype.kind not in "if":
+                return None
+            column = -column
+        columns.append(column)
+    # lexsort sorts by the last key first.
+    return numpy.lexsort(columns[::-1])
+
+
+def widened(values):
+    """
+    Returns values as an array of the type Python arithmetic on its items
+    would give, or None if NumPy has no such type.
+    """
+    kind = values.dtype.kind
+    if kind in "bi" or (kind == "u" and values.dtype.itemsize < 8):
+        return values.astype(numpy.int64, copy=False)
+    if kind == "u":
+        return None
+    if kind == "f":
+        return values.astype(numpy.float64, copy=False)
+    return values
+
+
+def widen(data):
+    """
+    Returns data with every array widened, or None if one cannot be.
+    """
+    if not isinstance(data, Columns):
+        return widened(data)
+    columns = {}
+    for name, values in data.columns.items():
+        columns[name] = widened(values)
+        if columns[name] is None:
+            return None
+    return Columns(columns)
+
+
+def hasbool(data):
+    """
+    Returns true if data is a boolean array or has a boolean column.
+    """
+    if isinstance(data, Columns):
+        return any(values.dtype.kind == "b"
+                   for values in data.columns.values())
+    return data.dtype.kind == "b"
+
+
+def trycolumns(fn, data):
+    """
+    Calls fn with the whole of data, widened as Python arithmetic would
+    widen its items.  Returns None if that raised an error, since fn was
+    written for a single row, or if data cannot be widened.  Expressions
+    are evaluated with their elementwise form.
+    """
+    data = widen(data)
+    if data is None:
+        return None
+    if isinstance(fn, Expr):
+        try:
+            return fn.vectorized(data)
+        except Exception:
+            return None
+    try:
+        return fn(data)
+    except Exception:
+        return None
+
+
+class ColumnarFrom(From):
+
+    def __init__(self, data):
+        """
+        Create a new ColumnarFrom over a one dimensional NumPy array, or a
+        dict of equal length arrays which is enumerated as Row dicts.  From
+        returns one of these when it is given a NumPy array.
+        """
+        if numpy is None:
+            raise ImportError("ColumnarFrom requires numpy")
+        if isinstance(data, dict):
+            data = Columns(data)
+        elif not isinstance(data, Columns):
+            data = numpy.asarray(data)
+            if data.ndim != 1:
+                raise ValueError(
+                    "ColumnarFrom requires a one dimensional array")
+        From.__init__(self, Rows(data))
+        self.data = data
+
+    def _mask(self, pred):
+        """
+        Returns pred evaluated over whole columns as a boolean mask, or None
+        if it cannot be.
+        """
+        if pred is identity:
+            if isinstance(self.data, Columns):
+                return None
+            return self.data.astype(bool)
+        mask = trycolumns(pred, self.data)
+        if iscolumn(mask, len(self.data)) and mask.dtype == bool:
+            return mask
+        return None
+
+    def _numeric(self):
+        return (not isinstance(self.data, Columns) and
+                self.data.dtype.kind in "biuf")
+
+    def average(self):
+        """
+        Calculates the average value from a numeric array with NumPy.
+        """
+        if not self._numeric():
+            return From.average(self)
+        return self.data.sum().item() / len(self.data)
+
+    def batch(self, size):
+        """
+        Returns a new From whose items are views of up to size consecutive
+        items of the array, or Columns of up to size rows, without copying.
+        """
+        if size < 1:
+            raise ValueError("batch size must be at least 1")
+        return From(sliced(self.data, start, start + size)
+                    for start in range(0, len(self.data), size))
+
+    def count(self, pred=None):
+        """
+        Counts the items matching the predicate, using a mask when the
+        predicate can be evaluated over whole columns.
+        """
+        if pred is None:
+            return len(self.data)
+        mask = self._mask(pred)
+        if mask is None:
+            return From.count(self, pred)
+        return int(numpy.count_nonzero(mask))
+
+    def max(self, pred=identity):
+        """
+        Returns the highest item that meets the predicate, using NumPy when
+        the predicate can be evaluated over whole columns.
+        """
+        mask = self._mask(pred) if self._numeric() else None
+        if mask is None:
+            return From.max(self, pred)
+        matched = self.data[mask]
+        if not len(matched):
+            raise ValueError("max() arg is an empty sequence")
+        return matched.max().item()
+
+    def min(self, pred=identity):
+        """
+        Returns the smallest item that meets the predicate, using NumPy when
+        the predicate can be evaluated over whole columns.
+        """
+        mask = self._mask(pred) if self._numeric() else None
+        if mask is None:
+            return From.min(self, pred)
+        matched = self.data[mask]
+        if not len(matched):
+            raise ValueError("min() arg is an empty sequence")
+        return matched.min().item()
+
+    def select(self, fn):
+        """
+        Returns a new ColumnarFrom with the result of fn evaluated over
+        whole columns, when it gives back an array or a dict of arrays with
+        one value per row.  Otherwise fn is applied row by row.
+        """
+        if fn is identity:
+            return self
+        if hasbool(self.data):
+            return From.select(self, fn)
+        result = columnsof(trycolumns(fn, self.data), len(self.data))
+        if result is None:
+            return From.select(self, fn)
+        return ColumnarFrom(result)
+
+    def skip(self, num):
+        """
+        Returns a new ColumnarFrom viewing the arrays after the first num
+        items, without copying them.
+        """
+        return ColumnarFrom(sliced(self.data, max(num, 0), None))
+
+    def sum(self, selector=identity):
+        """
+        Returns the sum of the items that match the selector, using NumPy
+        when the selector can be evaluated over whole columns.
+        """
+        if not self._numeric():
+            return From.sum(self, selector)
+        if selector is identity:
+            return self.data.sum().item()
+        mask = self._mask(selector)
+        if mask is None:
+            return From.sum(self, selector)
+        return self.data[mask].sum().item()
+
+    def take(self, num):
+        """
+        Returns a new ColumnarFrom viewing the first num items of the
+        arrays, without copying them.
+        """
+        return ColumnarFrom(sliced(self.data, 0, max(num, 0)))
+
+    def toarray(self, typecode):
+        """
+        Returns the array as an array.array with the provided typecode,
+        converting it in one step rather than item by item.
+        """
+        if not self._numeric():
+            return From.toarray(self, typecode)
+        return array(typecode,
+                     self.data.astype(numpy.dtype(typecode)).tobytes())
+
+    def tolist(self):
+        """
+        Returns the items as a new list of Python values.
+        """
+        if isinstance(self.data, Columns):
+            return list(self.data.rows())
+        return self.data.tolist()
+
+    def where(self, pred):
+        """
+        Returns a new ColumnarFrom with the rows that match the predicate,
+        using a boolean mask when the predicate can be evaluated over whole
+        columns.  Otherwise the predicate is applied row by row.
+        """
+        mask = self._mask(pred)
+        if mask is None:
+            return From.where(self, pred)
+        return ColumnarFrom(masked(self.data, mask))
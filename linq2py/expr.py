@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+
+"""
+Expressions for keys, predicates and selectors.
+
+F stands for the item being looked at, so F.price > 10 is a predicate,
+F["user"]["id"] is a key and F.price * F.qty is a selector.  Expressions
+can be passed to From methods anywhere a function is accepted.
+
+Unlike a lambda, an expression can be taken apart.  op and args describe
+each node, fingerprint is a tuple that is equal for structurally equal
+expressions, and fields() names the fields read from the item, which lets
+the planner fuse expressions and lets sources filter or project rows
+themselves.  When an expression is used, it is compiled once into a plain
+callable: operator.attrgetter, itemgetter or methodcaller when it is a
+single lookup, otherwise one generated function with no nested calls.
+
+An expression cannot be used in an if statement or with and, or and not,
+since those need a plain true or false straight away.  Use &, | and ~ to
+combine predicates instead.  Fields whose names clash with the attributes
+of an expression, such as F.op, can be read with field("op") or F["op"]
+for mappings.
+"""
+
+import keyword
+import operator
+import re
+
+__all__ = ["Expr", "F", "Row", "compiled", "const", "field", "samekey"]
+
+ROOT = "root"
+CONST = "const"
+ATTR = "attr"
+ITEM = "item"
+CALL = "call"
+APPLY = "apply"
+BINARY = "binary"
+AND = "and"
+OR = "or"
+NOT = "not"
+NEG = "neg"
+ISIN = "isin"
+
+# Binary operators by name, with their Python syntax.
+SYMBOLS = {
+    "lt": "<", "le": "<=", "eq": "==", "ne": "!=", "gt": ">", "ge": ">=",
+    "add": "+", "sub": "-", "mul": "*", "div": "/", "floordiv": "//",
+    "mod": "%", "pow": "**",
+}
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def wrap(value):
+    return value if isinstance(value, Expr) else Expr(CONST, (value,))
+
+
+def binary(name, reflected=False):
+    def method(self, other):
+        if reflected:
+            return Expr(BINARY, (name, wrap(other), self))
+        return Expr(BINARY, (name, self, wrap(other)))
+    method.__name__ = "__%s__" % name
+    return method
+
+
+def isfield(node):
+    """
+    Returns true if node reads a field straight from the item.
+    """
+    return node.op in (ATTR, ITEM) and node.args[0].op == ROOT
+
+
+def identitykey(value):
+    """
+    Returns a key identifying an unhashable value by identity.  A bound
+    method is identified by its object and name, since each lookup of the
+    method makes a new one.
+    """
+    owner = getattr(value, "__self__", None)
+    if owner is not None and hasattr(value, "__name__"):
+        return (id(owner), value.__name__)
+    return id(value)
+
+
+def attrpath(node):
+    """
+    Returns the dotted attribute path if node is a chain of attribute
+    lookups on the item, otherwise None.
+    """
+    names = []
+    while node.op == ATTR:
+        names.append(node.args[1])
+        node = node.args[0]
+    if node.op != ROOT or not names:
+        return None
+    return ".".join(reversed(names))
+
+
+class Generator(object):
+    """
+    Writes the source of a function evaluating an expression for an item,
+    or for whole NumPy columns when vector is set.
+    """
+
+    def __init__(self, vector=False):
+        self.vector = vector
+        self.namespace = {}
+
+    def bind(self, value):
+        name = "c%d" % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def write(self, node):
+        op, args = node.op, node.args
+        if op == ROOT:
+            return "x"
+        if op == CONST:
+            return self.bind(args[0])
+        if op == ATTR:
+            if IDENTIFIER.match(args[1]) and not keyword.iskeyword(args[1]):
+                return "%s.%s" % (self.write(args[0]), args[1])
+            return "getattr(%s, %s)" % (self.write(args[0]),
+                                        self.bind(args[1]))
+        if op == ITEM:
+            return "%s[%s]" % (self.write(args[0]), self.bind(args[1]))
+        if op == CALL:
+            base, name, callargs, kwargs = args
+            caller = operator.methodcaller(name, *callargs, **dict(kwargs))
+            return "%s(%s)" % (self.bind(caller), self.write(base))
+        if op == APPLY:
+            return "%s(%s)" % (self.bind(args[1]), self.write(args[0]))
+        if op == BINARY:
+            name, left, right = args
+            return "(%s %s %s)" % (self.write(left), SYMBOLS[name],
+                                   self.write(right))
+        if op in (AND, OR):
+            if self.vector:
+                import numpy
+                function = getattr(numpy, "logical_" + op)
+                return "%s(%s, %s)" % (self.bind(function),
+                                       self.write(args[0]),
+                                       self.write(args[1]))
+            return "(%s %s %s)" % (self.write(args[0]), op,
+                                   self.write(args[1]))
+        if op == NOT:
+            if self.vector:
+                import numpy
+                return "%s(%s)" % (self.bind(numpy.logical_not),
+                                   self.write(args[0]))
+            return "(not %s)" % self.write(args[0])
+        if op == NEG:
+            return "(-%s)" % self.write(args[0])
+        if op == ISIN:
+            if self.vector:
+                import numpy
+                return "%s(%s, %s)" % (self.bind(numpy.isin),
+                                       self.write(args[0]),
+                                       self.bind(list(args[1])))
+            return "(%s in %s)" % (self.write(args[0]), self.bind(args[1]))
+        raise ValueError("Unknown expression node %r" % op)
+
+    def function(self, node):
+        source = "lambda x: %s" % self.write(node)
+        return eval(compile(source, "<linq2py expression>", "eval"),
+                    self.namespace)
+
+
+class Expr(object):
+    """
+    A node in an expression tree.  op names the kind of node and args holds
+    its operands, which are themselves expressions for all but the constant
+    parts such as field names.
+    """
+
+    __slots__ = ("op", "args", "_cache")
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        self._cache = {}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Expr(ATTR, (self, name))
+
+    def __getitem__(self, key):
+        return Expr(ITEM, (self, key))
+
+    def __call__(self, item):
+        return self.function(item)
+
+    def __iter__(self):
+        raise TypeError("Expressions cannot be iterated")
+
+    def __nonzero__(self):
+        raise TypeError(
+            "Expressions cannot be used as a truth value; combine them with "
+            "&, | and ~ rather than and, or and not")
+
+    __bool__ = __nonzero__
+
+    # Comparisons build expressions, so equal expressions are only found
+    # by comparing fingerprints, and hashing is by identity.
+    __hash__ = object.__hash__
+
+    __lt__ = binary("lt")
+    __le__ = binary("le")
+    __eq__ = binary("eq")
+    __ne__ = binary("ne")
+    __gt__ = binary("gt")
+    __ge__ = binary("ge")
+    __add__ = binary("add")
+    __sub__ = binary("sub")
+    __mul__ = binary("mul")
+    __div__ = binary("div")
+    __truediv__ = binary("div")
+    __floordiv__ = binary("floordiv")
+    __mod__ = binary("mod")
+    __pow__ = binary("pow")
+    __radd__ = binary("add", True)
+    __rsub__ = binary("sub", True)
+    __rmul__ = binary("mul", True)
+    __rdiv__ = binary("div", True)
+    __rtruediv__ = binary("div", True)
+    __rfloordiv__ = binary("floordiv", True)
+    __rmod__ = binary("mod", True)
+    __rpow__ = binary("pow", True)
+
+    def __and__(self, other):
+        return Expr(AND, (self, wrap(other)))
+
+    def __rand__(self, other):
+        return Expr(AND, (wrap(other), self))
+
+    def __or__(self, other):
+        return Expr(OR, (self, wrap(other)))
+
+    def __ror__(self, other):
+        return Expr(OR, (wrap(other), self))
+
+    def __invert__(self):
+        return Expr(NOT, (self,))
+
+    def __neg__(self):
+        return Expr(NEG, (self,))
+
+    def __reduce__(self):
+        return Expr, (self.op, self.args)
+
+    def __repr__(self):
+        if self.op == ROOT:
+            return "F"
+        return "Expr(%r, %r)" % (self.op, self.args)
+
+    def apply(self, fn):
+        """
+        Returns an expression calling fn with the value of this one.
+        """
+        return Expr(APPLY, (self, fn))
+
+    def isin(self, values):
+        """
+        Returns a predicate that is true when the value is one of values.
+        """
+        return Expr(ISIN, (self, frozenset(values)))
+
+    def method(self, name, *args, **kwargs):
+        """
+        Returns an expression calling the named method of the value, such
+        as F.name.method("lower").
+        """
+        return Expr(CALL, (self, name, args, tuple(sorted(kwargs.items()))))
+
+    @property
+    def fingerprint(self):
+        """
+        A hashable tuple describing the structure of the expression.  Two
+        expressions with equal fingerprints compute the same thing.
+        """
+        if "fingerprint" not in self._cache:
+            self._cache["fingerprint"] = self._fingerprint()
+        return self._cache["fingerprint"]
+
+    def _fingerprint(self):
+        parts = [self.op]
+        for arg in self.args:
+            if isinstance(arg, Expr):
+                parts.append(arg.fingerprint)
+                continue
+            try:
+                hash(arg)
+                parts.append((type(arg), arg))
+            except TypeError:
+                parts.append((type(arg), identitykey(arg)))
+        return tuple(parts)
+
+    def fields(self):
+        """
+        Returns the set of field names or keys this expression reads from
+        the item.  The item as a whole counts as the field None.
+        """
+        if self.op == ROOT:
+            return frozenset([None])
+        if isfield(self):
+            return frozenset([self.args[1]])
+        found = frozenset()
+        for arg in self.args:
+            if isinstance(arg, Expr):
+                found |= arg.fields()
+        return found
+
+    @property
+    def function(self):
+        """
+        The plain callable evaluating this expression for one item.
+        """
+        if "function" not in self._cache:
+            self._cache["function"] = self._compile()
+        return self._cache["function"]
+
+    def _compile(self):
+        if self.op == ITEM and self.args[0].op == ROOT:
+            return operator.itemgetter(self.args[1])
+        if self.op == CALL and self.args[0].op == ROOT:
+            base, name, callargs, kwargs = self.args
+            return operator.methodcaller(name, *callargs, **dict(kwargs))
+        path = attrpath(self)
+        if path is not None:
+            return operator.attrgetter(path)
+        return Generator().function(self)
+
+    def vectorized(self, columns):
+        """
+        Evaluates the expression over whole NumPy columns, where fields read
+        from columns give arrays and &, | and ~ are elementwise logical
+        and, or and not.  Returns None if the expression calls arbitrary
+        functions or methods, which only work on single items.
+        """
+        if "vector" not in self._cache:
+            if self._calls():
+                self._cache["vector"] = None
+            else:
+                self._cache["vector"] = Generator(vector=True).function(self)
+        function = self._cache["vector"]
+        return None if function is None else function(columns)
+
+    def _calls(self):
+        if self.op in (CALL, APPLY):
+            return True
+        return any(arg._calls() for arg in self.args
+                   if isinstance(arg, Expr))
+
+
+F = Expr(ROOT, ())
+
+
+class Row(dict):
+    """
+    A dict whose fields can be read as row["name"] or as row.name, so that
+    both F["name"] and F.name work on it.  Sources that produce records by
+    column name, such as tables and columns of arrays, yield these.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def field(name):
+    """
+    Returns an expression reading the named attribute of the item, for
+    names such as op or fields that F.name cannot reach.
+    """
+    return Expr(ATTR, (F, name))
+
+
+def const(value):
+    """
+    Returns an expression for a constant value.
+    """
+    return Expr(CONST, (value,))
+
+
+def compiled(fn):
+    """
+    Returns the plain callable for fn, which may be an expression or
+    already a function.
+    """
+    return fn.function if isinstance(fn, Expr) else fn
+
+
+def samekey(first, second):
+    """
+    Returns true if first and second are the same key selector, either the
+    same object or expressions with equal fingerprints.
+    """
+    if first is second:
+        return True
+    return (isinstance(first, Expr) and isinstance(second, Expr) and
+            first.fingerprint == second.fingerprint)
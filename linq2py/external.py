@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""
+Disk-backed helpers for operators whose working set can outgrow memory.
+
+Rows are pickled one after another into anonymous temporary files, called
+runs, which are deleted as soon as they are closed.
+"""
+
+import sys
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+__all__ = ["Budget", "Tracker", "readrun", "writerun"]
+
+
+class Budget(object):
+    """
+    Limits how much an operator may hold in memory before spilling to disk.
+
+    maxrows is a number of rows.  maxbytes is an approximate number of
+    bytes, measured with sys.getsizeof on each row, so objects the rows
+    refer to are not counted.  Either may be None.  tempdir is where runs are
+    written, defaulting to the system temporary directory.
+    """
+
+    def __init__(self, maxrows=None, maxbytes=None, tempdir=None):
+        if maxrows is None and maxbytes is None:
+            raise ValueError("A budget needs maxrows, maxbytes or both")
+        self.maxrows = maxrows
+        self.maxbytes = maxbytes
+        self.tempdir = tempdir
+
+    def tracker(self):
+        """
+        Returns a new Tracker counting rows against this budget.
+        """
+        return Tracker(self)
+
+
+class Tracker(object):
+    """
+    Counts the rows added to memory against a budget.  Calling it with a
+    row counts the row and returns True once the budget is exceeded, and
+    reset starts the count again.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.rows = 0
+        self.bytes = 0
+
+    def __call__(self, row):
+        budget = self.budget
+        self.rows += 1
+        if budget.maxbytes is not None:
+            self.bytes += sys.getsizeof(row)
+        return ((budget.maxrows is not None and
+                 self.rows >= budget.maxrows) or
+                (budget.maxbytes is not None and
+                 self.bytes >= budget.maxbytes))
+
+    def reset(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+def writerun(rows, tempdir=None):
+    """
+    Writes rows to a new temporary file and returns it.
+    """
+    run = tempfile.TemporaryFile(dir=tempdir)
+    pickler = pickle.Pickler(run, pickle.HIGHEST_PROTOCOL)
+    for row in rows:
+        pickler.dump(row)
+        # The pickler remembers every object it has written unless it is
+        # cleared, which would keep the whole run in memory.
+        pickler.clear_memo()
+    run.flush()
+    return run
+
+
+def readrun(run):
+    """
+    Yields the rows written to a run, from the start of the file.
+    """
+    run.seek(0)
+    unpickler = pickle.Unpickler(run)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
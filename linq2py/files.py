@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+"""
+Streaming sources over CSV, JSON lines and fixed width text files.
+
+Files are memory mapped and split into lines as they are read, so nothing
+is read ahead of the query and take(10) on a huge file only touches its
+first few lines.  Each line becomes a record that parses itself lazily:
+a CSV line is only split, a fixed width field only cut out, and a JSON
+line only decoded when a field is first read, and each field is converted
+with its type only when it is used.  A filter that reads one field pays
+for that field alone on the rows it rejects.
+
+A file source can be split into shards covering byte ranges of the file,
+which can be read independently, for example by separate processes.
+Each shard owns the lines that start inside its range.  Lines are split
+on newlines, so quoted CSV fields containing newlines are not supported.
+"""
+
+import copy
+import csv
+import json
+import mmap
+import os
+
+from . import plan
+from .source import Source
+
+__all__ = ["CsvFile", "FixedFile", "JsonLinesFile", "Record"]
+
+
+class Record(object):
+    """
+    One line of a file whose fields are parsed on first access.  Fields
+    can be read as record["name"] or record.name, and todict returns them
+    all.  Subclasses provide raw(name), the unconverted value of a field.
+    """
+
+    __slots__ = ("_line", "_layout", "_parsed", "_values")
+
+    def __init__(self, line, layout):
+        self._line = line
+        self._layout = layout
+        self._parsed = None
+        self._values = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        value = self.raw(name)
+        convert = self._layout.types.get(name)
+        if convert is not None:
+            value = convert(value)
+        self._values[name] = value
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self._layout.names)
+
+    def todict(self):
+        """
+        Returns every field of the record in a new dict.
+        """
+        return dict((name, self[name]) for name in self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.todict()
+        return self.todict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self._line)
+
+
+class CsvRecord(Record):
+
+    __slots__ = ()
+
+    def raw(self, name):
+        if self._parsed is None:
+            self._parsed = self._layout.fields(self._line)
+        index = self._layout.positions[name]
+        return self._parsed[index] if index < len(self._parsed) else None
+
+
+class FixedRecord(Record):
+
+    __slots__ = ()
+
+    def raw(self, name):
+        start, stop = self._layout.positions[name]
+        return self._line[start:stop].strip()
+
+
+class JsonRecord(Record):
+
+    __slots__ = ()
+
+    def raw(self, name):
+        if self._parsed is None:
+            self._parsed = json.loads(self._line)
+        return self._parsed[name]
+
+    def keys(self):
+        if self._parsed is None:
+            self._parsed = json.loads(self._line)
+        return list(self._parsed)
+
+
+class LineFile(Source):
+    """
+    Base class for a memory mapped text file read as one record per line,
+    from the lines starting in the byte range [start, stop).  Subclasses
+    set record, the Record class for their lines, and may set skip, the
+    number of bytes at the start of the file that are not data.
+    """
+
+    record = None
+
+    def __init__(self, path, types=None, start=0, stop=None):
+        self.path = path
+        self.types = types or {}
+        self.start = start
+        self.stop = stop
+        self.skip = 0
+
+    def query(self):
+        return (0, None)
+
+    def push(self, query, kind, arg):
+        if kind == plan.SLICE:
+            return plan.mergeslices(query, arg)
+        return None
+
+    def rows(self, query):
+        start, stop = query
+        count = 0
+        for line in self.lines():
+            if stop is not None and count >= stop:
+                return
+            if count >= start:
+                yield self.record(line, self)
+            count += 1
+
+    def lines(self):
+        """
+        Yields the lines starting in this file's byte range, without their
+        line endings.  Lines are copied out of the mapping one at a time.
+        """
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return
+        stop = size if self.stop is None else min(self.stop, size)
+        with open(self.path, "rb") as handle:
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                position = max(self.start, self.skip)
+                if position > self.skip and mapping[position - 1] != "\n":
+                    position = mapping.find("\n", position) + 1 or size
+                while position < stop:
+                    end = mapping.find("\n", position)
+                    if end < 0:
+                        end = size
+                    line = mapping[position:end]
+                    position = end + 1
+                    if line.endswith("\r"):
+                        line = line[:-1]
+                    if line:
+                        yield line
+            finally:
+                mapping.close()
+
+    def split(self, count):
+        """
+        Returns count sources over consecutive byte ranges of this one,
+        which between them read every line exactly once.
+        """
+        size = os.path.getsize(self.path)
+        start = max(self.start, self.skip)
+        stop = size if self.stop is None else min(self.stop, size)
+        bounds = [start + (stop - start) * n // count
+                  for n in range(count + 1)]
+        return [self.shard(first, last)
+                for first, last in zip(bounds, bounds[1:])]
+
+    def shard(self, start, stop):
+        shard = copy.copy(self)
+        shard.start = start
+        shard.stop = stop
+        return shard
+
+
+class CsvFile(LineFile):
+    """
+    A CSV file.  names are the column names, read from the first line
+    when header is set.  types maps column names to functions converting
+    their text, such as int.
+    """
+
+    record = CsvRecord
+
+    def __init__(self, path, delimiter=",", header=True, names=None,
+                 types=None, start=0, stop=None):
+        LineFile.__init__(self, path, types, start, stop)
+        self.delimiter = delimiter
+        if header:
+            with open(path, "rb") as handle:
+                first = handle.readline()
+            self.skip = len(first)
+            if names is None:
+                names = self.fields(first.rstrip("\r\n"))
+        self.names = list(names or [])
+        self.positions = dict((name, index)
+                              for index, name in enumerate(self.names))
+
+    def fields(self, line):
+        """
+        Returns the text of each field of a line.  Only lines containing
+        quotes go through the csv module.
+        """
+        if '"' in line:
+            return next(csv.reader([line], delimiter=self.delimiter))
+        return line.split(self.delimiter)
+
+
+class FixedFile(LineFile):
+    """
+    A fixed width text file.  fields is a list of (name, start, stop)
+    character positions, and each field is stripped of padding.
+    """
+
+    record = FixedRecord
+
+    def __init__(self, path, fields, types=None, start=0, stop=None):
+        LineFile.__init__(self, path, types, start, stop)
+        self.names = [name for name, first, last in fields]
+        self.positions = dict((name, (first, last))
+                              for name, first, last in fields)
+
+
+class JsonLinesFile(LineFile):
+    """
+    A file of one JSON object per line.
+    """
+
+    record = JsonRecord
+
+    def __init__(self, path, types=None, start=0, stop=None):
+        LineFile.__init__(self, path, types, start, stop)
+        self.names = []
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+"""
+Hash and sorted indexes over a list of rows held in memory.
+
+IndexedRows is a source over a list with indexes on key expressions.  A
+where predicate comparing an indexed key with a constant, such as
+F.user_id == 7, F.created >= start or F.kind.isin(kinds), and & and |
+combinations of such comparisons, is answered from the indexes instead
+of by testing every row.  Any other operator is left to the plan.  Rows
+always come back in list order, whichever index found them.
+
+A hash index answers == and isin.  A sorted index also answers <, <=, >
+and >= by bisecting, using Python's ordering of the keys.  Keys must be
+hashable for a hash index and comparable for a sorted index.  Indexes
+are built once, when the source is created, and are not updated if the
+rows change afterwards.
+"""
+
+import bisect
+import itertools
+
+from . import plan
+from .expr import AND, BINARY, CONST, ISIN, OR, compiled
+from .lookup import Lookup
+from .source import Source, isexpr
+
+__all__ = ["HashIndex", "IndexedRows", "SortedIndex"]
+
+# The comparison that means the same with its operands swapped.
+FLIPPED = {"eq": "eq", "lt": "gt", "le": "ge", "gt": "lt", "ge": "le"}
+
+
+class HashIndex(object):
+    """
+    The positions of the rows with each value of key.
+    """
+
+    def __init__(self, rows, key):
+        function = compiled(key)
+        self.key = key
+        self.lookup = Lookup(range(len(rows)),
+                             lambda position: function(rows[position]))
+
+    def positions(self, name, value):
+        """
+        Returns the sorted positions of the rows whose key compares with
+        value by the comparison name, or None if this index cannot tell.
+        For "isin", value is a collection of keys.
+        """
+        try:
+            if name == "eq":
+                return list(self.lookup[value])
+            if name == "isin":
+                return sorted(itertools.chain.from_iterable(
+                    self.lookup[key] for key in value))
+        except TypeError:
+            pass
+        return None
+
+
+class SortedIndex(object):
+    """
+    The positions of the rows in order of key, keeping list order for
+    rows with equal keys.
+    """
+
+    def __init__(self, rows, key):
+        function = compiled(key)
+        keys = [function(row) for row in rows]
+        self.key = key
+        self.order = sorted(range(len(rows)), key=keys.__getitem__)
+        self.keys = [keys[position] for position in self.order]
+
+    def bounds(self, name, value):
+        if name == "eq":
+            return (bisect.bisect_left(self.keys, value),
+                    bisect.bisect_right(self.keys, value))
+        if name == "lt":
+            return 0, bisect.bisect_left(self.keys, value)
+        if name == "le":
+            return 0, bisect.bisect_right(self.keys, value)
+        if name == "gt":
+            return bisect.bisect_right(self.keys, value), len(self.keys)
+        if name == "ge":
+            return bisect.bisect_left(self.keys, value), len(self.keys)
+        return None
+
+    def positions(self, name, value):
+        if name == "isin":
+            found = [self.positions("eq", key) for key in value]
+            return sorted(itertools.chain.from_iterable(found))
+        bounds = self.bounds(name, value)
+        if bounds is None:
+            return None
+        start, stop = bounds
+        return sorted(self.order[start:stop])
+
+
+KINDS = {"hash": HashIndex, "sorted": SortedIndex}
+
+
+def intersection(first, second):
+    keep = set(second)
+    return [position for position in first if position in keep]
+
+
+def union(first, second):
+    return sorted(set(first) | set(second))
+
+
+class IndexedRows(Source):
+    """
+    A list of rows with indexes on key expressions.  The query is None for
+    every row, otherwise the sorted positions of the selected rows.
+    """
+
+    def __init__(self, items, indexes=()):
+        self.items = items
+        self.indexes = tuple(indexes)
+
+    def __len__(self):
+        return len(self.items)
+
+    def withindex(self, key, kind="hash"):
+        """
+        Returns a new source over the same rows with an index of the given
+        kind, "hash" or "sorted", on the key expression added.
+        """
+        if kind not in KINDS:
+            raise ValueError(
+                "kind must be 'hash' or 'sorted', not %r" % kind)
+        if not isexpr(key):
+            raise TypeError(
+                "indexed keys must be expressions, such as F.user_id")
+        index = KINDS[kind](self.items, key)
+        return IndexedRows(self.items, self.indexes + (index,))
+
+    def query(self):
+        return None
+
+    def push(self, query, kind, arg):
+        if kind != plan.WHERE or not isexpr(arg):
+            return None
+        positions = self.match(arg)
+        if positions is None:
+            return None
+        if query is not None:
+            positions = intersection(query, positions)
+        return positions
+
+    def rows(self, query):
+        if query is None:
+            return self.items
+        return itertools.imap(self.items.__getitem__, query)
+
+    def match(self, pred):
+        """
+        Returns the sorted positions of the rows matching pred, or None if
+        the indexes cannot answer it.
+        """
+        if pred.op in (AND, OR):
+            first = self.match(pred.args[0])
+            if first is None:
+                return None
+            second = self.match(pred.args[1])
+            if second is None:
+                return None
+            if pred.op == AND:
+                return intersection(first, second)
+            return union(first, second)
+        if pred.op == ISIN:
+            key, values = pred.args
+            return self.find(key, "isin", values)
+        if pred.op != BINARY or pred.args[0] not in FLIPPED:
+            return None
+        name, left, right = pred.args
+        if right.op == CONST:
+            return self.find(left, name, right.args[0])
+        if left.op == CONST:
+            return self.find(right, FLIPPED[name], left.args[0])
+        return None
+
+    def find(self, key, name, value):
+        for index in self.indexes:
+            if index.key.fingerprint == key.fingerprint:
+                positions = index.positions(name, value)
+                if positions is not None:
+                    return positions
+        return None
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+Hash joins between two sequences.
+
+One side of the join is loaded into a multi-map of key to rows, the build
+table, and the other side is streamed past it.  Memory use is bounded by the
+build side, so the smaller sequence should be built whenever it is known.
+"""
+
+__all__ = ["buildtable", "choosebuild", "groupjoin", "hashjoin", "sizeof"]
+
+INNER = "inner"
+LEFT = "left"
+SEMI = "semi"
+ANTI = "anti"
+
+AUTO = "auto"
+OUTER = "outer"
+
+
+def sizeof(seq):
+    """
+    Returns the length of seq, or None if it cannot be known without
+    enumerating it.
+    """
+    try:
+        return len(seq)
+    except TypeError:
+        return None
+
+
+def buildtable(rows, keyselector):
+    """
+    Returns a dict mapping each key to the list of rows that produced it, in
+    the order the rows were seen.
+    """
+    table = {}
+    for row in rows:
+        key = keyselector(row)
+        if key in table:
+            table[key].append(row)
+        else:
+            table[key] = [row]
+    return table
+
+
+def choosebuild(outersize, innersize, build=AUTO):
+    """
+    Decides which side of a join to load into the build table.  An explicit
+    hint of "outer" or "inner" wins.  Otherwise the smaller side is built,
+    and when only one size is known that side is built, since the other may
+    be an unbounded stream.  With no sizes known the inner side is built.
+    """
+    if build in (OUTER, INNER):
+        return build
+    if build != AUTO:
+        raise ValueError(
+            "build must be one of 'auto', 'outer' or 'inner', not %r" % build)
+    if outersize is not None and innersize is not None:
+        return OUTER if outersize < innersize else INNER
+    if outersize is not None:
+        return OUTER
+    return INNER
+
+
+def hashjoin(
+        outer,
+        inner,
+        outerkeyselector,
+        innerkeyselector,
+        resultselector=None,
+        kind=INNER,
+        default=None,
+        build=INNER):
+    """
+    Yields the results of joining outer and inner with a hash join.
+
+    kind is one of "inner", "left", "semi" or "anti".  Inner and left joins
+    yield resultselector(outerrow, innerrow), with default standing in for
+    the inner row of unmatched outer rows in a left join.  Semi and anti
+    joins yield the outer rows that do, or do not, have a match.
+
+    build is the side to load into memory, either "inner" or "outer".  When
+    the inner side is built, results follow the order of the outer rows.
+    When the outer side is built, matches follow the order of the inner
+    rows, and any rows only a left or anti join needs are yielded last.
+    """
+    if build == INNER:
+        table = buildtable(inner, innerkeyselector)
+        for row in outer:
+            matches = table.get(outerkeyselector(row))
+            if kind == INNER:
+                if matches:
+                    for match in matches:
+                        yield resultselector(row, match)
+            elif kind == LEFT:
+                if matches:
+                    for match in matches:
+                        yield resultselector(row, match)
+                else:
+                    yield resultselector(row, default)
+            elif kind == SEMI:
+                if matches:
+                    yield row
+            elif not matches:
+                yield row
+        return
+
+    rows = list(outer)
+    table = buildtable(xrange(len(rows)),
+                       lambda index: outerkeyselector(rows[index]))
+    matched = set()
+    for match in inner:
+        indexes = table.get(innerkeyselector(match))
+        if not indexes:
+            continue
+        if kind in (INNER, LEFT):
+            for index in indexes:
+                yield resultselector(rows[index], match)
+        matched.update(indexes)
+    if kind == LEFT:
+        for index, row in enumerate(rows):
+            if index not in matched:
+                yield resultselector(row, default)
+    elif kind == SEMI:
+        for index, row in enumerate(rows):
+            if index in matched:
+                yield row
+    elif kind == ANTI:
+        for index, row in enumerate(rows):
+            if index not in matched:
+                yield row
+
+
+def groupjoin(outer, inner, outerkeyselector, innerkeyselector,
+              resultselector):
+    """
+    Yields resultselector(outerrow, innerrows) for every outer row, where
+    innerrows is the list of inner rows with a matching key.  The inner side
+    is always built, since every match must be known before an outer row
+    can be yielded.
+    """
+    table = buildtable(inner, innerkeyselector)
+    for row in outer:
+        yield resultselector(row, table.get(outerkeyselector(row), []))
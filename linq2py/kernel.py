@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+"""
+Code generation of single-pass kernels for query plans.
+
+A kernel is a generator function whose source is written out for one
+particular shape of operator chain.  Every predicate and selector is bound
+to a local variable and called inline from a single for loop, so a chain of
+ten operators costs one generator frame instead of ten.  Kernels are cached
+by shape, so queries with the same structure but different callables or
+different sources reuse the same compiled code.
+"""
+
+from . import plan
+
+__all__ = ["CompiledQuery", "compilekernel", "shapeof"]
+
+# The tokenizer refuses source indented more than 100 levels deep.  Chains
+# that would nest further are left to the interpreted executors.
+MAXDEPTH = 90
+
+cache = {}
+
+
+def flatten(ops):
+    """
+    Returns the optimized operator nodes with fused nodes expanded back into
+    their individual steps.
+    """
+    nodes = []
+    for kind, arg in plan.optimize(ops):
+        if kind == plan.FUSED:
+            nodes.extend(arg)
+        else:
+            nodes.append((kind, arg))
+    return nodes
+
+
+def shapeof(nodes):
+    """
+    Returns the cache key for a list of flattened operator nodes.  Only the
+    kinds of the operators matter, along with which bounds a slice uses.
+    """
+    shape = []
+    for kind, arg in nodes:
+        if kind == plan.SLICE:
+            shape.append((kind, arg[0] > 0, arg[1] is not None))
+        else:
+            shape.append(kind)
+    return tuple(shape)
+
+
+def argumentsof(nodes):
+    """
+    Returns the values passed to a kernel for a list of flattened operator
+    nodes, in the order the generated code expects them.
+    """
+    args = []
+    for kind, arg in nodes:
+        if kind == plan.SLICE:
+            start, stop = arg
+            if start > 0:
+                args.append(start)
+            if stop is not None:
+                args.append(stop)
+        else:
+            args.append(arg)
+    return args
+
+
+def generate(shape):
+    """
+    Writes the source of a kernel for the given shape.
+    """
+    params = []
+    setup = []
+    body = []
+    after = []
+    depth = 2
+
+    def emit(line):
+        body.append("    " * depth + line)
+
+    for n, node in enumerate(shape):
+        kind = node[0] if isinstance(node, tuple) else node
+        fn = "f%d" % n
+        if kind == plan.WHERE:
+            params.append(fn)
+            emit("if %s(item):" % fn)
+            depth += 1
+        elif kind == plan.SELECT:
+            params.append(fn)
+            emit("item = %s(item)" % fn)
+        elif kind == plan.OFTYPE:
+            params.append(fn)
+            emit("if isinstance(item, %s):" % fn)
+            depth += 1
+        elif kind == plan.WHEREI:
+            params.append(fn)
+            setup.append("i%d = 0" % n)
+            emit("i%d += 1" % n)
+            emit("if %s(item, i%d - 1):" % (fn, n))
+            depth += 1
+        elif kind == plan.SKIPWHILE:
+            params.append(fn)
+            setup.append("i%d = 0" % n)
+            setup.append("s%d = True" % n)
+            emit("if s%d and %s(item, i%d):" % (n, fn, n))
+            emit("    i%d += 1" % n)
+            emit("else:")
+            depth += 1
+            emit("s%d = False" % n)
+        elif kind == plan.TAKEWHILE:
+            params.append(fn)
+            setup.append("i%d = 0" % n)
+            emit("if not %s(item, i%d):" % (fn, n))
+            emit("    return")
+            emit("i%d += 1" % n)
+        elif kind == plan.SLICE:
+            kind, hasstart, hasstop = node
+            setup.append("p%d = 0" % n)
+            if hasstart:
+                params.append("b%d" % n)
+                emit("if p%d < b%d:" % (n, n))
+                emit("    p%d += 1" % n)
+                emit("else:")
+                depth += 1
+            emit("p%d += 1" % n)
+            if hasstop:
+                params.append("e%d" % n)
+                setup.insert(0, "if e%d <= %s:" % (n, "b%d" % n
+                                                   if hasstart else "0"))
+                setup.insert(1, "    return")
+                after.append("        if p%d >= e%d:" % (n, n))
+                after.append("            return")
+    emit("yield item")
+
+    lines = ["def kernel(seq%s):" % "".join(", " + p for p in params)]
+    lines.extend("    " + line for line in setup)
+    lines.append("    for item in seq:")
+    lines.extend(body)
+    lines.extend(after)
+    return "\n".join(lines) + "\n", depth
+
+
+def compilekernel(ops):
+    """
+    Returns a (kernel, args) pair for the given operator nodes.  Calling
+    kernel(seq, *args) yields the results of the plan applied to seq.
+    Returns (None, args) if the chain is too deeply nested to compile.
+    """
+    nodes = flatten(ops)
+    shape = shapeof(nodes)
+    args = argumentsof(nodes)
+    if shape not in cache:
+        source, depth = generate(shape)
+        if depth > MAXDEPTH:
+            cache[shape] = None
+        else:
+            namespace = {}
+            code = compile(source, "<linq2py kernel>", "exec")
+            exec(code, namespace)
+            cache[shape] = namespace["kernel"]
+    return cache[shape], args
+
+
+class CompiledQuery(object):
+    """
+    A re-iterable sequence that runs a compiled kernel over a source each
+    time it is enumerated.  Operators the source applies itself through
+    scan are left out of the kernel.
+    """
+
+    def __init__(self, source, ops):
+        self.source = source
+        self.ops = ops
+        self.kernel, self.args = compilekernel(ops)
+
+    def __iter__(self):
+        source, ops = plan.pushdown(self.source, self.ops)
+        if ops is self.ops:
+            kernel, args = self.kernel, self.args
+        else:
+            kernel, args = compilekernel(ops)
+        if kernel is None:
+            return iter(plan.execute(source, ops))
+        return kernel(source, *args)
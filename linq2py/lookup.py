@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""
+A read-only mapping of keys to groups of elements, built by tolookup.
+"""
+
+from collections import OrderedDict
+
+from .plan import identity
+
+__all__ = ["Lookup"]
+
+
+class Lookup(object):
+    """
+    Maps each key to a tuple of the elements that had it, in the order the
+    items were seen.  Keys are kept in the order they were first seen.
+    Looking up a key that no item had returns an empty tuple rather than
+    raising a KeyError.
+    """
+
+    def __init__(self, items=(), keyselector=identity,
+                 elementselector=identity):
+        groups = OrderedDict()
+        for item in items:
+            key = keyselector(item)
+            if key in groups:
+                groups[key].append(elementselector(item))
+            else:
+                groups[key] = [elementselector(item)]
+        self.groups = OrderedDict(
+            (key, tuple(group)) for key, group in groups.items())
+
+    def __getitem__(self, key):
+        return self.groups.get(key, ())
+
+    def __contains__(self, key):
+        return key in self.groups
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        """
+        Yields a (key, elements) pair for each key, like groupby.
+        """
+        return iter(self.groups.items())
+
+    def contains(self, key):
+        """
+        Returns true if any item had the key.
+        """
+        return key in self.groups
+
+    def count(self, key):
+        """
+        Returns the number of elements with the key.
+        """
+        return len(self[key])
+
+    def keys(self):
+        return list(self.groups)
+
+    def __repr__(self):
+        return "Lookup(%r)" % list(self.groups.items())
@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+
+"""
+Query results kept up to date as rows are inserted and deleted.
+
+A MaterializedQuery runs a chain of where, select and oftype over its
+rows once, then applies each insert or delete to the result alone, so a
+refresh costs time in proportion to the change rather than to all the
+rows.  Counts and sums, groups built with groupby, and inner joins of two
+materialized results are maintained the same way, by passing each added
+or removed result row on to the views built from it.
+
+Results keep the order their rows were inserted in, as if the query were
+run again over the rows.  Groups keep the position they were created in
+while any of their elements remain.  Sums are kept as running totals, so
+sums of floats may drift from a fresh sum by rounding.  min and max are
+worked out from the current rows when asked for.
+"""
+
+import collections
+import itertools
+from collections import OrderedDict
+
+from . import plan
+from .From import From
+from .expr import compiled
+from .ordering import Ordering
+from .plan import identity
+
+__all__ = ["Materialized", "MaterializedGroups", "MaterializedJoin",
+           "MaterializedQuery"]
+
+# Operators that look at one row at a time, so that the result of a delta
+# is the delta of the result.
+INCREMENTAL = (plan.WHERE, plan.SELECT, plan.OFTYPE)
+
+
+class Materialized(object):
+    """
+    Base class for incrementally maintained results.  Each result row has
+    a key that stays the same while the row is present.  Subclasses
+    provide items(), yielding (key, row) pairs in order, and call _added
+    and _removed as rows come and go, which keeps the count and total and
+    tells the views built from this one.
+    """
+
+    def __init__(self):
+        self.listeners = []
+        self.size = 0
+        self.total = 0
+
+    def __iter__(self):
+        return (row for key, row in self.items())
+
+    def __len__(self):
+        return self.size
+
+    def items(self):
+        raise NotImplementedError
+
+    def _added(self, key, row):
+        self.size += 1
+        if self.total is not None:
+            try:
+                self.total += row
+            except TypeError:
+                self.total = None
+        for listener in self.listeners:
+            listener.onadd(self, key, row)
+
+    def _removed(self, key, row):
+        self.size -= 1
+        if self.total is not None:
+            self.total -= row
+        for listener in self.listeners:
+            listener.onremove(self, key, row)
+
+    def average(self):
+        """
+        Returns the average of the rows from the running total and count.
+        """
+        return self.sum() / self.count()
+
+    def count(self):
+        """
+        Returns the number of rows without enumerating them.
+        """
+        return self.size
+
+    def groupby(self, keyselector, elementselector=identity):
+        """
+        Returns a MaterializedGroups grouping the rows by keyselector,
+        which is kept up to date as rows are inserted and deleted.
+        """
+        groups = MaterializedGroups(keyselector, elementselector)
+        for key, row in self.items():
+            groups.onadd(self, key, row)
+        self.listeners.append(groups)
+        return groups
+
+    def join(self, inner, outerkeyselector, innerkeyselector,
+             resultselector):
+        """
+        Returns a MaterializedJoin with the inner join of these rows and
+        those of inner, another Materialized, which is kept up to date as
+        rows are inserted into and deleted from either side.
+        """
+        if not isinstance(inner, Materialized):
+            raise TypeError("can only join another materialized query")
+        return MaterializedJoin(self, inner, outerkeyselector,
+                                innerkeyselector, resultselector)
+
+    def max(self):
+        return max(self)
+
+    def min(self):
+        return min(self)
+
+    def sum(self):
+        """
+        Returns the running total of the rows, or adds them up if they
+        could not be totalled as they arrived.
+        """
+        if self.total is None:
+            return sum(self)
+        return self.total
+
+    def tolist(self):
+        return list(self)
+
+
+class MaterializedQuery(Materialized):
+    """
+    The result of query, a From whose operators are only where, select and
+    oftype, kept up to date by insert and delete.  Rows to delete are found
+    by value, so they must be hashable unless key, such as F.id, gives a
+    hashable value identifying each row.  A deleted row that the query
+    filtered out is ignored.
+    """
+
+    def __init__(self, query, key=None):
+        Materialized.__init__(self)
+        if (type(query) is not From or
+                isinstance(query.source, (From, Ordering))):
+            raise ValueError(
+                "only a where, select and oftype chain over rows can be "
+                "maintained incrementally, not %s" % type(query).__name__)
+        for kind, arg in query.ops:
+            if kind not in INCREMENTAL:
+                raise ValueError(
+                    "only where, select and oftype can be maintained "
+                    "incrementally, not %s" % kind)
+        self.nodes = plan.optimize(query.ops)
+        self.key = None if key is None else compiled(key)
+        self.rows = OrderedDict()
+        self.serials = {}
+        self.counter = itertools.count()
+        self.insert(query.source)
+
+    def rowkey(self, row):
+        key = row if self.key is None else self.key(row)
+        try:
+            hash(key)
+        except TypeError:
+            raise TypeError(
+                "rows must be hashable unless a key selector is given")
+        return key
+
+    def outputs(self, row):
+        seq = (row,)
+        for kind, arg in self.nodes:
+            seq = plan.EXECUTORS[kind](seq, arg)
+        return seq
+
+    def items(self):
+        return iter(self.rows.items())
+
+    def insert(self, rows):
+        """
+        Adds the results of rows to the query.
+        """
+        for row in rows:
+            for output in self.outputs(row):
+                serial = next(self.counter)
+                key = self.rowkey(row)
+                self.serials.setdefault(key, collections.deque()) \
+                    .append(serial)
+                self.rows[serial] = output
+                self._added(serial, output)
+
+    def delete(self, rows):
+        """
+        Removes the results of rows from the query, taking the earliest
+        inserted copy of a row that was inserted more than once.  Raises a
+        ValueError for a row the query kept that was never inserted.
+        """
+        for row in rows:
+            key = self.rowkey(row)
+            serials = self.serials.get(key)
+            if not serials:
+                if any(True for output in self.outputs(row)):
+                    raise ValueError("%r is not in the query" % (row,))
+                continue
+            serial = serials.popleft()
+            if not serials:
+                del self.serials[key]
+            self._removed(serial, self.rows.pop(serial))
+
+
+class MaterializedGroups(object):
+    """
+    Groups of the rows of a Materialized by key.  Iterating gives (key,
+    elements) pairs like groupby, and each group's count and sum are
+    available without enumerating it.
+    """
+
+    def __init__(self, keyselector, elementselector=identity):
+        self.keyselector = compiled(keyselector)
+        self.elementselector = compiled(elementselector)
+        self.groups = OrderedDict()
+        self.totals = {}
+        self.keys_ = {}
+
+    def onadd(self, source, rowkey, row):
+        key = self.keyselector(row)
+        element = self.elementselector(row)
+        self.keys_[rowkey] = key
+        if key not in self.groups:
+            self.groups[key] = OrderedDict()
+            self.totals[key] = 0
+        self.groups[key][rowkey] = element
+        if self.totals[key] is not None:
+            try:
+                self.totals[key] += element
+            except TypeError:
+                self.totals[key] = None
+
+    def onremove(self, source, rowkey, row):
+        key = self.keys_.pop(rowkey)
+        element = self.groups[key].pop(rowkey)
+        if not self.groups[key]:
+            del self.groups[key]
+            del self.totals[key]
+        elif self.totals[key] is not None:
+            self.totals[key] -= element
+
+    def __getitem__(self, key):
+        return tuple(self.groups.get(key, {}).values())
+
+    def __contains__(self, key):
+        return key in self.groups
+
+    def __iter__(self):
+        return ((key, list(elements.values()))
+                for key, elements in self.groups.items())
+
+    def __len__(self):
+        return len(self.groups)
+
+    def average(self, key):
+        return self.sum(key) / self.count(key)
+
+    def count(self, key):
+        """
+        Returns the number of elements with the key.
+        """
+        return len(self.groups.get(key, ()))
+
+    def keys(self):
+        return list(self.groups)
+
+    def sum(self, key):
+        """
+        Returns the running total of the elements with the key.
+        """
+        if key not in self.groups:
+            return 0
+        if self.totals[key] is None:
+            return sum(self.groups[key].values())
+        return self.totals[key]
+
+    def tolist(self):
+        return list(self)
+
+
+class MaterializedJoin(Materialized):
+    """
+    The inner join of two Materialized results, in the same order as
+    From.join gives: by outer row, then by inner row.
+    """
+
+    def __init__(self, outer, inner, outerkeyselector, innerkeyselector,
+                 resultselector):
+        Materialized.__init__(self)
+        self.outer = outer
+        self.inner = inner
+        self.outerkeyselector = compiled(outerkeyselector)
+        self.innerkeyselector = compiled(innerkeyselector)
+        self.resultselector = resultselector
+        self.outerkeys = {}
+        self.innerkeys = {}
+        self.outerbykey = {}
+        self.innerbykey = {}
+        self.results = OrderedDict()
+        for key, row in list(inner.items()):
+            self.addinner(key, row)
+        for key, row in list(outer.items()):
+            self.addouter(key, row)
+        outer.listeners.append(self)
+        if inner is not outer:
+            inner.listeners.append(self)
+
+    def items(self):
+        for outerkey, pairs in self.results.items():
+            for innerkey, result in pairs.items():
+                yield (outerkey, innerkey), result
+
+    def onadd(self, source, key, row):
+        if source is self.inner:
+            self.addinner(key, row)
+        if source is self.outer:
+            self.addouter(key, row)
+
+    def onremove(self, source, key, row):
+        if source is self.outer:
+            self.removeouter(key)
+        if source is self.inner:
+            self.removeinner(key)
+
+    def addinner(self, key, row):
+        joinkey = self.innerkeyselector(row)
+        self.innerkeys[key] = joinkey
+        self.innerbykey.setdefault(joinkey, OrderedDict())[key] = row
+        for outerkey, outer in self.outerbykey.get(joinkey, {}).items():
+            result = self.resultselector(outer, row)
+            self.results[outerkey][key] = result
+            self._added((outerkey, key), result)
+
+    def addouter(self, key, row):
+        joinkey = self.outerkeyselector(row)
+        self.outerkeys[key] = joinkey
+        self.outerbykey.setdefault(joinkey, OrderedDict())[key] = row
+        pairs = self.results[key] = OrderedDict()
+        for innerkey, inner in self.innerbykey.get(joinkey, {}).items():
+            result = self.resultselector(row, inner)
+            pairs[innerkey] = result
+            self._added((key, innerkey), result)
+
+    def removeouter(self, key):
+        joinkey = self.outerkeys.pop(key)
+        dropped(self.outerbykey, joinkey, key)
+        for innerkey, result in self.results.pop(key).items():
+            self._removed((key, innerkey), result)
+
+    def removeinner(self, key):
+        joinkey = self.innerkeys.pop(key)
+        dropped(self.innerbykey, joinkey, key)
+        for outerkey in self.outerbykey.get(joinkey, {}):
+            result = self.results[outerkey].pop(key)
+            self._removed((outerkey, key), result)
+
+
+def dropped(index, joinkey, key):
+    """
+    Removes key from the rows with joinkey in index, and joinkey itself
+    once it has no rows left.
+    """
+    rows = index[joinkey]
+    del rows[key]
+    if not rows:
+        del index[joinkey]
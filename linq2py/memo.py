@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+Replayable sequences that buffer items as they are first read.
+
+Most queries are backed by generators, so they can only be enumerated
+once.  A Memo pulls items from its source only when a reader first asks
+for them and keeps them in a buffer, so any number of readers, whether
+running side by side or one after another, see the same items while the
+source is enumerated exactly once.
+
+A bounded memo keeps only the items that some open reader has not yet
+passed, so readers walking the sequence together need memory for the
+distance between the fastest and slowest of them rather than for the
+whole sequence.  Readers of a bounded memo must all be started before
+the first item is discarded.
+"""
+
+import threading
+import weakref
+
+__all__ = ["Memo"]
+
+
+class Memo(object):
+    """
+    A sequence that enumerates seq at most once, buffering its items for
+    every reader.  When bounded is set, items are discarded once every
+    open reader has passed them.
+    """
+
+    def __init__(self, seq, bounded=False):
+        self.seq = seq
+        self.bounded = bounded
+        self.iterator = None
+        self.done = False
+        self.items = []
+        self.offset = 0
+        self.readers = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        if self.offset:
+            raise ValueError(
+                "items of a shared sequence have already been discarded; "
+                "start every reader before reading")
+        reader = MemoReader(self)
+        if self.bounded:
+            self.readers.add(reader)
+        return reader
+
+    def item(self, index):
+        """
+        Returns the item at index, reading it from the source if no reader
+        has yet.  Raises StopIteration past the end of the source.
+        """
+        with self.lock:
+            position = index - self.offset
+            if position < len(self.items):
+                return self.items[position]
+            if self.done:
+                raise StopIteration
+            if self.iterator is None:
+                self.iterator = iter(self.seq)
+            try:
+                item = next(self.iterator)
+            except StopIteration:
+                self.done = True
+                self.iterator = None
+                raise
+            self.items.append(item)
+            return item
+
+    def release(self):
+        """
+        Discards the buffered items that every open reader has passed.
+        The buffer is only trimmed once at least half of it can go, so
+        each item is moved a constant number of times on average.
+        """
+        with self.lock:
+            end = self.offset + len(self.items)
+            low = min([reader.position for reader in self.readers] or [end])
+            passed = low - self.offset
+            if passed and passed * 2 >= len(self.items):
+                del self.items[:passed]
+                self.offset = low
+
+
+class MemoReader(object):
+    """
+    One enumeration of a Memo, from its first item.
+    """
+
+    def __init__(self, memo):
+        self.memo = memo
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        memo = self.memo
+        try:
+            item = memo.item(self.position)
+        except StopIteration:
+            if memo.bounded:
+                memo.readers.discard(self)
+                memo.release()
+            raise StopIteration
+        self.position += 1
+        if memo.bounded:
+            memo.release()
+        return item
+
+    __next__ = next
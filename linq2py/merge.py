@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+Streaming merge algorithms for sequences that are already sorted.
+
+Every function here expects its inputs to be in ascending order of the key
+they are given.  Only the rows sharing the current key on one side are ever
+held in memory, so arbitrarily large sorted inputs can be joined or compared.
+"""
+
+import heapq
+import itertools
+
+from .joins import ANTI, INNER, LEFT, SEMI
+
+__all__ = ["mergejoin", "mergegroupjoin", "intersect", "except_", "merge"]
+
+END = object()
+
+
+def groups(seq, keyselector):
+    """
+    Returns an iterator of (key, rows) pairs for runs of rows sharing a key.
+    """
+    return itertools.groupby(seq, keyselector)
+
+
+def mergejoin(
+        outer,
+        inner,
+        outerkeyselector,
+        innerkeyselector,
+        resultselector=None,
+        kind=INNER,
+        default=None):
+    """
+    Yields the results of joining two sorted sequences, with the same
+    meaning for kind and default as joins.hashjoin.  Results follow the
+    order of the outer rows.
+    """
+    outergroups = groups(outer, outerkeyselector)
+    innergroups = groups(inner, innerkeyselector)
+    innerkey, innerrows = next(innergroups, (END, None))
+    for outerkey, outerrows in outergroups:
+        while innerkey is not END and innerkey < outerkey:
+            innerkey, innerrows = next(innergroups, (END, None))
+        if innerkey is END or outerkey < innerkey:
+            if kind == LEFT:
+                for row in outerrows:
+                    yield resultselector(row, default)
+            elif kind == ANTI:
+                for row in outerrows:
+                    yield row
+            continue
+        if kind == SEMI:
+            for row in outerrows:
+                yield row
+        elif kind in (INNER, LEFT):
+            if not isinstance(innerrows, list):
+                innerrows = list(innerrows)
+            for row in outerrows:
+                for match in innerrows:
+                    yield resultselector(row, match)
+
+
+def mergegroupjoin(
+        outer,
+        inner,
+        outerkeyselector,
+        innerkeyselector,
+        resultselector):
+    """
+    Yields resultselector(outerrow, innerrows) for every row of a sorted
+    outer sequence, where innerrows is the list of matching inner rows.
+    """
+    innergroups = groups(inner, innerkeyselector)
+    innerkey, innerrows = next(innergroups, (END, None))
+    for outerkey, outerrows in groups(outer, outerkeyselector):
+        while innerkey is not END and innerkey < outerkey:
+            innerkey, innerrows = next(innergroups, (END, None))
+        if innerkey is END or outerkey < innerkey:
+            matches = []
+        else:
+            if not isinstance(innerrows, list):
+                innerrows = list(innerrows)
+            matches = innerrows
+        for row in outerrows:
+            yield resultselector(row, list(matches))
+
+
+def intersect(seq, other):
+    """
+    Yields each distinct item that appears in both sorted sequences.
+    """
+    othergroups = groups(other, None)
+    otherkey = next(othergroups, (END, None))[0]
+    for key, rows in groups(seq, None):
+        while otherkey is not END and otherkey < key:
+            otherkey = next(othergroups, (END, None))[0]
+        if otherkey is END:
+            return
+        if key == otherkey:
+            yield key
+
+
+def except_(seq, other):
+    """
+    Yields the items of a sorted sequence that do not appear in another
+    sorted sequence.
+    """
+    othergroups = groups(other, None)
+    otherkey = next(othergroups, (END, None))[0]
+    for key, rows in groups(seq, None):
+        while otherkey is not END and otherkey < key:
+            otherkey = next(othergroups, (END, None))[0]
+        if otherkey is END or key < otherkey:
+            for row in rows:
+                yield row
+
+
+def decorate(index, seq, keyselector):
+    counter = itertools.count()
+    for item in seq:
+        yield keyselector(item), index, next(counter), item
+
+
+def merge(sources, keyselector):
+    """
+    Lazily merges sorted sources into one sorted sequence.  Items with equal
+    keys come out in the order of their sources, then their positions.
+    """
+    decorated = [decorate(index, source, keyselector)
+                 for index, source in enumerate(sources)]
+    return (item for key, index, position, item in heapq.merge(*decorated))
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+
+"""
+Multi-key sorting used by OrderedFrom.
+
+An ordering is a list of (keyselector, descending) pairs.  Each key is
+computed once per row, the rows are decorated with their keys, and adjacent
+keys sharing a direction are sorted together in one pass.  Because Python's
+sort is stable, sorting the passes from the last key to the first gives a
+mixed ascending and descending order without negating any keys.
+"""
+
+import heapq
+from operator import itemgetter
+
+from .expr import compiled
+from .external import readrun, writerun
+
+__all__ = ["Ordering", "SortKey", "externalsort", "sortkey", "sortrows"]
+
+
+class SortKey(object):
+    """
+    A comparable wrapper around the key values of one row that honours the
+    direction of each key.
+    """
+
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for mine, theirs, descending in zip(
+                self.values, other.values, self.directions):
+            if mine < theirs:
+                return not descending
+            if theirs < mine:
+                return descending
+        return False
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __ne__(self, other):
+        return self.values != other.values
+
+
+def sortkey(keys):
+    """
+    Returns (keyselector, descending) for a single key function that orders
+    rows the same way as the given keys.
+    """
+    if len(keys) == 1:
+        return keys[0]
+    selectors = [keyselector for keyselector, descending in keys]
+    directions = [descending for keyselector, descending in keys]
+    if len(set(directions)) == 1:
+        return (lambda item: tuple([keyselector(item)
+                                    for keyselector in selectors]),
+                directions[0])
+    return (lambda item: SortKey([keyselector(item)
+                                  for keyselector in selectors], directions),
+            False)
+
+
+def directionruns(keys):
+    """
+    Returns (start, stop, descending) for each run of adjacent keys that
+    share a direction.
+    """
+    runs = []
+    start = 0
+    for index in range(1, len(keys) + 1):
+        if index == len(keys) or keys[index][1] != keys[start][1]:
+            runs.append((start, index, keys[start][1]))
+            start = index
+    return runs
+
+
+def sortrows(seq, keys):
+    """
+    Returns a new list with the items of seq sorted by the given keys.
+    """
+    if len(keys) == 1:
+        keyselector, descending = keys[0]
+        return sorted(seq, key=keyselector, reverse=descending)
+
+    selectors = [keyselector for keyselector, descending in keys]
+    rows = [(tuple([keyselector(item) for keyselector in selectors]), item)
+            for item in seq]
+    runs = directionruns(keys)
+    if len(runs) == 1:
+        rows.sort(key=itemgetter(0), reverse=runs[0][2])
+    else:
+        for start, stop, descending in reversed(runs):
+            rows.sort(key=lambda row: row[0][start:stop], reverse=descending)
+    return [item for keyvalues, item in rows]
+
+
+def externalsort(seq, keys, budget):
+    """
+    Yields the items of seq sorted by the given (keyselector, descending)
+    keys, holding at most one budget's worth of rows in memory at a time.
+
+    Rows are collected until the budget is exceeded, sorted, and spilled as
+    a run.  The runs are then merged lazily, so stopping early only reads
+    the start of each run.
+    """
+    selectors = [keyselector for keyselector, descending in keys]
+    directions = [descending for keyselector, descending in keys]
+    recordkeys = [((lambda record, index=index: record[0][index]),
+                   descending)
+                  for index, descending in enumerate(directions)]
+    full = budget.tracker()
+    runs = []
+    buffer = []
+    try:
+        for position, item in enumerate(seq):
+            values = tuple([keyselector(item) for keyselector in selectors])
+            buffer.append((values, position, item))
+            if full(item):
+                runs.append(writerun(sortrows(buffer, recordkeys),
+                                     budget.tempdir))
+                buffer = []
+                full.reset()
+        buffer = sortrows(buffer, recordkeys)
+        if not runs:
+            for values, position, item in buffer:
+                yield item
+            return
+
+        def decorate(records):
+            for values, position, item in records:
+                yield SortKey(values, directions), position, item
+
+        sources = [decorate(readrun(run)) for run in runs]
+        sources.append(decorate(buffer))
+        for key, position, item in heapq.merge(*sources):
+            yield item
+    finally:
+        for run in runs:
+            run.close()
+
+
+class Ordering(object):
+    """
+    A re-iterable sequence that sorts its source each time it is
+    enumerated.  When given an external.Budget, the sort spills sorted runs
+    to disk instead of holding every row in memory.
+
+    When seq is a query over a source that can order rows itself, as
+    described in source.Source, the source is asked to do so instead.
+    """
+
+    def __init__(self, seq, keys, budget=None):
+        self.seq = seq
+        self.keys = tuple(keys)
+        self.functions = tuple((compiled(keyselector), descending)
+                               for keyselector, descending in self.keys)
+        self.budget = budget
+
+    def pushed(self, limit=None):
+        """
+        Returns the rows as ordered by the underlying source, or None if it
+        cannot order them.
+        """
+        ordered = getattr(getattr(self.seq, "source", None), "ordered", None)
+        if ordered is None:
+            return None
+        return ordered(self.seq.ops, self.keys, limit)
+
+    def __iter__(self):
+        rows = self.pushed()
+        if rows is not None:
+            return iter(rows)
+        if self.budget is not None:
+            return externalsort(self.seq, self.functions, self.budget)
+        return iter(sortrows(self.seq, self.functions))
+
+    def head(self, count):
+        """
+        Returns a list of the first count items in order, selecting them
+        with a heap in O(n log count) time and O(count) memory.
+        """
+        if count <= 0:
+            return []
+        rows = self.pushed(count)
+        if rows is not None:
+            return list(rows)
+        keyselector, descending = sortkey(self.functions)
+        if descending:
+            return heapq.nlargest(count, self.seq, key=keyselector)
+        return heapq.nsmallest(count, self.seq, key=keyselector)
+
+    def first(self, pred=None):
+        """
+        Returns the first item in order that matches pred, or None if there
+        is no such item, without sorting.
+        """
+        return self.extreme(pred, last=False)[1]
+
+    def last(self, pred=None):
+        """
+        Returns the last item in order that matches pred, or raises an
+        IndexError if there is no such item, without sorting.
+        """
+        found, item = self.extreme(pred, last=True)
+        if not found:
+            raise IndexError(
+                "No items in the sequence matched the given predicate")
+        return item
+
+    def extreme(self, pred, last):
+        """
+        Scans for the first or last matching item in order.  Returns a
+        (found, item) pair.
+        """
+        keyselector, descending = sortkey(self.functions)
+        found = False
+        best = bestkey = None
+        for item in self.seq:
+            if pred is not None and not pred(item):
+                continue
+            key = keyselector(item)
+            if not found:
+                found = True
+                best, bestkey = item, key
+                continue
+            if descending:
+                before = bestkey < key
+            else:
+                before = key < bestkey
+            # A stable sort puts later items after earlier ones with equal
+            # keys, so last replaces on ties and first does not.
+            if before != last:
+                best, bestkey = item, key
+        return found, best
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+
+"""
+Process pool execution for From.asparallel.
+
+The source is cut into chunks which are sent to a multiprocessing pool.
+Each worker runs the recorded where, select, oftype and selectmany stages
+over its chunk as one fused plan and sends the results back.  The stages
+are pickled once per worker when the pool starts, so they must be module
+level functions rather than lambdas or nested functions.
+
+Aggregations also run a reducer over each chunk in the worker, so only one
+partial result per chunk comes back to be combined.
+"""
+
+import itertools
+import multiprocessing
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from . import plan
+from .From import From
+from .plan import identity
+
+__all__ = ["ParallelFrom"]
+
+SELECTMANY = "selectmany"
+
+# Stages that keep one result per source item, so the position of an item
+# in the source is still known after them.
+KEEPCOUNT = (plan.SELECT,)
+
+# The stages and chunk reducer set in each worker process by the pool
+# initializer.
+stages = ()
+reducer = None
+
+
+def checkpicklable(ops):
+    """
+    Raises a TypeError naming the problem if ops cannot be sent to worker
+    processes.
+    """
+    try:
+        pickle.dumps(ops, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as error:
+        raise TypeError(
+            "asparallel stages must be picklable to run in worker "
+            "processes; use module level functions instead of lambdas, "
+            "nested functions or bound methods of unpicklable objects "
+            "(%s)" % error)
+
+
+def setstages(ops, chunkreducer=None):
+    global stages, reducer
+    stages = ops
+    reducer = chunkreducer
+
+
+def flatvalue(orig, flatval):
+    return flatval
+
+
+def selectmanychunk(seq, selectors, offset):
+    collectionselector, resultselector = selectors
+    for index, row in enumerate(seq, offset):
+        for item in collectionselector(row, index):
+            yield resultselector(row, item)
+
+
+def runchunk(task):
+    """
+    Runs the worker's stages over one (offset, chunk) task and returns the
+    results as a list, or the worker's reducer applied to that list.
+    """
+    offset, chunk = task
+    seq = chunk
+    pending = []
+    for kind, arg in stages:
+        if kind == SELECTMANY:
+            seq = selectmanychunk(plan.execute(seq, pending), arg, offset)
+            pending = []
+        else:
+            pending.append((kind, arg))
+    results = list(plan.execute(seq, pending))
+    if reducer is None:
+        return results
+    function, args = reducer
+    return function(results, offset, *args)
+
+
+def countchunk(items, offset, pred):
+    if pred is None:
+        return sum(1 for item in items)
+    return sum(1 for item in items if pred(item))
+
+
+def sumchunk(items, offset, selector):
+    return sum(itertools.ifilter(selector, items))
+
+
+def minchunk(items, offset, pred):
+    matched = filter(pred, items)
+    return (True, min(matched)) if matched else (False, None)
+
+
+def maxchunk(items, offset, pred):
+    matched = filter(pred, items)
+    return (True, max(matched)) if matched else (False, None)
+
+
+def averagechunk(items, offset):
+    return sum(items), len(items)
+
+
+def aggregatechunk(items, offset, accumulatorfn, start):
+    """
+    Folds a chunk from start[0], or from its first item when start is
+    empty.  Returns (False, None) for an empty chunk without a start.
+    """
+    if start:
+        return True, reduce(accumulatorfn, items, start[0])
+    return (True, reduce(accumulatorfn, items)) if items else (False, None)
+
+
+def groupchunk(items, offset, keyfunc, elementfunc, accumulatorfn, start):
+    """
+    Groups a chunk and returns (key, value) pairs in the order the keys
+    were first seen.  Each value is a list of elements, or with
+    accumulatorfn, the group folded from start[0], or from its first
+    element when start is empty.
+    """
+    groups = OrderedDict()
+    for item in items:
+        key = keyfunc(item)
+        value = elementfunc(item)
+        if key not in groups:
+            if accumulatorfn is None:
+                value = [value]
+            elif start:
+                value = accumulatorfn(start[0], value)
+            groups[key] = value
+        elif accumulatorfn is None:
+            groups[key].append(value)
+        else:
+            groups[key] = accumulatorfn(groups[key], value)
+    return list(groups.items())
+
+
+def chunked(seq, chunksize):
+    """
+    Yields (offset, chunk) pairs where chunk is a list of up to chunksize
+    items and offset is the position of its first item in seq.
+    """
+    iterator = iter(seq)
+    offset = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def execute(source, ops, workers, chunksize, ordered, chunkreducer=None):
+    """
+    Yields the results of running ops over source in a process pool, one
+    list per chunk, or one partial result per chunk when chunkreducer is a
+    (function, args) pair to run over each list.  The pool is shut down
+    when the results are exhausted or abandoned.
+
+    The pool reads its tasks from a background thread, which would
+    otherwise chunk the entire source up front, so only two chunks per
+    worker are allowed in flight at once.
+    """
+    checkpicklable((ops, chunkreducer))
+    workers = workers or multiprocessing.cpu_count()
+    window = threading.Semaphore(workers * 2)
+    stopped = []
+
+    def tasks():
+        for task in chunked(source, chunksize):
+            window.acquire()
+            if stopped:
+                return
+            yield task
+
+    pool = multiprocessing.Pool(workers, setstages, (ops, chunkreducer))
+    try:
+        if ordered:
+            results = pool.imap(runchunk, tasks())
+        else:
+            results = pool.imap_unordered(runchunk, tasks())
+        for result in results:
+            window.release()
+            yield result
+        pool.close()
+    finally:
+        stopped.append(True)
+        window.release()
+        pool.terminate()
+        pool.join()
+
+
+class ParallelFrom(From):
+
+    def __init__(self, seq, workers=None, chunksize=1000, ordered=True):
+        """
+        Create a new ParallelFrom that runs where, select, cast, oftype and
+        selectmany in a pool of worker processes.  This is what asparallel
+        returns.
+        """
+        From.__init__(self, seq)
+        self.workers = workers
+        self.chunksize = chunksize
+        self.ordered = ordered
+
+    @property
+    def seq(self):
+        """
+        The sequence produced by running the recorded stages in the pool.
+        """
+        if not self.ops:
+            return self.source
+        return itertools.chain.from_iterable(execute(
+            self.source, self.ops, self.workers, self.chunksize,
+            self.ordered))
+
+    def _partials(self, function, *args):
+        return execute(self.source, self.ops, self.workers, self.chunksize,
+                       self.ordered, (function, args))
+
+    def _extreme(self, function, pred, pick):
+        found = [value for matched, value in self._partials(function, pred)
+                 if matched]
+        return pick(found)
+
+    def _derive(self, op):
+        query = ParallelFrom(
+            self.source, self.workers, self.chunksize, self.ordered)
+        query.ops = self.ops + (op,)
+        return query
+
+    def _chain(self, kind, arg):
+        if kind in plan.FUSIBLE:
+            return self._derive((kind, arg))
+        return self.asequential()._chain(kind, arg)
+
+    def aggregate(self, accumulatorfn, seed=0, resultfn=identity,
+                  combinefn=None):
+        """
+        Applies the accumulator to each chunk in the worker processes, then
+        combines the partial results.  The accumulator and combinefn must be
+        associative, and commutative as well when the query is not ordered.
+
+        Without combinefn, each chunk is folded from its first item and the
+        seed is applied once, when the partial results are combined with
+        the accumulator, so the result matches From.aggregate.  A separate
+        combinefn is for accumulators whose results are not items, such as
+        counts.  Each chunk is then folded from seed, which must leave a
+        value unchanged when combined with it, such as 0 for addition.
+        """
+        if combinefn is None:
+            partials = [value for matched, value in self._partials(
+                aggregatechunk, accumulatorfn, ()) if matched]
+            return resultfn(reduce(accumulatorfn, partials, seed))
+        partials = [value for matched, value in self._partials(
+            aggregatechunk, accumulatorfn, (seed,))]
+        if not partials:
+            return resultfn(seed)
+        return resultfn(reduce(combinefn, partials))
+
+    def asequential(self):
+        """
+        Returns a new From that runs any further operators in this process.
+        Stages recorded so far still run in the pool.
+        """
+        return From(self)
+
+    def average(self):
+        """
+        Calculates the average of a numeric sequence from per-chunk totals.
+        """
+        total = count = 0
+        for chunktotal, chunkcount in self._partials(averagechunk):
+            total += chunktotal
+            count += chunkcount
+        return total / count
+
+    def count(self, pred=None):
+        """
+        Counts the items that match the predicate, counting each chunk in
+        the worker processes.
+        """
+        return sum(self._partials(countchunk, pred))
+
+    def groupby(
+            self,
+            keyfunc=identity,
+            elementfunc=identity,
+            resultfunc=identity,
+            maxrows=None,
+            maxbytes=None,
+            tempdir=None,
+            preserveorder=True,
+            sorted=False,
+            accumulatorfn=None,
+            seed=0,
+            combinefn=None):
+        """
+        Groups items across the worker processes.  Each chunk is grouped in
+        a worker, and the groups of each chunk are merged into the result
+        in this process as they arrive, so only the merged groups and the
+        chunks in flight are held in memory.  Groups come back in the order
+        their keys were first seen.
+
+        With accumulatorfn, each chunk folds its groups into values, which
+        are merged across chunks the same way aggregate combines its
+        partial results: from their first elements with the seed applied
+        once, or from seed when a separate combinefn is given.
+
+        The spilling and sorted modes of From.groupby run in this process.
+        """
+        if sorted or maxrows is not None or maxbytes is not None:
+            return self.asequential().groupby(
+                keyfunc, elementfunc, resultfunc, maxrows, maxbytes, tempdir,
+                preserveorder, sorted, accumulatorfn, seed)
+        if accumulatorfn is None:
+            combinefn, start, final = None, (), ()
+        elif combinefn is None:
+            combinefn, start, final = accumulatorfn, (), (seed,)
+        else:
+            start, final = (seed,), ()
+        merged = OrderedDict()
+        for groups in execute(
+                self.source, self.ops, self.workers, self.chunksize, True,
+                (groupchunk, (keyfunc, elementfunc, accumulatorfn, start))):
+            for key, value in groups:
+                if key not in merged:
+                    merged[key] = value
+                elif combinefn is None:
+                    merged[key].extend(value)
+                else:
+                    merged[key] = combinefn(merged[key], value)
+        if final:
+            for key, value in merged.iteritems():
+                merged[key] = combinefn(final[0], value)
+        return From(resultfunc(group) for group in merged.iteritems())
+
+    def max(self, pred=identity):
+        """
+        Returns the highest item that meets the predicate, taking the
+        highest of each chunk in the worker processes.
+        """
+        return self._extreme(maxchunk, pred, max)
+
+    def min(self, pred=identity):
+        """
+        Returns the smallest item that meets the predicate, taking the
+        smallest of each chunk in the worker processes.
+        """
+        return self._extreme(minchunk, pred, min)
+
+    def selectmany(self, collectionselector, resultselector=flatvalue):
+        """
+        Flattens the collection selected from each item, as From.selectmany
+        does, in the worker processes.  If an earlier parallel stage may
+        drop or add items, the index passed to collectionselector can only
+        be known sequentially, so the flattening runs in this process.
+
+        The index passed to collectionselector is the position of the item
+        in the source, as it is for From.selectmany.
+        """
+        if all(kind in KEEPCOUNT for kind, arg in self.ops):
+            return self._derive(
+                (SELECTMANY, (collectionselector, resultselector)))
+        return self.asequential().selectmany(
+            collectionselector, resultselector)
+
+    def sum(self, selector=identity):
+        """
+        Returns the sum of the items that match the selector, summing each
+        chunk in the worker processes.
+        """
+        return sum(self._partials(sumchunk, selector))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+"""
+Grace hash partitioning for groupby and groupjoin under a memory budget.
+
+Rows are grouped in memory until the budget is exceeded.  From then on
+every row, including those already grouped, is written to one of several
+partition files by the hash of its key, and the partitions are grouped one
+at a time.  A partition that still does not fit is split again with a
+different hash, up to a fixed depth, after which it is grouped in memory
+regardless.
+"""
+
+import itertools
+import tempfile
+from operator import itemgetter
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .external import readrun
+from .ordering import externalsort
+
+__all__ = ["spillgroupby", "spillgroupjoin", "writepartitions"]
+
+PARTITIONS = 16
+MAXDEPTH = 4
+
+
+def writepartitions(records, keyindex, depth, tempdir=None):
+    """
+    Writes each record to one of PARTITIONS temporary files chosen by the
+    hash of record[keyindex], and returns the files.  depth salts the hash
+    so that splitting a partition again spreads its keys out.
+    """
+    runs = [tempfile.TemporaryFile(dir=tempdir) for n in range(PARTITIONS)]
+    picklers = [pickle.Pickler(run, pickle.HIGHEST_PROTOCOL) for run in runs]
+    for record in records:
+        pickler = picklers[hash((depth, record[keyindex])) % PARTITIONS]
+        pickler.dump(record)
+        pickler.clear_memo()
+    for run in runs:
+        run.flush()
+    return runs
+
+
+def closeall(runs):
+    for run in runs:
+        run.close()
+
+
+def grouprecords(records, budget, depth, state):
+    """
+    Yields [firstposition, key, elements] for each key among records of
+    (position, key, element).  Groups come out in first-seen order unless
+    the budget forced a spill, in which case state["spilled"] is set before
+    the first group is yielded.
+    """
+    full = budget.tracker()
+    table = {}
+    order = []
+    records = iter(records)
+    overflow = False
+    for position, key, element in records:
+        group = table.get(key)
+        if group is None:
+            group = table[key] = [position, key, []]
+            order.append(group)
+        group[2].append(element)
+        if full(element) and depth < MAXDEPTH:
+            overflow = True
+            break
+    if not overflow:
+        for group in order:
+            yield group
+        return
+
+    state["spilled"] = True
+    grouped = ((group[0], group[1], element)
+               for group in order for element in group[2])
+    runs = writepartitions(itertools.chain(grouped, records), 1, depth,
+                           budget.tempdir)
+    table = order = grouped = None
+    try:
+        for run in runs:
+            for group in grouprecords(readrun(run), budget, depth + 1, state):
+                yield group
+    finally:
+        closeall(runs)
+
+
+def inorder(groups, budget, state):
+    """
+    Yields groups of [position, ...] in position order.  If grouping spilled
+    to disk the groups are sorted externally, otherwise they already are.
+    """
+    groups = iter(groups)
+    first = next(groups, None)
+    if first is None:
+        return
+    groups = itertools.chain([first], groups)
+    if state.get("spilled"):
+        groups = externalsort(groups, ((itemgetter(0), False),), budget)
+    for group in groups:
+        yield group
+
+
+def spillgroupby(seq, keyfunc, elementfunc, budget, preserveorder=True):
+    """
+    Yields (key, elements) pairs like groupby while holding at most one
+    budget's worth of elements in memory.  With preserveorder, groups come
+    out in the order their keys were first seen, otherwise in partition
+    order once a spill has happened.
+    """
+    state = {}
+    records = ((position, keyfunc(item), elementfunc(item))
+               for position, item in enumerate(seq))
+    groups = grouprecords(records, budget, 0, state)
+    if preserveorder:
+        groups = inorder(groups, budget, state)
+    for position, key, elements in groups:
+        yield key, elements
+
+
+def joinpartition(innerrecords, outerrecords, budget, depth, state):
+    """
+    Yields [position, outerrow, matches] for outer records of (key,
+    position, row) against inner records of (key, row).
+    """
+    full = budget.tracker()
+    table = {}
+    innerrecords = iter(innerrecords)
+    overflow = False
+    for key, row in innerrecords:
+        if key in table:
+            table[key].append(row)
+        else:
+            table[key] = [row]
+        if full(row) and depth < MAXDEPTH:
+            overflow = True
+            break
+    if not overflow:
+        for key, position, row in outerrecords:
+            yield [position, row, table.get(key, [])]
+        return
+
+    state["spilled"] = True
+    built = ((key, row) for key, rows in table.items() for row in rows)
+    innerruns = writepartitions(itertools.chain(built, innerrecords), 0,
+                                depth, budget.tempdir)
+    table = built = None
+    outerruns = writepartitions(outerrecords, 0, depth, budget.tempdir)
+    try:
+        for innerrun, outerrun in zip(innerruns, outerruns):
+            for result in joinpartition(readrun(innerrun), readrun(outerrun),
+                                        budget, depth + 1, state):
+                yield result
+    finally:
+        closeall(innerruns)
+        closeall(outerruns)
+
+
+def spillgroupjoin(
+        outer,
+        inner,
+        outerkeyselector,
+        innerkeyselector,
+        resultselector,
+        budget,
+        preserveorder=True):
+    """
+    Yields the results of groupjoin while holding at most one budget's
+    worth of inner rows in memory.  When the inner side does not fit, both
+    sides are partitioned by key and joined one partition at a time.  With
+    preserveorder, results follow the order of the outer rows.
+    """
+    state = {}
+    innerrecords = ((innerkeyselector(row), row) for row in inner)
+    outerrecords = ((outerkeyselector(row), position, row)
+                    for position, row in enumerate(outer))
+    results = joinpartition(innerrecords, outerrecords, budget, 0, state)
+    if preserveorder:
+        results = inorder(results, budget, state)
+    for position, row, matches in results:
+        yield resultselector(row, matches)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+"""
+Logical query plans used by From.
+
+A plan is a source iterable plus a tuple of operator nodes.  Nothing is
+executed until a terminal method asks for the sequence, at which point the
+nodes are optimized and turned into a chain of executors.
+
+A source with a scan(ops) method is first offered the simplified nodes and
+may apply a leading run of them itself, as described in source.Source.
+Only the nodes it did not apply are executed here.
+
+A plan that only selects and slices a list, tuple, xrange or array is not
+run as a chain of executors at all.  It becomes a views.SequenceView, which
+keeps len, indexing and reversing cheap for the methods of From that use
+them.
+"""
+
+import itertools
+
+from .expr import Expr, compiled
+from .views import SequenceView, issequence
+
+__all__ = ["identity", "optimize", "execute", "pushdown", "simplify",
+           "view"]
+
+WHERE = "where"
+SELECT = "select"
+OFTYPE = "oftype"
+WHEREI = "wherei"
+SKIPWHILE = "skipwhile"
+TAKEWHILE = "takewhile"
+SLICE = "slice"
+FUSED = "fused"
+
+# Only ever offered to sources, with a tuple of (keyselector, descending)
+# pairs, when an ordered query is enumerated.  It is never executed here.
+ORDERBY = "orderby"
+
+# Operators that map or filter a single item without looking at its
+# neighbours.  Adjacent runs of these are fused into one node, which runs
+# a where and select pair as one generator and longer runs as a chain of
+# itertools iterators.
+FUSIBLE = (WHERE, SELECT, OFTYPE)
+
+# Operators that only drop items and never change them, so a sorted
+# sequence is still sorted afterwards.
+KEEPSORT = (WHERE, OFTYPE, WHEREI, SKIPWHILE, TAKEWHILE, SLICE)
+
+
+def identity(x):
+    return x
+
+
+def mergeslices(first, second):
+    """
+    Combines two (start, stop) slices applied one after the other into a
+    single slice over the original sequence.
+    """
+    start1, stop1 = first
+    start2, stop2 = second
+    start = start1 + start2
+    stops = []
+    if stop1 is not None:
+        stops.append(stop1)
+    if stop2 is not None:
+        stops.append(start1 + stop2)
+    stop = min(stops) if stops else None
+    if stop is not None and stop < start:
+        start = stop
+    return start, stop
+
+
+def simplify(ops):
+    """
+    Returns a new list of operator nodes that produces the same results as
+    ops, with identity selects dropped, adjacent slices collapsed and
+    adjacent where expressions combined into one expression.
+    """
+    reduced = []
+    for kind, arg in ops:
+        if (kind == WHERE and isinstance(arg, Expr) and reduced and
+                reduced[-1][0] == WHERE and isinstance(reduced[-1][1], Expr)):
+            arg = reduced.pop()[1] & arg
+        if kind == SELECT and arg is identity:
+            continue
+        if kind == SLICE:
+            if reduced and reduced[-1][0] == SLICE:
+                arg = mergeslices(reduced.pop()[1], arg)
+            if arg == (0, None):
+                continue
+        reduced.append((kind, arg))
+    return reduced
+
+
+def optimize(ops):
+    """
+    Returns a new list of operator nodes that produces the same results as
+    ops.  The nodes are simplified, every expression is replaced by its
+    compiled function and runs of where, select and oftype are fused into a
+    single node.
+    """
+    reduced = [(kind, compiled(arg)) if kind in (WHERE, SELECT) else
+               (kind, arg) for kind, arg in simplify(ops)]
+
+    optimized = []
+    run = []
+    for node in reduced + [None]:
+        if node is not None and node[0] in FUSIBLE:
+            run.append(node)
+            continue
+        if len(run) == 1:
+            optimized.append(run[0])
+        elif run:
+            optimized.append((FUSED, tuple(run)))
+        run = []
+        if node is not None:
+            optimized.append(node)
+    return optimized
+
+
+def execute(source, ops):
+    """
+    Builds an iterable over source with every operator node applied.  When
+    there is nothing to apply, the source itself is returned.
+
+    Sources that can produce their first n items more cheaply than by
+    enumerating everything provide a head(n) method, which is used when the
+    plan starts with a bounded slice.
+    """
+    if ops:
+        seq = view(source, ops)
+        if seq is not None:
+            return seq
+    source, ops = pushdown(source, ops)
+    nodes = optimize(ops)
+    seq = source
+    if nodes and nodes[0][0] == SLICE and hasattr(source, "head"):
+        start, stop = nodes[0][1]
+        if stop is not None:
+            seq = source.head(stop)
+            nodes[0] = (SLICE, (start, None))
+    for kind, arg in nodes:
+        seq = EXECUTORS[kind](seq, arg)
+    return seq
+
+
+def pushdown(source, ops):
+    """
+    Offers the simplified ops to source if it has a scan method.  Returns
+    the sequence to read and the ops that still have to be applied to it.
+    """
+    scan = getattr(source, "scan", None)
+    if scan is None or not ops:
+        return source, ops
+    ops = simplify(ops)
+    seq, consumed = scan(tuple(ops))
+    return seq, ops[consumed:]
+
+
+def view(source, ops):
+    """
+    Returns a SequenceView of source with ops applied, or None unless
+    source supports len and indexing and ops only select and slice.
+    """
+    if not issequence(source):
+        return None
+    ops = simplify(ops)
+    if any(kind not in (SELECT, SLICE) for kind, arg in ops):
+        return None
+    seq = source if isinstance(source, SequenceView) else SequenceView(source)
+    for kind, arg in ops:
+        if kind == SELECT:
+            seq = seq.select(compiled(arg))
+        else:
+            seq = seq.slice(*arg)
+    return seq
+
+
+def runwhere(seq, pred):
+    return itertools.ifilter(pred, seq)
+
+
+def runselect(seq, fn):
+    return itertools.imap(fn, seq)
+
+
+def runoftype(seq, type_):
+    return (item for item in seq if isinstance(item, type_))
+
+
+def runwherei(seq, pred):
+    return (item for index, item in enumerate(seq) if pred(item, index))
+
+
+def runskipwhile(seq, pred):
+    enumerator = enumerate(seq)
+    for index, item in enumerator:
+        if not pred(item, index):
+            yield item
+            break
+    for index, item in enumerator:
+        yield item
+
+
+def runtakewhile(seq, pred):
+    for index, item in enumerate(seq):
+        if pred(item, index):
+            yield item
+        else:
+            break
+
+
+def runslice(seq, bounds):
+    start, stop = bounds
+    return itertools.islice(seq, start, stop)
+
+
+def runfused(seq, steps):
+    kinds = tuple(kind for kind, arg in steps)
+    if kinds == (WHERE, SELECT):
+        pred, fn = steps[0][1], steps[1][1]
+        return (fn(item) for item in seq if pred(item))
+    if kinds == (SELECT, WHERE):
+        fn, pred = steps[0][1], steps[1][1]
+        return (item for item in itertools.imap(fn, seq) if pred(item))
+    for kind, arg in steps:
+        seq = EXECUTORS[kind](seq, arg)
+    return seq
+
+
+EXECUTORS = {
+    WHERE: runwhere,
+    SELECT: runselect,
+    OFTYPE: runoftype,
+    WHEREI: runwherei,
+    SKIPWHILE: runskipwhile,
+    TAKEWHILE: runtakewhile,
+    SLICE: runslice,
+    FUSED: runfused,
+}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+"""
+Background read-ahead for slow sources.
+
+A worker thread or process pulls items from the source into a bounded
+queue while the caller consumes them, so a slow reader and a slow consumer
+overlap instead of taking turns.
+"""
+
+import multiprocessing
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+__all__ = ["Prefetch", "PrefetchStats"]
+
+ITEM = 0
+DONE = 1
+ERROR = 2
+
+# How long a blocked producer waits before checking whether it was stopped.
+POLL = 0.1
+
+
+class PrefetchStats(object):
+    """
+    Counters describing the flow of items through a prefetch queue.
+
+    produced and consumed count items.  producerwaits counts the times the
+    worker found the queue full, meaning the consumer is the bottleneck.
+    consumerwaits counts the times the consumer found the queue empty,
+    meaning the source is the bottleneck.  maxdepth is the deepest the
+    queue got.  The counters start again each time the prefetching
+    sequence is enumerated.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, shared=None):
+        self.consumed = 0
+        self.consumerwaits = 0
+        self.maxdepth = 0
+        self.shared = shared or {"produced": 0, "producerwaits": 0}
+
+    @property
+    def produced(self):
+        return int(getattr(self.shared["produced"], "value",
+                           self.shared["produced"]))
+
+    @property
+    def producerwaits(self):
+        return int(getattr(self.shared["producerwaits"], "value",
+                           self.shared["producerwaits"]))
+
+    @property
+    def depth(self):
+        """
+        The number of items produced but not yet consumed.
+        """
+        return self.produced - self.consumed
+
+    def __repr__(self):
+        return ("PrefetchStats(produced=%d, consumed=%d, depth=%d, "
+                "maxdepth=%d, producerwaits=%d, consumerwaits=%d)" % (
+                    self.produced, self.consumed, self.depth, self.maxdepth,
+                    self.producerwaits, self.consumerwaits))
+
+
+def picklable(error):
+    """
+    Returns error if it survives pickling, otherwise a RuntimeError
+    describing it.
+    """
+    try:
+        pickle.loads(pickle.dumps(error, pickle.HIGHEST_PROTOCOL))
+        return error
+    except Exception:
+        return RuntimeError("%s: %s" % (type(error).__name__, error))
+
+
+def produce(seq, items, stop, counters, pickled=False):
+    """
+    Puts (ITEM, item) for each item of seq on the items queue, then
+    (DONE, None), or (ERROR, exception) if enumerating seq fails.  Returns
+    early once stop is set.
+
+    When pickled is set, each item is pickled here so that an item that
+    cannot be pickled is reported as an error rather than dropped by the
+    queue's feeder thread.
+    """
+    def put(message):
+        if items.full():
+            increment(counters, "producerwaits")
+        while not stop.is_set():
+            try:
+                items.put(message, timeout=POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        for item in seq:
+            if pickled:
+                item = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+            if not put((ITEM, item)):
+                return
+            increment(counters, "produced")
+        put((DONE, None))
+    except Exception as error:
+        put((ERROR, picklable(error) if pickled else error))
+
+
+def increment(counters, name):
+    counter = counters[name]
+    if hasattr(counter, "value"):
+        with counter.get_lock():
+            counter.value += 1
+    else:
+        counters[name] = counter + 1
+
+
+class Prefetch(object):
+    """
+    A sequence that reads ahead of its consumer on a background worker.
+
+    size bounds the number of items waiting in the queue.  mode is "thread"
+    or "process".  Threads suit sources that wait on I/O.  A process also
+    overlaps sources that are CPU bound, such as decompressors or parsers,
+    but the items must be picklable and the source is read in a forked copy
+    of this process.
+    """
+
+    def __init__(self, seq, size=64, mode="thread", stats=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(
+                "mode must be 'thread' or 'process', not %r" % mode)
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.seq = seq
+        self.size = size
+        self.mode = mode
+        self.stats = stats if stats is not None else PrefetchStats()
+
+    def __iter__(self):
+        stats = self.stats
+        if self.mode == "thread":
+            stats.reset()
+            items = queue.Queue(self.size)
+            stop = threading.Event()
+            worker = threading.Thread(
+                target=produce, args=(self.seq, items, stop, stats.shared))
+            worker.daemon = True
+        else:
+            items = multiprocessing.Queue(self.size)
+            stop = multiprocessing.Event()
+            stats.reset({"produced": multiprocessing.Value("l", 0),
+                         "producerwaits": multiprocessing.Value("l", 0)})
+            worker = multiprocessing.Process(
+                target=produce,
+                args=(self.seq, items, stop, stats.shared, True))
+            worker.daemon = True
+        return self.consume(items, stop, worker)
+
+    def receive(self, items, worker):
+        """
+        Returns the next message from the worker, raising a RuntimeError
+        if the worker has exited without sending one.
+        """
+        while True:
+            try:
+                return items.get(timeout=POLL)
+            except queue.Empty:
+                if worker.is_alive():
+                    continue
+            # Messages sent just before the worker exited may still be on
+            # their way through the queue.
+            try:
+                return items.get(timeout=POLL)
+            except queue.Empty:
+                raise RuntimeError(
+                    "prefetch worker exited before finishing, exit code "
+                    "%r" % getattr(worker, "exitcode", None))
+
+    def consume(self, items, stop, worker):
+        stats = self.stats
+        worker.start()
+        try:
+            while True:
+                if items.empty():
+                    stats.consumerwaits += 1
+                kind, value = self.receive(items, worker)
+                if kind == DONE:
+                    return
+                if kind == ERROR:
+                    raise value
+                if self.mode == "process":
+                    value = pickle.loads(value)
+                stats.maxdepth = max(stats.maxdepth, stats.depth)
+                stats.consumed += 1
+                yield value
+        finally:
+            stop.set()
+            if self.mode == "process":
+                worker.terminate()
+                items.cancel_join_thread()
+            worker.join(POLL * 2)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Streaming, order preserving set operations.
+
+Items are tracked in a hash set.  Items that cannot be hashed, such as lists
+or dicts, are kept in a side list and compared by equality instead, so only
+those items pay for a linear scan.
+"""
+
+__all__ = ["SeenSet", "distinct", "except_", "intersect"]
+
+
+class SeenSet(object):
+    """
+    A set of items which accepts unhashable items as well as hashable ones.
+    """
+
+    def __init__(self, items=()):
+        self.hashed = set()
+        self.unhashed = []
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        try:
+            return item in self.hashed
+        except TypeError:
+            return item in self.unhashed
+
+    def __len__(self):
+        return len(self.hashed) + len(self.unhashed)
+
+    def add(self, item):
+        """
+        Adds item to the set.  Returns True if the item was not already in
+        the set.
+        """
+        try:
+            if item in self.hashed:
+                return False
+            self.hashed.add(item)
+        except TypeError:
+            if item in self.unhashed:
+                return False
+            self.unhashed.append(item)
+        return True
+
+
+def distinct(seq):
+    """
+    Yields each item in seq the first time it is seen.
+    """
+    seen = SeenSet()
+    add = seen.add
+    for item in seq:
+        if add(item):
+            yield item
+
+
+def except_(seq, other):
+    """
+    Yields the items in seq that do not appear in other.
+    """
+    excluded = SeenSet(other)
+    for item in seq:
+        if item not in excluded:
+            yield item
+
+
+def intersect(seq, other):
+    """
+    Yields each item in seq that also appears in other, once, in the order
+    they first appear in seq.
+    """
+    included = SeenSet(other)
+    seen = SeenSet()
+    for item in seq:
+        if item in included and seen.add(item):
+            yield item
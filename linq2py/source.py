@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""
+The protocol for sources that filter, project, order or limit rows
+themselves.
+
+When a query is enumerated, a source with a scan method is handed the
+query's operator nodes and applies as many of the leading ones as it can,
+such as by adding them to a database query or reading fewer rows from an
+index.  The plan applies the rest.  Sources are free to apply nothing.
+
+Nodes are (kind, arg) pairs using the kinds in plan: where, select,
+oftype, wherei, skipwhile, takewhile and slice, whose arg is a (start,
+stop) pair, plus orderby, whose arg is a tuple of (keyselector,
+descending) pairs and which is only offered when an ordered query is
+enumerated.  Predicates, selectors and keys are whatever the caller passed
+in, so sources usually only accept expressions, whose op, args and
+fields() describe what they compute.
+"""
+
+from . import plan
+from .expr import Expr
+
+__all__ = ["Source", "isexpr"]
+
+
+def isexpr(arg):
+    """
+    Returns true if arg is an expression, which a source can inspect, rather
+    than an opaque function.
+    """
+    return isinstance(arg, Expr)
+
+
+class Source(object):
+    """
+    Base class for sources that can apply some operators themselves.
+
+    Subclasses describe what to read with a query object of their choosing.
+    query() returns the query for reading everything, push(query, kind,
+    arg) returns a new query with one more operator applied, or None if the
+    source cannot apply it, and rows(query) returns an iterable over the
+    rows the query selects.  rows should not start reading until it is
+    iterated, since a scan may be abandoned.
+    """
+
+    def __iter__(self):
+        return iter(self.rows(self.query()))
+
+    def query(self):
+        raise NotImplementedError
+
+    def push(self, query, kind, arg):
+        return None
+
+    def rows(self, query):
+        raise NotImplementedError
+
+    def scan(self, ops):
+        """
+        Returns (rows, count) where rows is an iterable over this source
+        with the first count of ops applied.
+        """
+        query = self.query()
+        count = 0
+        for kind, arg in ops:
+            pushed = self.push(query, kind, arg)
+            if pushed is None:
+                break
+            query = pushed
+            count += 1
+        return self.rows(query), count
+
+    def ordered(self, ops, keys, limit=None):
+        """
+        Returns the rows of ops applied to this source in the order of keys,
+        with at most limit rows, or None unless the source can apply all of
+        it.
+        """
+        wanted = list(ops) + [(plan.ORDERBY, tuple(keys))]
+        if limit is not None:
+            wanted.append((plan.SLICE, (0, limit)))
+        wanted = plan.simplify(wanted)
+        rows, count = self.scan(wanted)
+        return rows if count == len(wanted) else None
@@ -0,0 +1,585 @@
+#!/usr/bin/env python
+
+"""
+SQLite tables as query sources.
+
+Leading where, select, orderby, take and skip operators whose arguments are
+expressions are translated into one SELECT statement, and the remaining
+operators run in Python over the rows it returns.  When the whole chain
+translates, count, sum, min, max, average, groupby and joins between
+tables of the same database are computed by SQLite too.  Rows are fetched
+in batches with fetchmany, and each row is a Row dict keyed by column name.
+
+Translation is conservative: an expression is only sent to SQLite when it
+gives the same result as in Python.  Division, modulo and powers are left
+to Python, since SQLite rounds negative numbers differently, and so is +
+with a string constant, which SQLite would not concatenate.  Method calls
+are left to Python as well, since LOWER, UPPER and TRIM only handle ASCII
+letters and spaces and accept values that are not strings.  Comparisons
+treat NULL as Python 2 treats None, and values used as truth values are
+tested as Python would, so 0, empty strings and NULL count as false.
+Arithmetic on NULL gives NULL where Python would raise a TypeError.
+Text is compared, ordered and grouped byte by byte whatever collation the
+column declares, as Python compares strings.
+"""
+
+import re
+import sqlite3
+from operator import itemgetter
+
+from . import expr
+from . import plan
+from .From import From
+from .expr import Expr, Row
+from .plan import identity
+from .source import Source
+
+__all__ = ["SqlFrom", "SqlTable"]
+
+# Window functions, used to keep Python's first-seen order for groupby and
+# joins, arrived in SQLite 3.25.
+WINDOWS = sqlite3.sqlite_version_info >= (3, 25, 0)
+
+# Python 2 orders None before everything else and None equals None, while
+# SQLite comparisons with NULL are NULL.  Equality uses IS, and orderings
+# fall back to a NULL test.  {a} and {b} stand for the two operands.
+COMPARISONS = {
+    "eq": "({a} IS {b} COLLATE BINARY)",
+    "ne": "({a} IS NOT {b} COLLATE BINARY)",
+    "lt": "COALESCE({a} < {b} COLLATE BINARY, "
+          "{a} IS NULL AND {b} IS NOT NULL)",
+    "le": "COALESCE({a} <= {b} COLLATE BINARY, {a} IS NULL)",
+    "gt": "COALESCE({a} > {b} COLLATE BINARY, "
+          "{b} IS NULL AND {a} IS NOT NULL)",
+    "ge": "COALESCE({a} >= {b} COLLATE BINARY, {b} IS NULL)",
+}
+
+ARITHMETIC = {"add": "+", "sub": "-", "mul": "*"}
+
+BOOLEAN = (expr.AND, expr.OR, expr.NOT, expr.ISIN)
+
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def truthy(sql):
+    """
+    Returns SQL testing a value the way Python's bool would.
+    """
+    return ("(CASE typeof(%s) WHEN 'text' THEN %s != '' "
+            "WHEN 'null' THEN 0 ELSE %s != 0 END)" % (sql, sql, sql))
+
+
+def isboolean(node):
+    return node.op in BOOLEAN or (node.op == expr.BINARY and
+                                  node.args[0] in COMPARISONS)
+
+
+class Translator(object):
+    """
+    Translates expressions into SQL with ? parameters.  root is the SQL for
+    the item itself when it is a single value, with rootparams repeated
+    each time it is used, or None when the item is a row, in which case
+    fields of the item are columns, qualified by alias if one is given.
+    """
+
+    def __init__(self, root=None, rootparams=(), alias=None):
+        self.root = root
+        self.rootparams = rootparams
+        self.alias = alias
+        self.params = []
+
+    def value(self, node):
+        """
+        Returns the SQL for a value, or None if it cannot be translated.
+        """
+        if not isinstance(node, Expr) or isboolean(node):
+            return None
+        return self.write(node)
+
+    def predicate(self, node):
+        """
+        Returns the SQL for a condition, or None if it cannot be
+        translated.
+        """
+        if not isinstance(node, Expr):
+            return None
+        if isboolean(node):
+            return self.write(node)
+        sql = self.write(node)
+        return None if sql is None else truthy(sql)
+
+    def write(self, node):
+        op, args = node.op, node.args
+        if op == expr.ROOT:
+            self.params.extend(self.rootparams)
+            return self.root
+        if op == expr.CONST:
+            self.params.append(args[0])
+            return "?"
+        if op in (expr.ATTR, expr.ITEM):
+            if (self.root is not None or args[0].op != expr.ROOT or
+                    not isinstance(args[1], basestring)):
+                return None
+            if self.alias is None:
+                return quote(args[1])
+            return "%s.%s" % (self.alias, quote(args[1]))
+        if op == expr.BINARY:
+            return self.binary(*args)
+        if op in (expr.AND, expr.OR):
+            left = self.predicate(args[0])
+            right = self.predicate(args[1])
+            if left is None or right is None:
+                return None
+            return "(%s %s %s)" % (left, op.upper(), right)
+        if op == expr.NOT:
+            operand = self.predicate(args[0])
+            return None if operand is None else "(NOT %s)" % operand
+        if op == expr.NEG:
+            return self.call("-", args[0])
+        if op == expr.ISIN:
+            operand = self.write(args[0])
+            if operand is None:
+                return None
+            # NULL IN (...) is NULL, while Python finds None only in a
+            # collection holding it.
+            values = [value for value in args[1] if value is not None]
+            nulls = len(values) < len(args[1])
+            if not values:
+                return "(%s IS NULL)" % operand if nulls else \
+                    "(%s AND 0)" % operand
+            self.params.extend(values)
+            return "COALESCE(%s COLLATE BINARY IN (%s), %d)" % (
+                operand, ", ".join("?" * len(values)), nulls)
+        return None
+
+    def call(self, function, node):
+        operand = self.write(node)
+        return None if operand is None else "%s(%s)" % (function, operand)
+
+    def binary(self, name, left, right):
+        if name in COMPARISONS:
+            return self.compare(COMPARISONS[name], left, right)
+        if name not in ARITHMETIC or any(
+                side.op == expr.CONST and isinstance(side.args[0], basestring)
+                for side in (left, right)):
+            return None
+        first = self.write(left)
+        second = self.write(right)
+        if first is None or second is None:
+            return None
+        return "(%s %s %s)" % (first, ARITHMETIC[name], second)
+
+    def compare(self, template, left, right):
+        """
+        Fills in a comparison template, writing the operands again each
+        time they appear so that their parameters line up.
+        """
+        parts = re.split(r"\{([ab])\}", template)
+        for index in range(1, len(parts), 2):
+            parts[index] = self.write(left if parts[index] == "a" else right)
+            if parts[index] is None:
+                return None
+        return "".join(parts)
+
+
+class SqlQuery(object):
+    """
+    The parts of a SELECT statement over one table.  value is the (sql,
+    params) projection, or None to select whole rows.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.conditions = []
+        self.value = None
+        self.order = []
+        self.bounds = (0, None)
+
+    def copy(self):
+        query = SqlQuery(self.table)
+        query.conditions = list(self.conditions)
+        query.value = self.value
+        query.order = list(self.order)
+        query.bounds = self.bounds
+        return query
+
+    def translator(self):
+        if self.value is None:
+            return Translator()
+        return Translator(*self.value)
+
+    def statement(self):
+        """
+        Returns (sql, params) for the query.  A projected value is selected
+        as the column v.
+        """
+        params = []
+        if self.value is None:
+            sql = "SELECT *"
+        else:
+            sql = "SELECT %s AS v" % self.value[0]
+            params.extend(self.value[1])
+        sql += " FROM %s" % quote(self.table)
+        if self.conditions:
+            sql += " WHERE " + " AND ".join(
+                condition for condition, args in self.conditions)
+            for condition, args in self.conditions:
+                params.extend(args)
+        if self.order:
+            sql += " ORDER BY " + ", ".join(
+                "%s COLLATE BINARY%s" % (key, " DESC" if descending else "")
+                for key, args, descending in self.order)
+            for key, args, descending in self.order:
+                params.extend(args)
+        start, stop = self.bounds
+        if (start, stop) != (0, None):
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if stop is None else stop - start, start])
+        return sql, params
+
+
+def fetch(cursor, batchsize):
+    """
+    Yields the rows of an executed cursor, fetching batchsize at a time,
+    and closes the cursor when done or abandoned.
+    """
+    try:
+        while True:
+            rows = cursor.fetchmany(batchsize)
+            if not rows:
+                return
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+class SqlTable(Source):
+    """
+    A table in a SQLite database as a source of Row dicts.
+    """
+
+    def __init__(self, connection, table, batchsize=1000):
+        self.connection = connection
+        self.table = table
+        self.batchsize = batchsize
+        self.stable = None
+
+    def _hasrowid(self):
+        """
+        Returns true if the table has a rowid, which orders ties the way a
+        stable sort in Python would.
+        """
+        if self.stable is None:
+            try:
+                self.connection.execute(
+                    "SELECT rowid FROM %s LIMIT 0" % quote(self.table))
+                self.stable = True
+            except sqlite3.Error:
+                self.stable = False
+        return self.stable
+
+    def query(self):
+        return SqlQuery(self.table)
+
+    def push(self, query, kind, arg):
+        if kind == plan.SLICE:
+            query = query.copy()
+            query.bounds = plan.mergeslices(query.bounds, arg)
+            return query
+        if query.bounds != (0, None) and kind != plan.SELECT:
+            return None
+        if kind == plan.WHERE:
+            translator = query.translator()
+            condition = translator.predicate(arg)
+            if condition is None:
+                return None
+            query = query.copy()
+            query.conditions.append((condition, translator.params))
+            return query
+        if kind == plan.SELECT:
+            translator = query.translator()
+            value = translator.value(arg)
+            if value is None:
+                return None
+            query = query.copy()
+            query.value = (value, translator.params)
+            return query
+        if kind == plan.ORDERBY:
+            order = []
+            for keyselector, descending in arg:
+                translator = query.translator()
+                key = translator.value(keyselector)
+                if key is None:
+                    return None
+                order.append((key, translator.params, descending))
+            if self._hasrowid():
+                order.append(("rowid", [], False))
+            query = query.copy()
+            query.order = order
+            return query
+        return None
+
+    def rows(self, query):
+        sql, params = query.statement()
+        if query.value is None:
+            return self.execute(sql, params)
+        return self.execute(sql, params, itemgetter(0))
+
+    def execute(self, sql, params, convert=None):
+        """
+        Yields the results of a statement, with each tuple passed through
+        convert, or as Row dicts by default.  The statement runs when the
+        first result is read.
+        """
+        cursor = self.connection.execute(sql, params)
+        if convert is None:
+            names = [column[0] for column in cursor.description]
+            convert = lambda row: Row(zip(names, row))
+        for row in fetch(cursor, self.batchsize):
+            yield convert(row)
+
+    def columns(self, sql, params):
+        """
+        Returns the column names a statement produces.
+        """
+        cursor = self.connection.execute(
+            "SELECT * FROM (%s) LIMIT 0" % sql, params)
+        names = [column[0] for column in cursor.description]
+        cursor.close()
+        return names
+
+
+class SqlFrom(From):
+
+    def __init__(self, table):
+        """
+        Create a new SqlFrom over an SqlTable.  This is what From.sqltable
+        returns.
+        """
+        From.__init__(self, table)
+
+    def _chain(self, kind, arg):
+        query = SqlFrom(self.source)
+        query.ops = self.ops + ((kind, arg),)
+        if kind in plan.KEEPSORT:
+            query.sortedby = self.sortedby
+        return query
+
+    def _query(self):
+        """
+        Returns the SqlQuery for the whole chain, or None if part of it must
+        run in Python.
+        """
+        ops = plan.simplify(self.ops)
+        query = self.source.query()
+        for kind, arg in ops:
+            query = self.source.push(query, kind, arg)
+            if query is None:
+                return None
+        return query
+
+    def _aggregate(self, function, pred, valued=True):
+        """
+        Returns the row of SELECT function, COUNT(*) over the rows of the
+        chain that match pred, or None if it cannot be done in SQLite.
+        """
+        query = self._query()
+        if query is None or (valued and query.value is None):
+            return None
+        inner, params = query.statement()
+        translator = Translator(None if query.value is None else "v")
+        if pred is None:
+            condition = None
+        elif pred is identity:
+            condition = None if query.value is None else truthy("v")
+        else:
+            condition = translator.predicate(pred)
+            if condition is None:
+                return None
+        sql = "SELECT %s, COUNT(*) FROM (%s)" % (function, inner)
+        if condition is not None:
+            sql += " WHERE " + condition
+        return self.source.connection.execute(
+            sql, params + translator.params).fetchone()
+
+    def average(self):
+        """
+        Calculates the average of the values with SQLite when the chain
+        translates.
+        """
+        row = self._aggregate("SUM(v)", None)
+        if row is None:
+            return From.average(self)
+        total, count = row
+        return (total or 0) / count
+
+    def count(self, pred=None):
+        """
+        Counts the items that match the predicate with SQLite when the
+        chain and the predicate translate.
+        """
+        row = self._aggregate("NULL", pred, valued=False)
+        if row is None:
+            return From.count(self, pred)
+        return row[1]
+
+    def max(self, pred=identity):
+        """
+        Returns the highest value that meets the predicate, using SQLite
+        when the chain and the predicate translate.
+        """
+        row = self._aggregate("MAX(v COLLATE BINARY)", pred)
+        if row is None:
+            return From.max(self, pred)
+        if not row[1]:
+            raise ValueError("max() arg is an empty sequence")
+        return row[0]
+
+    def min(self, pred=identity):
+        """
+        Returns the smallest value that meets the predicate, using SQLite
+        when the chain and the predicate translate.
+        """
+        row = self._aggregate("MIN(v COLLATE BINARY), COUNT(v)", pred)
+        if row is None:
+            return From.min(self, pred)
+        smallest, values, count = row
+        if not count:
+            raise ValueError("min() arg is an empty sequence")
+        # MIN skips NULLs, which Python orders before everything else.
+        return None if values < count else smallest
+
+    def sum(self, selector=identity):
+        """
+        Returns the sum of the values that match the selector, using SQLite
+        when the chain and the selector translate.
+        """
+        row = self._aggregate("SUM(v)", selector)
+        if row is None:
+            return From.sum(self, selector)
+        return row[0] or 0
+
+    def groupby(
+            self,
+            keyfunc=identity,
+            elementfunc=identity,
+            resultfunc=identity,
+            maxrows=None,
+            maxbytes=None,
+            tempdir=None,
+            preserveorder=True,
+            sorted=False,
+            accumulatorfn=None,
+            seed=0):
+        """
+        Groups items as From.groupby does.  When the chain, keyfunc and
+        elementfunc translate, SQLite orders the rows by group, keeping the
+        order keys were first seen in, and the groups are read off one at a
+        time, so no memory limit is needed.
+        """
+        query = self._query()
+        grouped = None
+        if query is not None and WINDOWS and not sorted:
+            grouped = self._groups(query, keyfunc, elementfunc)
+        if grouped is None:
+            return From.groupby(
+                self, keyfunc, elementfunc, resultfunc, maxrows, maxbytes,
+                tempdir, preserveorder, sorted, accumulatorfn, seed)
+        return From(grouped).groupadjacent(
+            itemgetter(0), itemgetter(1), resultfunc, accumulatorfn, seed)
+
+    def _groups(self, query, keyfunc, elementfunc):
+        """
+        Returns an iterable of (key, element) in group order, or None if
+        keyfunc or elementfunc do not translate.
+        """
+        inner, params = query.statement()
+        translator = Translator(None if query.value is None else "v")
+        key = translator.value(keyfunc)
+        if key is None:
+            return None
+        asrows = elementfunc is identity and query.value is None
+        if asrows:
+            element = "*"
+        elif elementfunc is identity:
+            element = "v AS __element"
+        else:
+            element = translator.value(elementfunc)
+            if element is None:
+                return None
+            element += " AS __element"
+        sql = ("SELECT * FROM (SELECT %s AS __key, ROW_NUMBER() OVER () "
+               "AS __n, %s FROM (%s)) ORDER BY MIN(__n) OVER "
+               "(PARTITION BY __key COLLATE BINARY), __n" % (
+                   key, element, inner))
+        rows = self.source.execute(sql, translator.params + params)
+        if asrows:
+            return ((row.pop("__key"), dropped(row, "__n")) for row in rows)
+        return ((row["__key"], row["__element"]) for row in rows)
+
+    def join(
+            self,
+            inner,
+            outerkeyselector,
+            innerkeyselector,
+            resultselector,
+            build="auto"):
+        """
+        Joins two sequences as From.join does.  When inner is a table in
+        the same database and both chains and key selectors translate,
+        SQLite performs the join and resultselector is applied to each pair
+        of rows in Python.
+        """
+        joined = None
+        if (build != "outer" and WINDOWS and isinstance(inner, SqlFrom) and
+                inner.source.connection is self.source.connection):
+            joined = self._joined(inner, outerkeyselector, innerkeyselector)
+        if joined is None:
+            return From.join(self, inner, outerkeyselector,
+                             innerkeyselector, resultselector, build)
+        return From(resultselector(outer, innerrow)
+                    for outer, innerrow in joined)
+
+    def _joined(self, inner, outerkeyselector, innerkeyselector):
+        """
+        Returns an iterable of matching (outer, inner) row pairs in the
+        order a hash join would produce them, or None if the join does not
+        translate.
+        """
+        outerquery = self._query()
+        innerquery = inner._query()
+        if (outerquery is None or innerquery is None or
+                outerquery.value is not None or
+                innerquery.value is not None):
+            return None
+        outersql, outerparams = outerquery.statement()
+        innersql, innerparams = innerquery.statement()
+        outerkeys = Translator(alias="o")
+        innerkeys = Translator(alias="i")
+        outerkey = outerkeys.value(outerkeyselector)
+        innerkey = innerkeys.value(innerkeyselector)
+        if outerkey is None or innerkey is None:
+            return None
+        outernames = self.source.columns(outersql, outerparams)
+        innernames = self.source.columns(innersql, innerparams)
+        sql = ("SELECT o.*, i.* FROM "
+               "(SELECT *, ROW_NUMBER() OVER () AS __n FROM (%s)) AS o "
+               "JOIN (SELECT *, ROW_NUMBER() OVER () AS __n FROM (%s)) AS i "
+               "ON %s IS %s COLLATE BINARY ORDER BY o.__n, i.__n" % (
+                   outersql, innersql, outerkey, innerkey))
+        params = (outerparams + innerparams + outerkeys.params +
+                  innerkeys.params)
+        # Each side brings its columns followed by its __n.
+        split = len(outernames)
+        return ((Row(zip(outernames, row[:split])),
+                 Row(zip(innernames, row[split + 1:-1])))
+                for row in self.source.execute(sql, params, identity))
+
+
+def dropped(row, name):
+    del row[name]
+    return row
+
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""
+Thread based helpers for overlapping I/O bound work.
+
+Threads share the interpreter lock, so these only help when the work spends
+its time waiting, such as on network requests or disk reads.
+"""
+
+import threading
+from multiprocessing.pool import ThreadPool
+
+__all__ = ["concurrentmap"]
+
+
+def concurrentmap(fn, seq, concurrency, ordered=True):
+    """
+    Yields fn(item) for each item in seq, running up to concurrency calls at
+    once on a pool of threads.  With ordered, results follow the order of
+    seq, otherwise they come out as the calls complete.  At most twice
+    concurrency items are read ahead of the caller, and the threads are
+    shut down when the results are exhausted or abandoned.
+    """
+    window = threading.Semaphore(concurrency * 2)
+    stopped = []
+
+    def tasks():
+        for item in seq:
+            window.acquire()
+            if stopped:
+                return
+            yield item
+
+    pool = ThreadPool(concurrency)
+    try:
+        if ordered:
+            results = pool.imap(fn, tasks())
+        else:
+            results = pool.imap_unordered(fn, tasks())
+        for result in results:
+            window.release()
+            yield result
+        pool.close()
+    finally:
+        stopped.append(True)
+        window.release()
+        pool.terminate()
+        pool.join()
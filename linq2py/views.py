@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""
+Lazy views over sequences that are already held in memory.
+
+When a query over a list, tuple, xrange or array only selects and slices,
+every stage still has a length and can be indexed.  A SequenceView keeps
+it that way: it records a range of positions in the underlying sequence
+and the selectors to apply, so len, indexing, reversing and further
+slicing cost nothing up front and selectors run only on the items that
+are actually read.
+"""
+
+import collections
+import itertools
+from array import array
+
+__all__ = ["SequenceView", "issequence"]
+
+
+def issequence(seq):
+    """
+    Returns true if seq supports len and integer indexing without being
+    enumerated.
+    """
+    return isinstance(seq, (collections.Sequence, array))
+
+
+class SequenceView(collections.Sequence):
+    """
+    The items seq[start], seq[start + step], ... for length items, each
+    passed through the functions in fns in turn.
+    """
+
+    def __init__(self, seq, start=0, length=None, step=1, fns=()):
+        self.seq = seq
+        self.start = start
+        self.length = len(seq) if length is None else length
+        self.step = step
+        self.fns = fns
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("index out of range")
+        item = self.seq[self.start + index * self.step]
+        for fn in self.fns:
+            item = fn(item)
+        return item
+
+    def __iter__(self):
+        items = self.items()
+        for fn in self.fns:
+            items = itertools.imap(fn, items)
+        return iter(items)
+
+    def __reversed__(self):
+        return iter(self.reversed())
+
+    def items(self):
+        """
+        Returns the underlying items covered by the view, by slicing the
+        sequence when it allows it.
+        """
+        start, length, step = self.start, self.length, self.step
+        if not length:
+            return ()
+        if start == 0 and step == 1 and length == len(self.seq):
+            return self.seq
+        stop = start + length * step
+        if stop < 0:
+            stop = None
+        try:
+            return self.seq[start:stop:step]
+        except TypeError:
+            return itertools.imap(self.seq.__getitem__,
+                                  xrange(start, start + length * step, step))
+
+    def reversed(self):
+        """
+        Returns a view of the same items in the opposite order.
+        """
+        if not self.length:
+            return self
+        last = self.start + (self.length - 1) * self.step
+        return SequenceView(self.seq, last, self.length, -self.step,
+                            self.fns)
+
+    def select(self, fn):
+        """
+        Returns a view applying fn to each item after the existing
+        functions.
+        """
+        return SequenceView(self.seq, self.start, self.length, self.step,
+                            self.fns + (fn,))
+
+    def slice(self, start, stop):
+        """
+        Returns a view of the items from position start up to stop, or to
+        the end when stop is None.  Both must not be negative.
+        """
+        start = min(start, self.length)
+        stop = self.length if stop is None else min(stop, self.length)
+        return SequenceView(self.seq, self.start + start * self.step,
+                            max(stop - start, 0), self.step, self.fns)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From, F
+from linq2py.cache import QueryCache
+
+
+class Clock(object):
+    """
+    A clock that only moves when told to.
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTestCase(unittest.TestCase):
+    """
+    Test case for the query result cache.
+    """
+
+    def setUp(self):
+        self.reads = []
+        self.items = [1, 2, 3, 4, 5]
+        self.cache = QueryCache(maxsize=2)
+
+    def query(self, source=None):
+        return From(source or self.items).select(
+            F.apply(self.reads.append) | F).where(F > 2)
+
+    def test_cached_reusesResultOfEqualQueries(self):
+        self.assertEquals(self.query().cached(self.cache).tolist(), [3, 4, 5])
+        self.assertEquals(self.query().cached(self.cache).count(), 3)
+        self.assertEquals(len(self.reads), 5)
+        self.assertEquals((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_cached_separatesSourcesOperatorsAndFunctions(self):
+        self.query().cached(self.cache).tolist()
+        self.query([5, 6]).cached(self.cache).tolist()
+        From(self.items).where(lambda x: x > 2).cached(self.cache).tolist()
+        self.assertEquals(self.cache.misses, 3)
+
+    def test_cached_orderedQueriesMatch(self):
+        query = lambda: From(self.items).orderbydecending(F).take(2)
+        query().cached(self.cache).tolist()
+        self.assertEquals(query().cached(self.cache).tolist(), [5, 4])
+        self.assertEquals(self.cache.hits, 1)
+
+    def test_cached_keepsUnhashableConstantsAlive(self):
+        cache = QueryCache(maxsize=100)
+        items = [[n] for n in range(50)]
+        for n in range(50):
+            actual = From(items).where(F == [n]).cached(cache).tolist()
+            self.assertEquals(actual, [[n]])
+        self.assertEquals(cache.hits, 0)
+
+    def test_version_changesKey(self):
+        version = [1]
+        self.query().cached(self.cache, lambda: version[0]).tolist()
+        self.items.append(6)
+        version[0] += 1
+        actual = self.query().cached(self.cache, lambda: version[0]).tolist()
+        self.assertEquals(actual, [3, 4, 5, 6])
+
+    def test_invalidate_dropsResultsOfSource(self):
+        self.query().cached(self.cache).tolist()
+        self.assertEquals(self.cache.invalidate([1, 2]), 0)
+        self.assertEquals(self.cache.invalidate(self.items), 1)
+        self.query().cached(self.cache).tolist()
+        self.assertEquals(self.cache.misses, 2)
+
+    def test_cache_evictsLeastRecentlyUsed(self):
+        first = From(self.items).take(1)
+        first.cached(self.cache).tolist()
+        From(self.items).take(2).cached(self.cache).tolist()
+        first.cached(self.cache).tolist()
+        From(self.items).take(3).cached(self.cache).tolist()
+        self.assertEquals(self.cache.evictions, 1)
+        first.cached(self.cache).tolist()
+        self.assertEquals(self.cache.hits, 2)
+
+    def test_cache_expiresResultsAfterTtl(self):
+        clock = Clock()
+        cache = QueryCache(ttl=10, clock=clock)
+        self.query().cached(cache).tolist()
+        clock.now = 9
+        self.query().cached(cache).tolist()
+        clock.now = 10
+        self.query().cached(cache).tolist()
+        self.assertEquals((cache.hits, cache.misses, cache.expirations),
+                          (1, 2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from array import array
+from linq2py import From
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class ColumnarTestCase(unittest.TestCase):
+    """
+    Test case for the NumPy backed ColumnarFrom.
+    """
+
+    def test_from_returnsColumnarFromForArrays(self):
+        from linq2py.columnar import ColumnarFrom
+        self.assertTrue(isinstance(From(numpy.arange(3)), ColumnarFrom))
+        self.assertFalse(isinstance(From([1, 2, 3]), ColumnarFrom))
+
+    def test_where_usesMaskForArrayPredicate(self):
+        query = From(numpy.arange(10)).where(lambda x: x % 2 == 0)
+        self.assertTrue(isinstance(query.data, numpy.ndarray))
+        self.assertEquals(query.tolist(), [0, 2, 4, 6, 8])
+
+    def test_where_fallsBackToRowsForScalarPredicate(self):
+        actual = From(numpy.arange(10)).where(
+            lambda x: x > 2 and x < 5).tolist()
+        self.assertEquals(actual, [3, 4])
+
+    def test_select_usesUfuncsForArithmetic(self):
+        query = From(numpy.arange(4)).select(lambda x: x * 2 + 1)
+        self.assertTrue(isinstance(query.data, numpy.ndarray))
+        self.assertEquals(query.tolist(), [1, 3, 5, 7])
+
+    def test_select_fallsBackToRowsForScalarSelector(self):
+        actual = From(numpy.arange(3)).select(lambda x: str(x)).tolist()
+        self.assertEquals(actual, ["0", "1", "2"])
+
+    def test_aggregates_returnPythonScalars(self):
+        query = From(numpy.array([4, 1, 3, 2]))
+        self.assertEquals(query.sum(), 10)
+        self.assertEquals(query.min(), 1)
+        self.assertEquals(query.max(), 4)
+        self.assertEquals(query.count(lambda x: x > 1), 3)
+        self.assertEquals(query.average(), 10 / 4)
+        self.assertTrue(isinstance(query.sum(), int))
+
+    def test_aggregates_matchRowPathForPredicates(self):
+        items = [0, 5, 3, 8, 1]
+        query = From(numpy.array(items))
+        self.assertEquals(query.count(), From(items).count())
+        self.assertEquals(query.max(lambda x: x < 5),
+                          From(items).max(lambda x: x < 5))
+
+    def test_takeAndSkip_sliceTheArray(self):
+        query = From(numpy.arange(10)).skip(3).take(4)
+        self.assertTrue(isinstance(query.data, numpy.ndarray))
+        self.assertEquals(query.tolist(), [3, 4, 5, 6])
+
+    def test_toarray_convertsWholeArray(self):
+        actual = From(numpy.arange(4)).toarray("d")
+        self.assertEquals(actual, array("d", [0.0, 1.0, 2.0, 3.0]))
+
+    def test_columns_filtersAndSelectsByColumn(self):
+        query = From.columns({"price": [5, 20, 15], "qty": [1, 2, 3]})
+        actual = query.where(lambda r: r["price"] > 10) \
+                      .select(lambda r: r.price * r.qty).tolist()
+        self.assertEquals(actual, [40, 45])
+
+    def test_columns_enumeratesRows(self):
+        actual = From.columns({"a": [1, 2], "b": [3, 4]}).tolist()
+        self.assertEquals(actual, [{"a": 1, "b": 3}, {"a": 2, "b": 4}])
+        self.assertEquals(actual[0].b, 3)
+
+    def test_columns_rejectsUnequalLengths(self):
+        self.assertRaises(ValueError, From.columns, {"a": [1], "b": [1, 2]})
+
+    def test_batch_passesArrayViewsToBatchFunctions(self):
+        query = From(numpy.arange(10))
+        self.assertEquals(query.selectbatch(lambda a: a * 2, 4).tolist(),
+                          [x * 2 for x in range(10)])
+        self.assertEquals(query.wherebatch(lambda a: a > 6, 4).tolist(),
+                          [7, 8, 9])
+
+    def test_from_enumeratesArraysOfRowsRowByRow(self):
+        from linq2py.columnar import ColumnarFrom
+        data = numpy.array([[1, 5], [0, 3]])
+        query = From(data)
+        self.assertFalse(isinstance(query, ColumnarFrom))
+        self.assertEquals(
+            query.where(lambda r: r[1] > 2).select(lambda r: r.tolist())
+                 .tolist(),
+            [[1, 5], [0, 3]])
+        self.assertEquals(query.select(lambda r: r[0] + r[1]).tolist(),
+                          [6, 3])
+        self.assertRaises(ValueError, ColumnarFrom, data)
+
+    def test_select_widensSmallIntegersLikePython(self):
+        query = From(numpy.array([250, 3], numpy.uint8))
+        self.assertEquals(query.select(lambda x: x + 10).tolist(), [260, 13])
+        self.assertEquals(query.select(lambda x: x - 5).tolist(), [245, -2])
+        self.assertEquals(query.where(lambda x: x * 2 > 400).tolist(), [250])
+
+    def test_select_matchesRowPathForFloatsAndBooleans(self):
+        items = [0.1, 0.7]
+        self.assertEquals(
+            From(numpy.array(items, numpy.float32)).select(
+                lambda x: x * 3).tolist(),
+            From(numpy.array(items, numpy.float32).tolist()).select(
+                lambda x: x * 3).tolist())
+        self.assertEquals(
+            From(numpy.array([True, True])).select(lambda x: x + x)
+                                           .tolist(),
+            [2, 2])
+
+    def test_rowOperators_stillApply(self):
+        actual = From(numpy.arange(5)).orderbydecending().take(2).tolist()
+        self.assertEquals(actual, [4, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
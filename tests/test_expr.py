@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+import context
+import operator
+import pickle
+import unittest
+from collections import namedtuple
+from linq2py import From, F
+from linq2py import plan
+from linq2py.expr import Expr, compiled, field
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Item = namedtuple("Item", "name price qty")
+
+ITEMS = [Item("pen", 5, 10), Item("ink", 20, 2), Item("pad", 15, 4)]
+
+
+class ExprTestCase(unittest.TestCase):
+    """
+    Test case for the expression builder.
+    """
+
+    def test_function_usesGettersForSingleLookups(self):
+        self.assertTrue(isinstance(F.price.function, operator.attrgetter))
+        self.assertTrue(isinstance(F["id"].function, operator.itemgetter))
+        self.assertTrue(isinstance(F.method("lower").function,
+                                   operator.methodcaller))
+
+    def test_call_evaluatesNestedLookupsAndArithmetic(self):
+        row = {"user": {"id": 7}, "a": 2, "b": 3}
+        self.assertEquals(F["user"]["id"](row), 7)
+        self.assertEquals((F["a"] + F["b"] * 2)(row), 8)
+        self.assertEquals((10 - F["a"])(row), 8)
+
+    def test_call_combinesPredicatesWithAndOrNot(self):
+        pred = (F.price > 10) & ~(F.name == "ink") | (F.qty == 10)
+        self.assertEquals([pred(item) for item in ITEMS],
+                          [True, False, True])
+
+    def test_bool_raisesTypeError(self):
+        self.assertRaises(TypeError, bool, F.price > 10)
+
+    def test_isin_testsMembership(self):
+        actual = From(ITEMS).where(F.name.isin(["pen", "pad"])) \
+                            .select(F.name).tolist()
+        self.assertEquals(actual, ["pen", "pad"])
+
+    def test_fingerprint_equalForEqualStructure(self):
+        self.assertEquals((F.price > 10).fingerprint,
+                          (F.price > 10).fingerprint)
+        self.assertNotEqual((F.price > 10).fingerprint,
+                            (F.price > 11).fingerprint)
+
+    def test_fields_namesFieldsReadFromItem(self):
+        self.assertEquals((F.price * F.qty > F["x"]["y"]).fields(),
+                          frozenset(["price", "qty", "x"]))
+
+    def test_field_readsNamesThatClashWithAttributes(self):
+        row = namedtuple("Node", "op")("x")
+        self.assertEquals(field("op")(row), "x")
+
+    def test_field_readsNamesThatAreKeywords(self):
+        row = type("Row", (object,), {"class": 2, "print": 3})()
+        self.assertEquals((field("class") + 1)(row), 3)
+        self.assertEquals((field("print") > 0)(row), True)
+
+    def test_pickle_roundTrips(self):
+        pred = pickle.loads(pickle.dumps(F.price > 10))
+        self.assertEquals(pred(ITEMS[1]), True)
+
+    def test_optimize_combinesAdjacentWhereExpressions(self):
+        ops = From(ITEMS).where(F.price > 1).where(F.qty > 1).ops
+        nodes = plan.optimize(ops)
+        self.assertEquals(len(nodes), 1)
+        self.assertFalse(isinstance(nodes[0][1], Expr))
+
+    def test_from_acceptsExpressionsAsSelectors(self):
+        query = From(ITEMS)
+        self.assertEquals(query.where(F.price > 10).select(F.name).tolist(),
+                          ["ink", "pad"])
+        self.assertEquals(query.orderby(F.price).select(F.name).tolist(),
+                          ["pen", "pad", "ink"])
+        self.assertEquals(query.todictionary(F.name, F.qty),
+                          {"pen": 10, "ink": 2, "pad": 4})
+        self.assertEquals(
+            query.groupby(F.price > 10, F.name).tolist(),
+            [(False, ["pen"]), (True, ["ink", "pad"])])
+
+    def test_join_mergesWhenSortedByEqualExpressions(self):
+        outer = From(ITEMS).orderby(F.qty)
+        inner = From([(2, "a"), (4, "b")]).assorted(F[0])
+        actual = outer.join(inner, F.qty, F[0],
+                            lambda o, i: (o.name, i[1])).tolist()
+        self.assertTrue(outer._mergeable(inner, F.qty, F[0]))
+        self.assertEquals(actual, [("ink", "a"), ("pad", "b")])
+
+    def test_compiled_leavesFunctionsAlone(self):
+        fn = lambda x: x
+        self.assertTrue(compiled(fn) is fn)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_evaluatesOverColumns(self):
+        query = From.columns({"price": [5, 20, 15], "qty": [10, 2, 4]})
+        where = query.where((F.price > 10) & (F.qty < 4))
+        self.assertTrue(isinstance(where.data["price"], numpy.ndarray))
+        self.assertEquals(where.select(F.price * F.qty).tolist(), [40])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_usesLogicalOperators(self):
+        query = From.columns({"a": [2, 0], "b": [1, 3]})
+        rows = From([{"a": 2, "b": 1}, {"a": 0, "b": 3}])
+        for selector in (F["a"] & F["b"], F["a"] | F["b"], ~F["a"]):
+            self.assertEquals(
+                [bool(value) for value in query.select(selector)],
+                [bool(value) for value in rows.select(selector)])
+        self.assertEquals(query.select(~F.a).tolist(), [False, True])
+        self.assertEquals(query.where(F.a & F.b).count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
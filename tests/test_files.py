@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import context
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from linq2py import From, F
+from linq2py.files import CsvFile
+
+
+class FilesTestCase(unittest.TestCase):
+    """
+    Test case for the streaming file sources.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write(self, name, text):
+        path = os.path.join(self.tempdir, name)
+        with open(path, "wb") as handle:
+            handle.write(text)
+        return path
+
+    def test_readcsv_readsRowsByHeaderName(self):
+        path = self.write("a.csv", "name,qty\npen,10\r\nink,2\n")
+        rows = From.readcsv(path, types={"qty": int}).tolist()
+        self.assertEquals([row.name for row in rows], ["pen", "ink"])
+        self.assertEquals([row["qty"] for row in rows], [10, 2])
+        self.assertEquals(rows[0].todict(), {"name": "pen", "qty": 10})
+
+    def test_readcsv_readsFieldsNamedLikeRecordInternals(self):
+        path = self.write("a.csv", "line,layout,parsed,values\n1,2,3,4\n")
+        row = From.readcsv(path).first()
+        self.assertEquals((row.line, row.layout, row.parsed, row.values),
+                          ("1", "2", "3", "4"))
+        self.assertEquals(From.readcsv(path).select(F.line).tolist(), ["1"])
+        path = self.write("a.jsonl", '{"line": 5, "values": [6]}\n')
+        self.assertEquals(
+            From.readjsonl(path).select(lambda r: (r.line, r.values))
+                                .tolist(),
+            [(5, [6])])
+
+    def test_readcsv_handlesQuotedFields(self):
+        path = self.write("a.csv", 'name,note\npen,"blue, fine"\n')
+        self.assertEquals(From.readcsv(path).select(F.note).tolist(),
+                          ["blue, fine"])
+
+    def test_readcsv_onlyConvertsFieldsThatAreRead(self):
+        calls = []
+
+        def count(text):
+            calls.append(text)
+            return int(text)
+
+        path = self.write("a.csv", "a,b\n1,x\n2,y\n3,z\n")
+        actual = From.readcsv(path, types={"a": count, "b": count}) \
+                     .where(F.a > 1).take(1).tolist()
+        self.assertEquals(len(actual), 1)
+        self.assertEquals(calls, ["1", "2"])
+
+    def test_readcsv_withoutHeaderUsesNames(self):
+        path = self.write("a.csv", "pen;10\n")
+        rows = From.readcsv(path, ";", header=False, names=["name", "qty"])
+        self.assertEquals(rows.select(F.qty).tolist(), ["10"])
+
+    def test_readfixed_cutsFieldsByPosition(self):
+        path = self.write("a.txt", "pen   10\nink    2\n")
+        rows = From.readfixed(path, [("name", 0, 6), ("qty", 6, 8)],
+                              {"qty": int})
+        self.assertEquals(rows.select(lambda r: (r.name, r.qty)).tolist(),
+                          [("pen", 10), ("ink", 2)])
+
+    def test_readjsonl_decodesLines(self):
+        lines = [json.dumps({"id": n, "tags": ["x"] * n}) for n in range(3)]
+        path = self.write("a.jsonl", "\n".join(lines) + "\n\n")
+        rows = From.readjsonl(path)
+        self.assertEquals(rows.where(F.id > 0).select(F.tags).tolist(),
+                          [["x"], ["x", "x"]])
+
+    def test_take_stopsReadingEarly(self):
+        path = self.write("a.csv", "n\n" + "".join(
+            "%d\n" % n for n in range(10000)))
+        self.assertEquals(From.readcsv(path).skip(5).take(2)
+                              .select(F.n).tolist(), ["5", "6"])
+
+    def test_split_readsEveryLineExactlyOnce(self):
+        path = self.write("a.csv", "n\n" + "".join(
+            "%d\n" % n for n in range(1000)))
+        for count in (1, 3, 7, 2000):
+            shards = CsvFile(path, types={"n": int}).split(count)
+            actual = [row.n for shard in shards for row in From(shard)]
+            self.assertEquals(actual, list(range(1000)))
+
+    def test_emptyFile_hasNoRows(self):
+        path = self.write("a.jsonl", "")
+        self.assertEquals(From.readjsonl(path).tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
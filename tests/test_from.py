@@ -155,6 +155,32 @@ class FromTestCase(unittest.TestCase):
         self.assertEquals(list(groups[1]), [3, 6])
         self.assertEquals(list(groups[2]), [2, 4])
 
+    def test_groupadjacent_groupsRunsOfEqualKeys(self):
+        groups = From([1, 1, 2, 1]).groupadjacent().tolist()
+        self.assertEquals(groups, [(1, [1, 1]), (2, [2]), (1, [1])])
+
+    def test_groupadjacent_yieldsEachGroupBeforeReadingTheRest(self):
+        source = iter([1, 1, 2, 3, 3])
+        groups = From(source).groupadjacent().toseq()
+        self.assertEquals(next(groups), (1, [1, 1]))
+        self.assertEquals(next(source), 3)
+
+    def test_groupadjacent_foldsGroupsWithTheAccumulator(self):
+        groups = From([(1, 2), (1, 3), (2, 4)]).groupadjacent(
+            lambda x: x[0], lambda x: x[1],
+            accumulatorfn=lambda total, x: total + x).tolist()
+        self.assertEquals(groups, [(1, 5), (2, 4)])
+
+    def test_groupby_sortedGroupsAdjacentItems(self):
+        groups = From([1, 1, 2, 3, 3]).groupby(
+            resultfunc=lambda g: (g[0], len(g[1])), sorted=True).tolist()
+        self.assertEquals(groups, [(1, 2), (2, 1), (3, 2)])
+
+    def test_groupby_foldsGroupsWithTheAccumulator(self):
+        groups = From([1, 3, 2, 1]).groupby(
+            accumulatorfn=lambda total, x: total + x, seed=10).tolist()
+        self.assertEquals(groups, [(1, 12), (3, 13), (2, 12)])
+
     def test_groupjoin_collectionsJoinAndGroupProperly(self):
         outer = [[1, 'a'], [2, 'b'], [3, 'c']]
         inner = [[1, 'A'], [2, 'B'], [2, 'bb'], [4, 'D']]
@@ -367,3 +393,114 @@ class FromTestCase(unittest.TestCase):
         self.assertEquals(
             From(self.items).wherei(lambda item, i: item > 5).tolist(),
             [6, 7, 8, 9, 10])
+
+    def test_take_negativeNumberReturnsEmptySeq(self):
+        self.assertEquals(From(self.items).take(-1).tolist(), [])
+
+    def test_skip_thenTakeReturnsTheItemsInBetween(self):
+        self.assertEquals(
+            From(iter(self.items)).skip(2).take(3).tolist(),
+            [3, 4, 5])
+
+    def test_first_returnsFalsyItemsWhenNoPredicateIsGiven(self):
+        self.assertEquals(From([0, 1]).first(), 0)
+
+    def test_firstordefault_returnsFalsyItems(self):
+        self.assertEquals(From([0, 1]).firstordefault(9), 0)
+        self.assertEquals(From([None, 1]).firstordefault(9), None)
+        self.assertEquals(From([2, 0]).firstordefault(9, lambda x: x < 1), 0)
+
+    def test_batch_returnsListsOfUpToTheGivenSize(self):
+        self.assertEquals(
+            From(self.items).batch(4).tolist(),
+            [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]])
+
+    def test_batch_rejectsSizesBelowOneStraightAway(self):
+        self.assertRaises(ValueError, From(self.items).batch, 0)
+        self.assertRaises(ValueError, From(self.items).selectbatch,
+                          lambda batch: batch, 0)
+        self.assertRaises(ValueError, From(self.items).wherebatch,
+                          lambda batch: batch, -1)
+
+    def test_selectbatch_callsFunctionOncePerBatch(self):
+        calls = []
+
+        def double(batch):
+            calls.append(len(batch))
+            return [item * 2 for item in batch]
+
+        actual = From(self.items).selectbatch(double, 4).take(5).tolist()
+        self.assertEquals(actual, [2, 4, 6, 8, 10])
+        self.assertEquals(calls, [4, 4])
+
+    def test_selectbatch_raisesWhenResultCountDiffers(self):
+        query = From(self.items).selectbatch(lambda batch: batch[:1], 3)
+        self.assertRaises(ValueError, query.tolist)
+
+    def test_wherebatch_keepsItemsMarkedTrue(self):
+        actual = From(self.items).wherebatch(
+            lambda batch: [item % 3 == 0 for item in batch], 4).tolist()
+        self.assertEquals(actual, [3, 6, 9])
+
+    def test_memoize_replaysForEveryTerminalCall(self):
+        reads = []
+        query = From(self.items).select(
+            lambda x: reads.append(x) or x).memoize()
+        self.assertEquals(query.count(), 10)
+        self.assertEquals(query.tolist(), self.items)
+        self.assertEquals(reads, self.items)
+
+    def test_memoize_onlyReadsItemsThatAreAskedFor(self):
+        reads = []
+        query = From(self.items).select(
+            lambda x: reads.append(x) or x).memoize()
+        self.assertEquals(query.take(2).tolist(), [1, 2])
+        self.assertEquals(query.take(3).tolist(), [1, 2, 3])
+        self.assertEquals(reads, [1, 2, 3])
+
+    def test_share_letsReadersInterleave(self):
+        query = From(iter(self.items)).share()
+        first, second = iter(query), iter(query)
+        actual = [(a, b) for a, b in zip(first, second)]
+        self.assertEquals(actual, [(x, x) for x in self.items])
+
+    def test_share_discardsItemsEveryReaderHasPassed(self):
+        shared = From(self.items).share()
+        first, second = iter(shared), iter(shared)
+        for _ in range(6):
+            next(first)
+        for _ in range(3):
+            next(second)
+        self.assertEquals(shared.source.items, [4, 5, 6])
+        self.assertEquals(list(second), self.items[3:])
+        self.assertRaises(ValueError, iter, shared)
+
+    def test_count_countsFalsyItems(self):
+        self.assertEquals(From([0, None, ""]).count(), 3)
+        self.assertEquals(From(iter([0, None, ""])).count(), 3)
+
+    def test_last_returnsFalsyItems(self):
+        self.assertEquals(From([1, 0]).last(), 0)
+        self.assertEquals(From(iter([1, 0])).last(), 0)
+
+    def test_elementat_onlySelectsTheRequestedItemOfAList(self):
+        calls = []
+        query = From(self.items).select(lambda x: calls.append(x) or x * 2)
+        self.assertEquals(query.skip(2).elementat(3), 12)
+        self.assertEquals(query.count(), 10)
+        self.assertEquals(query.last(), 20)
+        self.assertEquals(calls, [6, 10])
+
+    def test_reverse_keepsListsIndexable(self):
+        query = From(xrange(10)).select(lambda x: x * 2).reverse()
+        self.assertEquals(query.take(3).tolist(), [18, 16, 14])
+        self.assertEquals(query.elementat(9), 0)
+        self.assertEquals(query.reverse().skip(8).tolist(), [16, 18])
+
+    def test_reverse_skipAndTakePastTheEnd(self):
+        query = From([1, 2, 3]).reverse()
+        self.assertEquals(query.skip(3).tolist(), [])
+        self.assertEquals(query.skip(5).tolist(), [])
+        self.assertEquals(query.take(0).tolist(), [])
+        self.assertEquals(query.skip(2).take(5).tolist(), [1])
+        self.assertEquals(From(xrange(3)).reverse().skip(3).tolist(), [])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From, F
+from linq2py.expr import Row
+
+
+class CountingRow(Row):
+    """
+    A row that counts how often its fields are read.
+    """
+
+    reads = 0
+
+    def __getitem__(self, name):
+        CountingRow.reads += 1
+        return Row.__getitem__(self, name)
+
+
+class IndexesTestCase(unittest.TestCase):
+    """
+    Test case for lookups and indexed sequences.
+    """
+
+    def setUp(self):
+        self.items = [CountingRow(user=n % 4, n=n) for n in range(20)]
+        CountingRow.reads = 0
+
+    def test_tolookup_groupsItemsByKey(self):
+        lookup = From(range(7)).tolookup(lambda x: x % 3, lambda x: x * 10)
+        self.assertEquals(lookup[1], (10, 40))
+        self.assertEquals(lookup[5], ())
+        self.assertTrue(lookup.contains(2))
+        self.assertFalse(5 in lookup)
+        self.assertEquals(lookup.count(0), 3)
+        self.assertEquals(list(lookup), [(0, (0, 30, 60)), (1, (10, 40)),
+                                         (2, (20, 50))])
+
+    def test_indexed_answersEqualityWithoutScanning(self):
+        query = From(self.items).indexed(F["user"])
+        CountingRow.reads = 0
+        actual = query.where(F["user"] == 2).select(F["n"]).tolist()
+        self.assertEquals(actual, [2, 6, 10, 14, 18])
+        self.assertEquals(CountingRow.reads, 5)
+        self.assertEquals(query.first(F["user"] == 3)["n"], 3)
+        self.assertEquals(query.where(F["user"] == 9).tolist(), [])
+
+    def test_indexed_sortedIndexAnswersRanges(self):
+        query = From(self.items).indexed(F["user"]).indexed(F["n"], "sorted")
+        actual = query.where((F["n"] >= 15) | (5 > F["n"])) \
+                      .where(F["user"].isin([0, 1])).select(F["n"]).tolist()
+        self.assertEquals(actual, [0, 1, 4, 16, 17])
+
+    def test_indexed_leavesOtherPredicatesToThePlan(self):
+        query = From(self.items).indexed(F["user"])
+        expected = From(self.items).where(F["n"] > 8).where(
+            F["user"] == 1).select(F["n"]).tolist()
+        actual = query.where(F["n"] > 8).where(F["user"] == 1) \
+                      .select(F["n"]).tolist()
+        self.assertEquals(actual, expected)
+        self.assertEquals(query.where(lambda row: row["n"] < 3).count(), 3)
+
+    def test_indexed_rejectsOpaqueKeysAndUnknownKinds(self):
+        self.assertRaises(TypeError, From(self.items).indexed,
+                          lambda row: row["user"])
+        self.assertRaises(ValueError, From(self.items).indexed,
+                          F["user"], "btree")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import joins
+
+
+class JoinsTestCase(unittest.TestCase):
+    """
+    Test case for the hash join operators.
+    """
+
+    def setUp(self):
+        self.outer = [[1, 'a'], [2, 'b'], [2, 'b2'], [3, 'c']]
+        self.inner = [[1, 'A'], [2, 'B'], [2, 'bb'], [4, 'D']]
+        self.key = lambda row: row[0]
+        self.pair = lambda out, in_: (out[1], in_[1] if in_ else None)
+
+    def join(self, build):
+        return From(self.outer).join(
+            self.inner, self.key, self.key, self.pair, build=build).tolist()
+
+    def test_choosebuild_picksTheSmallerSide(self):
+        self.assertEquals(joins.choosebuild(10, 5), joins.INNER)
+        self.assertEquals(joins.choosebuild(5, 10), joins.OUTER)
+
+    def test_choosebuild_picksTheSizedSideWhenOnlyOneIsKnown(self):
+        self.assertEquals(joins.choosebuild(5, None), joins.OUTER)
+        self.assertEquals(joins.choosebuild(None, 5), joins.INNER)
+
+    def test_choosebuild_honoursTheHint(self):
+        self.assertEquals(joins.choosebuild(5, 10, "inner"), joins.INNER)
+
+    def test_choosebuild_rejectsUnknownHints(self):
+        self.assertRaises(ValueError, joins.choosebuild, 1, 1, "left")
+
+    def test_join_keepsDuplicateKeysOnBothSides(self):
+        expected = [('a', 'A'), ('b', 'B'), ('b', 'bb'),
+                    ('b2', 'B'), ('b2', 'bb')]
+        self.assertEquals(self.join("inner"), expected)
+
+    def test_join_buildingOuterSideFollowsInnerOrder(self):
+        expected = [('a', 'A'), ('b', 'B'), ('b2', 'B'),
+                    ('b', 'bb'), ('b2', 'bb')]
+        self.assertEquals(self.join("outer"), expected)
+
+    def test_join_buildsTheSmallerSideWhenInnerIsAFrom(self):
+        outer = self.outer + [[5, 'e']] * 10
+        expected = From(outer).join(
+            self.inner, self.key, self.key, self.pair, build="inner")
+        actual = From(outer).join(
+            From(self.inner), self.key, self.key, self.pair)
+        self.assertEquals(actual.tolist(), expected.tolist())
+
+    def test_leftjoin_passesDefaultForUnmatchedRows(self):
+        actual = From(self.outer).leftjoin(
+            self.inner, self.key, self.key, self.pair).tolist()
+        self.assertEquals(actual, [('a', 'A'), ('b', 'B'), ('b', 'bb'),
+                                   ('b2', 'B'), ('b2', 'bb'), ('c', None)])
+
+    def test_leftjoin_buildingOuterSideYieldsUnmatchedRowsLast(self):
+        actual = From(self.outer).leftjoin(
+            iter(self.inner), self.key, self.key, self.pair,
+            build="outer").tolist()
+        self.assertEquals(actual[-1], ('c', None))
+        self.assertEquals(len(actual), 6)
+
+    def test_semijoin_returnsEachMatchingRowOnce(self):
+        for build in ("inner", "outer"):
+            actual = From(self.outer).semijoin(
+                self.inner, self.key, self.key, build=build).tolist()
+            self.assertEquals(actual, [[1, 'a'], [2, 'b'], [2, 'b2']])
+
+    def test_antijoin_returnsRowsWithoutAMatch(self):
+        for build in ("inner", "outer"):
+            actual = From(self.outer).antijoin(
+                self.inner, self.key, self.key, build=build).tolist()
+            self.assertEquals(actual, [[3, 'c']])
+
+    def test_groupjoin_yieldsEveryOuterRowEvenWithDuplicateKeys(self):
+        actual = From(self.outer).groupjoin(
+            self.inner, self.key, self.key,
+            lambda out, ins: (out[1], len(ins))).tolist()
+        self.assertEquals(actual, [('a', 1), ('b', 2), ('b2', 2), ('c', 0)])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import kernel
+
+
+class KernelTestCase(unittest.TestCase):
+    """
+    Test case for compiled query kernels.
+    """
+
+    def setUp(self):
+        self.items = range(1, 21)
+
+    def test_compile_matchesInterpretedResults(self):
+        query = From(self.items).where(lambda x: x % 2 == 0).select(
+            lambda x: x * 3).oftype(int).skip(1).take(4)
+        self.assertEquals(query.compile().tolist(), query.tolist())
+
+    def test_compile_supportsIndexedOperators(self):
+        query = From(self.items).wherei(lambda x, i: i % 3 == 0).skipwhile(
+            lambda x, i: x < 5).takewhile(lambda x, i: i < 3)
+        self.assertEquals(query.compile().tolist(), [7, 10, 13])
+
+    def test_compile_takeStopsReadingTheSourceEarly(self):
+        source = iter(self.items)
+        From(source).where(lambda x: x > 2).take(2).compile().tolist()
+        self.assertEquals(next(source), 5)
+
+    def test_compile_takeZeroReadsNothing(self):
+        source = iter(self.items)
+        self.assertEquals(From(source).take(0).compile().tolist(), [])
+        self.assertEquals(next(source), 1)
+
+    def test_compile_reusesKernelForQueriesWithTheSameShape(self):
+        first = From([1, 2, 3]).where(lambda x: x > 1).take(1).compile()
+        second = From([4, 5, 6]).where(lambda x: x > 4).take(2).compile()
+        self.assertTrue(first.source.kernel is second.source.kernel)
+        self.assertEquals(first.tolist(), [2])
+        self.assertEquals(second.tolist(), [5, 6])
+
+    def test_shapeof_distinguishesSliceBounds(self):
+        take = kernel.shapeof(kernel.flatten(From([]).take(1).ops))
+        skip = kernel.shapeof(kernel.flatten(From([]).skip(1).ops))
+        self.assertNotEqual(take, skip)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From, F
+
+
+class MaterializedTestCase(unittest.TestCase):
+    """
+    Test case for incrementally maintained queries.
+    """
+
+    def setUp(self):
+        self.rows = [("a", 1), ("b", 5), ("a", 7), ("c", 2)]
+        self.query = From(self.rows).where(F[1] > 1)
+
+    def test_insertAndDelete_updateFilteredRows(self):
+        view = self.query.select(F[1]).materialize()
+        self.assertEquals(view.tolist(), [5, 7, 2])
+        view.insert([("b", 9), ("d", 0)])
+        view.delete([("b", 5), ("a", 1)])
+        self.assertEquals(view.tolist(), [7, 2, 9])
+        self.assertEquals((view.count(), view.sum(), view.max()), (3, 18, 9))
+
+    def test_delete_removesEarliestCopyAndRejectsUnknownRows(self):
+        view = From([1, 2, 1]).select(F * 10).materialize()
+        view.insert([1])
+        view.delete([1])
+        self.assertEquals(view.tolist(), [20, 10, 10])
+        self.assertRaises(ValueError, view.delete, [3])
+
+    def test_key_identifiesUnhashableRows(self):
+        rows = [{"id": 1, "n": 3}, {"id": 2, "n": 4}]
+        self.assertRaises(TypeError, From(rows).materialize)
+        view = From(rows).select(F["n"]).materialize(key=F["id"])
+        view.delete([{"id": 1}])
+        self.assertEquals(view.tolist(), [4])
+
+    def test_materialize_rejectsOperatorsThatSeeOtherRows(self):
+        self.assertRaises(ValueError, From(self.rows).take(2).materialize)
+        self.assertRaises(ValueError, From(self.rows).orderby().materialize)
+        self.assertRaises(ValueError,
+                          From(From(self.rows).take(2)).materialize)
+
+    def test_groupby_keepsCountsAndSumsPerKey(self):
+        view = self.query.materialize()
+        groups = view.groupby(F[0], F[1])
+        view.insert([("c", 4), ("e", 3)])
+        view.delete([("b", 5)])
+        self.assertEquals(groups.tolist(),
+                          [("a", [7]), ("c", [2, 4]), ("e", [3])])
+        self.assertEquals((groups.count("c"), groups.sum("c")), (2, 6))
+        self.assertFalse("b" in groups)
+
+    def test_join_matchesJoinOfCurrentRows(self):
+        kinds = [("a", "Alpha"), ("c", "Gamma")]
+        left = self.query.materialize()
+        right = From(kinds).materialize()
+        joined = left.join(right, F[0], F[0],
+                           lambda row, kind: (kind[1], row[1]))
+        left.insert([("c", 3)])
+        right.insert([("a", "First")])
+        right.delete([("c", "Gamma")])
+        self.rows.append(("c", 3))
+        kinds = [("a", "Alpha"), ("a", "First")]
+        expected = From(self.rows).where(F[1] > 1).join(
+            kinds, F[0], F[0], lambda row, kind: (kind[1], row[1])).tolist()
+        self.assertEquals(joined.tolist(), expected)
+        left.delete([("a", 7)])
+        self.assertEquals(joined.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
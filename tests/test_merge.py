@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import merge
+
+
+def key(row):
+    return row[0]
+
+
+def pair(out, in_):
+    return (out[1], in_[1] if in_ else None)
+
+
+class MergeTestCase(unittest.TestCase):
+    """
+    Test case for the sorted-input merge operators.
+    """
+
+    def setUp(self):
+        self.outer = [[1, 'a'], [2, 'b'], [2, 'b2'], [3, 'c'], [5, 'e']]
+        self.inner = [[0, 'Z'], [1, 'A'], [2, 'B'], [2, 'bb'], [4, 'D']]
+
+    def sortedjoin(self, method, *args):
+        outer = From(iter(self.outer)).assorted(key)
+        inner = From(iter(self.inner)).assorted(key)
+        return getattr(outer, method)(inner, key, key, *args).tolist()
+
+    def test_join_mergesSortedInputsWithDuplicateKeys(self):
+        self.assertEquals(
+            self.sortedjoin("join", pair),
+            [('a', 'A'), ('b', 'B'), ('b', 'bb'), ('b2', 'B'), ('b2', 'bb')])
+
+    def test_join_mergeMatchesHashJoin(self):
+        hashed = From(self.outer).join(self.inner, key, key, pair).tolist()
+        self.assertEquals(sorted(self.sortedjoin("join", pair)),
+                          sorted(hashed))
+
+    def test_leftjoin_mergesSortedInputs(self):
+        self.assertEquals(
+            self.sortedjoin("leftjoin", pair)[-2:],
+            [('c', None), ('e', None)])
+
+    def test_semijoin_mergesSortedInputs(self):
+        self.assertEquals(
+            self.sortedjoin("semijoin"),
+            [[1, 'a'], [2, 'b'], [2, 'b2']])
+
+    def test_antijoin_mergesSortedInputs(self):
+        self.assertEquals(self.sortedjoin("antijoin"), [[3, 'c'], [5, 'e']])
+
+    def test_groupjoin_mergesSortedInputs(self):
+        actual = self.sortedjoin(
+            "groupjoin", lambda out, ins: (out[1], len(ins)))
+        self.assertEquals(
+            actual, [('a', 1), ('b', 2), ('b2', 2), ('c', 0), ('e', 0)])
+
+    def test_intersect_mergesSortedInputs(self):
+        actual = From([1, 2, 2, 4, 6]).assorted().intersect(
+            From([2, 3, 4, 4]).assorted()).tolist()
+        self.assertEquals(actual, [2, 4])
+
+    def test_except_mergesSortedInputs(self):
+        actual = From([1, 2, 2, 4, 6]).assorted().except_(
+            From([2, 3, 4]).assorted()).tolist()
+        self.assertEquals(actual, [1, 6])
+
+    def test_orderby_declaresTheResultSorted(self):
+        query = From([[3], [1], [2]]).orderby(key)
+        self.assertTrue(query.sortedby is key)
+
+    def test_where_keepsTheSortDeclaration(self):
+        query = From([]).assorted(key).where(lambda x: x).take(2)
+        self.assertTrue(query.sortedby is key)
+
+    def test_select_dropsTheSortDeclaration(self):
+        query = From([]).assorted(key).select(lambda x: x)
+        self.assertTrue(query.sortedby is None)
+
+    def test_merge_combinesSortedSourcesStably(self):
+        actual = From.merge([[1, 'a'], [3, 'a']], [[1, 'b'], [2, 'b']],
+                            key=key).tolist()
+        self.assertEquals(actual,
+                          [[1, 'a'], [1, 'b'], [2, 'b'], [3, 'a']])
+
+    def test_merge_rejectsUnknownKeywords(self):
+        self.assertRaises(TypeError, From.merge, [], reverse=True)
+
+    def test_merge_isLazy(self):
+        source = iter([1, 2, 3])
+        query = merge.merge([source], key)
+        self.assertEquals(next(source), 1)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From, OrderedFrom
+
+
+class OrderedFromTestCase(unittest.TestCase):
+    """
+    Test case for the OrderedFrom class.
+    """
+
+    def setUp(self):
+        self.items = [("b", 2, "x"), ("a", 2, "y"), ("b", 1, "z"),
+                      ("a", 1, "w"), ("b", 2, "v")]
+
+    def test_orderby_returnsAnOrderedFrom(self):
+        self.assertTrue(isinstance(From([]).orderby(), OrderedFrom))
+
+    def test_orderby_isDeferredUntilEnumeration(self):
+        items = [3, 1]
+        query = From(items).orderby()
+        items.append(2)
+        self.assertEquals(query.tolist(), [1, 2, 3])
+
+    def test_thenby_ordersByEachKeyInTurn(self):
+        actual = From(self.items).orderby(lambda x: x[0]).thenby(
+            lambda x: x[1]).tolist()
+        self.assertEquals(actual, [("a", 1, "w"), ("a", 2, "y"),
+                                   ("b", 1, "z"), ("b", 2, "x"),
+                                   ("b", 2, "v")])
+
+    def test_thenbydescending_mixesDirections(self):
+        actual = From(self.items).orderby(lambda x: x[0]).thenbydescending(
+            lambda x: x[1]).thenby(lambda x: x[2]).tolist()
+        self.assertEquals(actual, [("a", 2, "y"), ("a", 1, "w"),
+                                   ("b", 2, "v"), ("b", 2, "x"),
+                                   ("b", 1, "z")])
+
+    def test_thenby_afterOrderbydecendingMixesDirections(self):
+        actual = From(self.items).orderbydecending(lambda x: x[0]).thenby(
+            lambda x: x[1]).select(lambda x: x[2]).tolist()
+        self.assertEquals(actual, ["z", "x", "v", "w", "y"])
+
+    def test_thenby_computesEachKeyOncePerRow(self):
+        calls = []
+
+        def key(x):
+            calls.append(x)
+            return x[1]
+        From(self.items).orderby(lambda x: x[0]).thenby(key).tolist()
+        self.assertEquals(len(calls), len(self.items))
+
+    def test_thenby_doesNotChangeTheOriginalOrdering(self):
+        ordered = From(self.items).orderby(lambda x: x[1])
+        ordered.thenbydescending(lambda x: x[2])
+        self.assertEquals(ordered.select(lambda x: x[2]).tolist(),
+                          ["z", "w", "x", "y", "v"])
+
+    def test_orderby_sortsStablyOnEqualKeys(self):
+        actual = From(self.items).orderbydecending(
+            lambda x: x[1]).select(lambda x: x[2]).tolist()
+        self.assertEquals(actual, ["x", "y", "v", "z", "w"])
+
+    def test_take_selectsTheTopItemsWithoutSortingEverything(self):
+        query = From(self.items).orderby(lambda x: x[1]).thenbydescending(
+            lambda x: x[2]).take(3)
+        self.assertEquals(query.select(lambda x: x[2]).tolist(),
+                          ["z", "w", "y"])
+
+    def test_take_usesTheHeapForOrderedSources(self):
+        heads = []
+        ordered = From(range(100)).orderbydecending()
+        head = ordered.source.head
+        ordered.source.head = lambda n: heads.append(n) or head(n)
+        self.assertEquals(ordered.skip(2).take(3).tolist(), [97, 96, 95])
+        self.assertEquals(heads, [5])
+
+    def test_take_keepsStableOrderForEqualKeys(self):
+        actual = From(self.items).orderbydecending(
+            lambda x: x[1]).take(3).select(lambda x: x[2]).tolist()
+        self.assertEquals(actual, ["x", "y", "v"])
+
+    def test_first_returnsTheFirstItemInOrder(self):
+        query = From(self.items).orderby(lambda x: x[0]).thenbydescending(
+            lambda x: x[1])
+        self.assertEquals(query.first(), ("a", 2, "y"))
+        self.assertEquals(query.first(lambda x: x[0] == "b"), ("b", 2, "x"))
+
+    def test_firstordefault_returnsTheFirstItemInOrderOrDefault(self):
+        query = From([2, 0, 1]).orderby()
+        self.assertEquals(query.firstordefault(9), 0)
+        self.assertEquals(query.firstordefault(9, lambda x: x > 5), 9)
+
+    def test_last_returnsTheLastItemInOrder(self):
+        query = From(self.items).orderby(lambda x: x[0]).thenbydescending(
+            lambda x: x[1])
+        self.assertEquals(query.last(), ("b", 1, "z"))
+        self.assertEquals(query.last(lambda x: x[1] == 2), ("b", 2, "v"))
+
+    def test_last_raisesIndexErrorWhenNothingMatches(self):
+        self.assertRaises(IndexError, From([]).orderby().last)
+
+    def test_elementat_returnsTheItemAtTheIndexInOrder(self):
+        query = From([5, 3, 9, 1]).orderby()
+        self.assertEquals(query.elementat(2), 5)
+        self.assertEquals(query.elementatordefault(4, -1), -1)
+
+    def test_minby_returnsTheRowWithTheLowestKey(self):
+        self.assertEquals(From(self.items).minby(lambda x: x[1]),
+                          ("b", 1, "z"))
+
+    def test_maxby_returnsTheFirstRowWithTheHighestKey(self):
+        self.assertEquals(From(self.items).maxby(lambda x: x[1]),
+                          ("b", 2, "x"))
+
+    def test_externalsort_spillsRunsAndMergesThemInOrder(self):
+        items = [(i * 7919) % 1000 for i in range(1000)]
+        actual = From(items).orderby().externalsort(maxrows=64).tolist()
+        self.assertEquals(actual, sorted(items))
+
+    def test_externalsort_keepsMixedDirectionsAndStability(self):
+        items = [(i % 3, i % 5, i) for i in range(100)]
+        expected = From(items).orderby(lambda x: x[0]).thenbydescending(
+            lambda x: x[1]).tolist()
+        actual = From(items).orderby(lambda x: x[0]).externalsort(
+            maxrows=7).thenbydescending(lambda x: x[1]).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_externalsort_honoursAByteBudget(self):
+        items = ["%05d" % ((i * 31) % 500) for i in range(500)]
+        actual = From(items).orderbydecending().externalsort(
+            maxbytes=1000).tolist()
+        self.assertEquals(actual, sorted(items, reverse=True))
+
+    def test_externalsort_takeStillSelectsWithAHeap(self):
+        query = From(range(50)).orderbydecending().externalsort(maxrows=5)
+        self.assertEquals(query.take(3).tolist(), [49, 48, 47])
+
+    def test_externalsort_requiresABudget(self):
+        self.assertRaises(ValueError, From([]).orderby().externalsort)
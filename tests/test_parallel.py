@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py.parallel import ParallelFrom
+
+
+def double(x):
+    return x * 2
+
+
+def iseven(x):
+    return x % 2 == 0
+
+
+def pairwithindex(row, index):
+    return [(index, row), (index, -row)]
+
+
+def isbig(x):
+    return x > 90
+
+
+def modfive(x):
+    return x % 5
+
+
+def add(total, x):
+    return total + x
+
+
+def countinto(total, x):
+    return total + 1
+
+
+def fail(x):
+    raise ValueError("bad row %s" % x)
+
+
+class ParallelFromTestCase(unittest.TestCase):
+    """
+    Test case for the ParallelFrom class.
+    """
+
+    def setUp(self):
+        self.items = range(100)
+
+    def test_asparallel_returnsAParallelFrom(self):
+        self.assertTrue(isinstance(From([]).asparallel(), ParallelFrom))
+
+    def test_whereSelect_runInWorkersAndKeepOrder(self):
+        actual = From(self.items).asparallel(
+            workers=2, chunksize=7).where(iseven).select(double).tolist()
+        self.assertEquals(actual, [x * 2 for x in self.items if x % 2 == 0])
+
+    def test_unordered_returnsTheSameItems(self):
+        actual = From(self.items).asparallel(
+            workers=2, chunksize=7, ordered=False).select(double).tolist()
+        self.assertEquals(sorted(actual), [x * 2 for x in self.items])
+
+    def test_selectmany_passesSourceIndexes(self):
+        actual = From([5, 6, 7]).asparallel(
+            workers=2, chunksize=2).selectmany(pairwithindex).tolist()
+        self.assertEquals(actual, From([5, 6, 7]).selectmany(
+            pairwithindex).tolist())
+
+    def test_selectmany_afterWhereRunsSequentially(self):
+        query = From(self.items).asparallel(workers=2).where(
+            iseven).selectmany(pairwithindex)
+        self.assertFalse(isinstance(query, ParallelFrom))
+        self.assertEquals(query.take(2).tolist(), [(0, 0), (0, 0)])
+
+    def test_take_dropsBackToSequentialOperators(self):
+        query = From(self.items).asparallel(workers=2).select(double).take(3)
+        self.assertFalse(isinstance(query, ParallelFrom))
+        self.assertEquals(query.tolist(), [0, 2, 4])
+
+    def test_asequential_returnsAPlainFrom(self):
+        query = From(self.items).asparallel(workers=2).select(
+            double).asequential().where(lambda x: x > 190)
+        self.assertEquals(query.tolist(), [192, 194, 196, 198])
+
+    def test_lambdas_raiseAClearTypeError(self):
+        query = From(self.items).asparallel().select(lambda x: x)
+        self.assertRaises(TypeError, query.tolist)
+
+    def test_workerErrors_areRaisedInTheCaller(self):
+        query = From(self.items).asparallel(workers=2).select(fail)
+        self.assertRaises(ValueError, query.tolist)
+
+    def test_count_countsChunksInWorkers(self):
+        query = From(self.items).asparallel(workers=2, chunksize=9)
+        self.assertEquals(query.count(iseven), 50)
+
+    def test_sum_sumsChunksInWorkers(self):
+        query = From(self.items).asparallel(workers=2, chunksize=9)
+        self.assertEquals(query.select(double).sum(), 9900)
+
+    def test_minMax_ignoreChunksWithoutMatches(self):
+        query = From(self.items).asparallel(workers=2, chunksize=9)
+        self.assertEquals(query.min(isbig), 91)
+        self.assertEquals(query.max(iseven), 98)
+
+    def test_min_raisesWhenNothingMatches(self):
+        query = From([1, 3]).asparallel(workers=2)
+        self.assertRaises(ValueError, query.min, iseven)
+
+    def test_average_combinesChunkTotals(self):
+        query = From(self.items).asparallel(workers=2, chunksize=9)
+        self.assertEquals(query.average(), 49)
+
+    def test_aggregate_combinesPartialsWithTheCombiner(self):
+        query = From(self.items).asparallel(workers=2, chunksize=9)
+        self.assertEquals(query.aggregate(add), 4950)
+        self.assertEquals(
+            query.aggregate(countinto, seed=0, combinefn=add), 100)
+
+    def test_aggregate_appliesTheSeedOnce(self):
+        for chunksize in (1, 9, 1000):
+            query = From(self.items).asparallel(workers=2,
+                                                chunksize=chunksize)
+            self.assertEquals(query.aggregate(add, seed=10), 4960)
+        self.assertEquals(
+            From([]).asparallel(workers=2).aggregate(add, seed=10), 10)
+
+    def test_groupby_matchesSequentialGroups(self):
+        items = [(x * 7) % 13 for x in self.items]
+        expected = From(items).groupby(modfive).tolist()
+        actual = From(items).asparallel(
+            workers=3, chunksize=8).groupby(modfive).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_groupby_appliesTheSeedOncePerGroup(self):
+        expected = From(self.items).groupby(
+            modfive, accumulatorfn=add, seed=10).tolist()
+        actual = From(self.items).asparallel(
+            workers=3, chunksize=8).groupby(
+            modfive, accumulatorfn=add, seed=10).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_groupby_combinesPerChunkAccumulators(self):
+        expected = From(self.items).groupby(
+            modfive, accumulatorfn=add).tolist()
+        actual = From(self.items).asparallel(
+            workers=3, chunksize=8).groupby(
+            modfive, accumulatorfn=add).tolist()
+        self.assertEquals(actual, expected)
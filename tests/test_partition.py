@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import partition
+from linq2py.external import Budget
+
+
+class PartitionTestCase(unittest.TestCase):
+    """
+    Test case for the spilling groupby and groupjoin.
+    """
+
+    def setUp(self):
+        self.items = [(i * 37) % 101 for i in range(1000)]
+
+    def test_groupby_spillingMatchesInMemoryGroups(self):
+        expected = From(self.items).groupby(lambda x: x % 50).tolist()
+        actual = From(self.items).groupby(
+            lambda x: x % 50, maxrows=40).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_groupby_spillingAppliesElementAndResultFunctions(self):
+        expected = From(self.items).groupby(
+            lambda x: x % 7, lambda x: x * 2,
+            lambda g: (g[0], sum(g[1]))).tolist()
+        actual = From(self.items).groupby(
+            lambda x: x % 7, lambda x: x * 2,
+            lambda g: (g[0], sum(g[1])), maxbytes=500).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_groupby_withoutPreservingOrderReturnsTheSameGroups(self):
+        expected = From(self.items).groupby(lambda x: x % 50).tolist()
+        actual = From(self.items).groupby(
+            lambda x: x % 50, maxrows=40, preserveorder=False).tolist()
+        self.assertEquals(sorted(actual), sorted(expected))
+
+    def test_budget_countsNoneRows(self):
+        full = Budget(maxrows=3).tracker()
+        self.assertEquals([full(None) for n in range(3)],
+                          [False, False, True])
+        full.reset()
+        self.assertFalse(full(None))
+
+    def test_groupby_handlesASingleGroupLargerThanTheBudget(self):
+        actual = From(range(200)).groupby(
+            lambda x: 0, maxrows=10).tolist()
+        self.assertEquals(actual, [(0, range(200))])
+
+    def test_groupjoin_spillingMatchesInMemoryResults(self):
+        outer = [(i % 60, i) for i in range(300)]
+        inner = [(i % 80, -i) for i in range(400)]
+        key = lambda row: row[0]
+        result = lambda out, ins: (out, ins)
+        expected = From(outer).groupjoin(inner, key, key, result).tolist()
+        actual = From(outer).groupjoin(
+            inner, key, key, result, maxrows=25).tolist()
+        self.assertEquals(actual, expected)
+
+    def test_writepartitions_sendsEqualKeysToTheSamePartition(self):
+        runs = partition.writepartitions(
+            [(k, n) for n in range(3) for k in "abcdef"], 0, 0)
+        try:
+            for run in runs:
+                rows = list(partition.readrun(run))
+                for key in set(k for k, n in rows):
+                    self.assertEquals(len([k for k, n in rows if k == key]), 3)
+        finally:
+            partition.closeall(runs)
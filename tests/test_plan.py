@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import plan
+
+
+class PlanTestCase(unittest.TestCase):
+    """
+    Test case for the query plan optimizer.
+    """
+
+    def test_optimize_dropsIdentitySelects(self):
+        ops = [(plan.SELECT, plan.identity), (plan.SLICE, (0, 3))]
+        self.assertEquals(plan.optimize(ops), [(plan.SLICE, (0, 3))])
+
+    def test_optimize_collapsesTakeAndSkipIntoOneSlice(self):
+        ops = From(range(20)).skip(2).take(10).skip(3).take(4).ops
+        self.assertEquals(plan.optimize(ops), [(plan.SLICE, (5, 9))])
+
+    def test_optimize_takeLessThanSkipProducesEmptySlice(self):
+        ops = From(range(20)).take(2).skip(5).ops
+        self.assertEquals(plan.optimize(ops), [(plan.SLICE, (2, 2))])
+
+    def test_optimize_fusesAdjacentWhereSelectAndOftype(self):
+        pred = lambda x: x > 1
+        fn = lambda x: x * 2
+        ops = From([]).where(pred).select(fn).oftype(int).take(2).ops
+        self.assertEquals(
+            plan.optimize(ops),
+            [(plan.FUSED, ((plan.WHERE, pred),
+                           (plan.SELECT, fn),
+                           (plan.OFTYPE, int))),
+             (plan.SLICE, (0, 2))])
+
+    def test_optimize_doesNotFuseAcrossASlice(self):
+        pred = lambda x: x > 1
+        ops = From([]).where(pred).take(2).where(pred).ops
+        self.assertEquals(
+            plan.optimize(ops),
+            [(plan.WHERE, pred), (plan.SLICE, (0, 2)), (plan.WHERE, pred)])
+
+    def test_execute_returnsSourceWhenThereAreNoOperators(self):
+        items = [1, 2, 3]
+        self.assertTrue(plan.execute(items, ()) is items)
+
+    def test_execute_fusedChainMatchesUnfusedResults(self):
+        items = [1, 'a', 2, 3.0, 4, 5]
+        actual = From(items).oftype(int).where(
+            lambda x: x % 2 == 0).select(lambda x: x * 10).select(
+            str).tolist()
+        self.assertEquals(actual, ['20', '40'])
+
+    def test_view_slicesAndSelectsListsWithoutEnumerating(self):
+        ops = From([]).skip(2).select(str).take(3).ops
+        seq = plan.view(list(range(10)), ops)
+        self.assertEquals(len(seq), 3)
+        self.assertEquals(seq[-1], "4")
+        self.assertEquals(list(reversed(seq)), ["4", "3", "2"])
+
+    def test_view_isNoneForFiltersOrGenerators(self):
+        self.assertEquals(plan.view([1, 2], From([]).where(bool).ops), None)
+        self.assertEquals(plan.view(iter([1, 2]), ()), None)
+
+    def test_query_canBeEnumeratedMoreThanOnceOverAList(self):
+        query = From([1, 2, 3, 4]).where(lambda x: x > 2)
+        self.assertEquals(query.tolist(), [3, 4])
+        self.assertEquals(query.tolist(), [3, 4])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+import context
+import os
+import time
+import unittest
+from linq2py import From
+from linq2py.prefetch import Prefetch, PrefetchStats, pickle
+
+
+def failing():
+    yield 1
+    raise KeyError("source broke")
+
+
+def unpicklable():
+    yield 1
+    yield lambda: 2
+    yield 3
+
+
+def dying():
+    yield 1
+    os._exit(3)
+
+
+class PrefetchTestCase(unittest.TestCase):
+    """
+    Test case for the prefetch operator.
+    """
+
+    def test_prefetch_returnsTheSourceItemsInOrder(self):
+        for mode in ("thread", "process"):
+            actual = From(range(500)).prefetch(8, mode).tolist()
+            self.assertEquals(actual, range(500))
+
+    def test_prefetch_raisesSourceErrorsToTheConsumer(self):
+        for mode in ("thread", "process"):
+            query = From(failing()).prefetch(4, mode)
+            self.assertRaises(KeyError, query.tolist)
+
+    def test_prefetch_raisesForItemsThatCannotBePickled(self):
+        read = []
+        query = From(unpicklable()).prefetch(4, "process")
+        with self.assertRaises(pickle.PicklingError):
+            for item in query:
+                read.append(item)
+        self.assertEquals(read, [1])
+
+    def test_prefetch_raisesWhenTheWorkerDies(self):
+        query = From(dying()).prefetch(4, "process")
+        self.assertRaises(RuntimeError, query.tolist)
+
+    def test_prefetch_stopsTheWorkerAfterAnEarlyExit(self):
+        read = []
+
+        def source():
+            for item in range(10000):
+                read.append(item)
+                yield item
+        self.assertEquals(From(source()).prefetch(4).take(2).tolist(), [0, 1])
+        time.sleep(0.3)
+        count = len(read)
+        time.sleep(0.3)
+        self.assertEquals(len(read), count)
+        self.assertTrue(count < 100)
+
+    def test_prefetch_countsConsumerWaitsOnASlowSource(self):
+        def slow():
+            for item in range(5):
+                time.sleep(0.02)
+                yield item
+        stats = PrefetchStats()
+        From(slow()).prefetch(4, stats=stats).tolist()
+        self.assertEquals(stats.produced, 5)
+        self.assertEquals(stats.consumed, 5)
+        self.assertTrue(stats.consumerwaits >= 4)
+        self.assertEquals(stats.depth, 0)
+
+    def test_prefetch_countsProducerWaitsOnASlowConsumer(self):
+        query = From(range(20)).prefetch(2)
+        for item in query:
+            time.sleep(0.01)
+        self.assertTrue(query.source.stats.producerwaits > 0)
+        self.assertTrue(query.source.stats.maxdepth <= 2)
+
+    def test_prefetch_rejectsUnknownModes(self):
+        self.assertRaises(ValueError, Prefetch, [], 4, "fiber")
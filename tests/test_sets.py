@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From
+from linq2py import sets
+
+
+class SetsTestCase(unittest.TestCase):
+    """
+    Test case for the streaming set operations.
+    """
+
+    def test_seenset_addReturnsFalseForItemsAlreadySeen(self):
+        seen = sets.SeenSet()
+        self.assertTrue(seen.add(1))
+        self.assertFalse(seen.add(1))
+
+    def test_seenset_acceptsUnhashableItems(self):
+        seen = sets.SeenSet([[1, 2], 3])
+        self.assertTrue([1, 2] in seen)
+        self.assertTrue(3 in seen)
+        self.assertFalse([2, 1] in seen)
+        self.assertEquals(len(seen), 2)
+
+    def test_distinct_preservesFirstSeenOrder(self):
+        self.assertEquals(
+            From([3, 1, 3, 2, 1]).distict().tolist(),
+            [3, 1, 2])
+
+    def test_distinct_handlesUnhashableItems(self):
+        self.assertEquals(
+            From([[1], 2, [1], 2, {"a": 1}]).distict().tolist(),
+            [[1], 2, {"a": 1}])
+
+    def test_union_handlesUnhashableItems(self):
+        self.assertEquals(
+            From([[1], [2]]).union([[2], [3]]).tolist(),
+            [[1], [2], [3]])
+
+    def test_except_handlesUnhashableItems(self):
+        self.assertEquals(
+            From([[1], [2], 3]).except_([[2]]).tolist(),
+            [[1], 3])
+
+    def test_intersect_preservesOrderOfTheFirstSequence(self):
+        self.assertEquals(
+            From([9, 3, 7, 3, 1]).intersect([1, 3, 9]).tolist(),
+            [9, 3, 1])
+
+    def test_contains_stopsEnumeratingOnceTheItemIsFound(self):
+        source = iter(range(10))
+        self.assertTrue(From(source).contains(3))
+        self.assertEquals(next(source), 4)
+
+    def test_contains_looksUpSetsDirectly(self):
+        self.assertTrue(From(set([1, 2])).contains(2))
+        self.assertFalse(From(set([1, 2])).contains([2]))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import context
+import unittest
+from linq2py import From, F
+from linq2py import plan
+from linq2py.source import Source, isexpr
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class RangeSource(Source):
+    """
+    A source of integers that applies slices and x > n expressions itself
+    and records what it read.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.scans = []
+        self.read = 0
+
+    def query(self):
+        return (0, self.count, False)
+
+    def push(self, query, kind, arg):
+        start, stop, descending = query
+        if kind == plan.SLICE:
+            first, last = arg
+            if descending:
+                end = stop - first
+                begin = start if last is None else max(start, stop - last)
+                return (min(begin, end), end, descending)
+            begin = start + first
+            end = stop if last is None else min(stop, start + last)
+            return (begin, max(begin, end), descending)
+        if (kind == plan.WHERE and isexpr(arg) and
+                arg.op == "binary" and arg.args[0] == "gt"):
+            return (max(start, arg.args[2].args[0] + 1), stop, descending)
+        if kind == plan.ORDERBY and len(arg) == 1 and arg[0][1]:
+            return (start, stop, True)
+        return None
+
+    def rows(self, query):
+        self.scans.append(query[:2])
+        start, stop, descending = query
+        items = range(start, stop)
+        for item in reversed(items) if descending else items:
+            self.read += 1
+            yield item
+
+
+class SourceTestCase(unittest.TestCase):
+    """
+    Test case for operator pushdown into sources.
+    """
+
+    def test_scan_appliesLeadingOperatorsInTheSource(self):
+        source = RangeSource(1000)
+        actual = From(source).where(F > 900).take(3).tolist()
+        self.assertEquals(actual, [901, 902, 903])
+        self.assertEquals(source.read, 3)
+
+    def test_scan_appliesTheRestInPython(self):
+        source = RangeSource(100)
+        actual = From(source).where(F > 90).select(lambda x: x * 2) \
+                             .take(2).tolist()
+        self.assertEquals(actual, [182, 184])
+        self.assertEquals(source.scans, [(91, 100)])
+
+    def test_scan_stopsAtFirstUnsupportedOperator(self):
+        source = RangeSource(10)
+        actual = From(source).where(lambda x: x % 2).where(F > 5).tolist()
+        self.assertEquals(actual, [7, 9])
+        self.assertEquals(source.scans, [(0, 10)])
+
+    def test_compile_pushesDownToo(self):
+        source = RangeSource(1000)
+        actual = From(source).where(F > 10).take(2).compile().tolist()
+        self.assertEquals(actual, [11, 12])
+        self.assertEquals(source.read, 2)
+
+    def test_orderby_pushesOrderAndLimitToTheSource(self):
+        source = RangeSource(1000)
+        query = From(source).orderbydecending(F)
+        self.assertEquals(query.take(2).tolist(), [999, 998])
+        self.assertEquals(source.read, 2)
+
+    def test_orderby_sortsInPythonWhenTheSourceCannot(self):
+        source = RangeSource(5)
+        self.assertEquals(From(source).orderby(lambda x: -x).tolist(),
+                          [4, 3, 2, 1, 0])
+
+    def test_iter_readsEverything(self):
+        self.assertEquals(list(RangeSource(3)), [0, 1, 2])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_columnar_pushesExpressionsAfterRowOperators(self):
+        query = From.columns({"a": [3, 1, 2], "b": [1, 2, 3]})
+        ops = From(query.source).where(F.a > 1).orderby(F.b) \
+                                .select(F.a * 10)
+        self.assertEquals(ops.tolist(), [30, 20])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+import context
+import sqlite3
+import unittest
+from linq2py import From, F
+from linq2py import sql
+
+ITEMS = [
+    ("pen", 5, 10, "office"),
+    ("ink", 20, 2, "office"),
+    ("pad", 15, 4, "paper"),
+    ("mug", None, 1, "kitchen"),
+    ("cup", 0, 3, "kitchen"),
+]
+
+
+class RecordingConnection(object):
+    """
+    Passes statements through to a connection, keeping a list of them.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+
+    def execute(self, statement, params=()):
+        self.statements.append(statement)
+        return self.connection.execute(statement, params)
+
+
+class SqlTestCase(unittest.TestCase):
+    """
+    Test case for SQLite table sources.
+    """
+
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute(
+            "CREATE TABLE items (name TEXT, price INTEGER, qty INTEGER, "
+            "kind TEXT)")
+        self.connection.executemany(
+            "INSERT INTO items VALUES (?, ?, ?, ?)", ITEMS)
+        self.connection.execute(
+            "CREATE TABLE kinds (kind TEXT, label TEXT)")
+        self.connection.executemany(
+            "INSERT INTO kinds VALUES (?, ?)",
+            [("office", "Office"), ("kitchen", "Kitchen"),
+             ("office", "Stationery")])
+        self.connection = RecordingConnection(self.connection)
+        self.statements = self.connection.statements
+        self.table = From.sqltable(self.connection, "items", batchsize=2)
+        self.rows = From([dict(zip(("name", "price", "qty", "kind"), item))
+                          for item in ITEMS])
+
+    def tearDown(self):
+        self.connection.connection.close()
+
+    def assertSameAsPython(self, build):
+        self.assertEquals(build(self.table), build(self.rows))
+
+    def test_iter_yieldsRowsWithAttributeAccess(self):
+        rows = self.table.tolist()
+        self.assertEquals(len(rows), 5)
+        self.assertEquals(rows[0].name, "pen")
+        self.assertEquals(rows[0]["price"], 5)
+
+    def test_where_translatesToOneStatement(self):
+        actual = self.table.where(F.price > 5).select(F.name).tolist()
+        self.assertEquals(actual, ["ink", "pad"])
+        self.assertEquals(len(self.statements), 1)
+        self.assertTrue("WHERE" in self.statements[0])
+
+    def test_where_matchesPythonForNullsAndTruthiness(self):
+        for pred in (F["price"] < 10, F["price"] != 5, F["price"] >= 0,
+                     F["price"], ~F["price"], F["price"] == None,
+                     F["kind"].isin(["paper", "kitchen"]),
+                     ~F["price"].isin([5]), F["price"].isin([None, 5]),
+                     F["price"].isin([None]), ~F["price"].isin([]),
+                     (F["qty"] + 1).isin([]),
+                     (F["qty"] > 2) | (F["price"] == 20)):
+            self.assertSameAsPython(
+                lambda query: query.where(pred).select(F["name"]).tolist())
+
+    def test_where_runsUntranslatableTailInPython(self):
+        actual = self.table.where(F.qty > 1).where(
+            lambda row: row.name.startswith("p")).select(F.name).tolist()
+        self.assertEquals(actual, ["pen", "pad"])
+        self.assertTrue("WHERE" in self.statements[0])
+
+    def test_orderby_takeAndSkipTranslate(self):
+        actual = self.table.orderbydecending(F.qty).skip(1).take(2) \
+                           .select(F.name).tolist()
+        self.assertEquals(actual, ["pad", "cup"])
+        self.assertTrue("ORDER BY" in self.statements[-1])
+        self.assertTrue("LIMIT" in self.statements[-1])
+
+    def test_orderby_isStableLikePython(self):
+        self.assertSameAsPython(
+            lambda query: query.orderby(F["kind"]).select(F["name"]).tolist())
+
+    def test_aggregates_runInSqlite(self):
+        prices = self.table.select(F.price)
+        self.assertEquals(prices.sum(), 40)
+        self.assertEquals(prices.min(), 5)
+        self.assertEquals(prices.max(), 20)
+        self.assertEquals(self.table.count(F.kind == "office"), 2)
+        self.assertEquals(self.table.select(F.qty).average(), 20 / 5)
+        self.assertTrue(all("COUNT(*)" in statement
+                            for statement in self.statements))
+
+    def test_aggregates_matchPython(self):
+        self.assertSameAsPython(lambda query: query.count())
+        self.assertSameAsPython(
+            lambda query: query.select(F["price"]).min())
+        self.assertSameAsPython(
+            lambda query: query.select(F["price"]).count())
+        self.assertSameAsPython(
+            lambda query: query.where(F["price"] != None)
+                               .select(F["price"] * 2).sum(F > 10))
+
+    def test_min_ordersNullFirstLikePython(self):
+        self.assertSameAsPython(
+            lambda query: query.select(F["price"]).min(F < 1))
+        self.assertSameAsPython(
+            lambda query: query.select(F["price"]).min(F >= 0))
+
+    def test_compare_ignoresColumnCollation(self):
+        self.connection.connection.execute(
+            "CREATE TABLE names (name TEXT COLLATE NOCASE)")
+        names = ["b", "A", "a", "B"]
+        self.connection.connection.executemany(
+            "INSERT INTO names VALUES (?)", [(name,) for name in names])
+        table = From.sqltable(self.connection, "names").select(F.name)
+        rows = From(names)
+        for build in (lambda query: query.where(F == "a").tolist(),
+                      lambda query: query.where(F < "a").tolist(),
+                      lambda query: query.where(F.isin(["A"])).tolist(),
+                      lambda query: query.orderby(F).tolist(),
+                      lambda query: query.groupby(F).tolist()):
+            self.assertEquals(build(table), build(rows))
+
+    def test_minAndMax_ignoreColumnCollation(self):
+        self.connection.connection.execute(
+            "CREATE TABLE letters (name TEXT COLLATE NOCASE)")
+        self.connection.connection.executemany(
+            "INSERT INTO letters VALUES (?)", [("B",), ("a",)])
+        table = From.sqltable(self.connection, "letters").select(F.name)
+        self.assertEquals(table.min(), "B")
+        self.assertEquals(table.max(), "a")
+
+    def test_where_leavesStringMethodsToPython(self):
+        self.connection.connection.execute("CREATE TABLE words (word TEXT)")
+        self.connection.connection.executemany(
+            "INSERT INTO words VALUES (?)",
+            [(u"\tab",), (u"\xc9t\xe9",), (u"ab",)])
+        table = From.sqltable(self.connection, "words").select(F.word)
+        actual = table.where(F.method("strip") == u"ab").tolist()
+        self.assertEquals(actual, [u"\tab", u"ab"])
+        actual = table.where(F.method("lower") == u"\xe9t\xe9").tolist()
+        self.assertEquals(actual, [u"\xc9t\xe9"])
+
+    def test_max_raisesForEmptySequence(self):
+        query = self.table.where(F.price > 100).select(F.price)
+        self.assertRaises(ValueError, query.max)
+
+    def test_groupby_keepsFirstSeenOrder(self):
+        self.assertSameAsPython(
+            lambda query: query.groupby(F["kind"], F["name"]).tolist())
+        self.assertTrue("PARTITION BY" in self.statements[-1])
+
+    def test_groupby_groupsWholeRows(self):
+        groups = self.table.groupby(F.kind).tolist()
+        self.assertEquals([key for key, rows in groups],
+                          ["office", "paper", "kitchen"])
+        self.assertEquals([row.name for row in groups[0][1]], ["pen", "ink"])
+
+    def test_join_translatesForTablesOfOneDatabase(self):
+        kinds = From.sqltable(self.connection, "kinds")
+        actual = self.table.where(F.qty > 1).join(
+            kinds, F.kind, F.kind, lambda item, kind: (item.name, kind.label))
+        expected = self.rows.where(F["qty"] > 1).join(
+            [{"kind": k, "label": l} for k, l in
+             self.connection.execute("SELECT * FROM kinds")],
+            F["kind"], F["kind"],
+            lambda item, kind: (item["name"], kind["label"]))
+        self.assertEquals(actual.tolist(), expected.tolist())
+        self.assertTrue(any(" JOIN " in statement
+                            for statement in self.statements))
+
+    def test_join_fallsBackForOtherSequences(self):
+        actual = self.table.join([("paper", 1)], F.kind, F[0],
+                                 lambda item, other: item.name).tolist()
+        self.assertEquals(actual, ["pad"])
+
+    def test_translator_leavesDivisionToPython(self):
+        self.assertEquals(sql.Translator().value(F.price / 2), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+import context
+import threading
+import time
+import unittest
+from linq2py import From
+
+
+class ThreadsTestCase(unittest.TestCase):
+    """
+    Test case for the thread based operators.
+    """
+
+    def test_selectconcurrent_keepsOrderByDefault(self):
+        actual = From(range(20)).selectconcurrent(
+            lambda x: x * 2, concurrency=4).tolist()
+        self.assertEquals(actual, [x * 2 for x in range(20)])
+
+    def test_selectconcurrent_overlapsCallsUpToTheLimit(self):
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def slow(x):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return x
+
+        actual = From(range(12)).selectconcurrent(
+            slow, concurrency=3, ordered=False).tolist()
+        self.assertEquals(sorted(actual), range(12))
+        self.assertTrue(1 < active[1] <= 3)
+
+    def test_selectconcurrent_raisesErrorsFromTheFunction(self):
+        query = From([1, 0]).selectconcurrent(lambda x: 1 / x)
+        self.assertRaises(ZeroDivisionError, query.tolist)
+
+    def test_selectconcurrent_stopsReadingWhenAbandoned(self):
+        source = iter(range(1000))
+        From(source).selectconcurrent(lambda x: x, concurrency=2).first()
+        self.assertTrue(next(source) < 1000)